@@ -0,0 +1,96 @@
+""" Precomputed aggregates of allowances data (EUA) by registry, main activity and year. """
+
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterable, Optional
+
+import pandas as pd
+
+from data_analysis.allowances_utils import get_allowances_long_data
+
+_GROUP_LEVELS = ["REGISTRY_CODE", "MAIN_ACTIVITY_TYPE_CODE", "year"]
+
+# Activity code used internally for aggregates over all activities of a registry.
+_ALL_ACTIVITIES = -1
+
+
+@dataclass
+class AllowancesCube:
+    """
+    Sums, counts and top permits of verified emissions (in megatons CO2) for each registry,
+    code of main activity and year. Aggregates over all activities of a registry are queried
+    with the activity code None.
+    """
+    totals: pd.Series
+    counts: pd.Series
+    top_permits: pd.DataFrame
+    top_permits_slices: dict[tuple, slice]
+    top_k: int
+
+    @classmethod
+    def from_long_data(cls, df_long: pd.DataFrame, top_k: int = 50) -> "AllowancesCube":
+        """ Build the cube from a long table returned by get_allowances_long_data. """
+        df = df_long.reset_index()
+        df["REGISTRY_CODE"] = df["REGISTRY_CODE"].astype(str)
+        # Permits with no emissions in given year are closed or not yet opened.
+        df = df[df["value"] > 0]
+        # Duplicate the rows with a special activity code to aggregate over all activities.
+        df = pd.concat([df, df.assign(MAIN_ACTIVITY_TYPE_CODE=_ALL_ACTIVITIES)], ignore_index=True)
+
+        grouped = df.groupby(_GROUP_LEVELS, dropna=False)["value"]
+        totals = grouped.sum()
+        counts = grouped.count()
+
+        top_permits = (
+            df.sort_values(_GROUP_LEVELS + ["value"], ascending=[True, True, True, False])
+            .groupby(_GROUP_LEVELS, dropna=False, sort=False)
+            .head(top_k)
+            .reset_index(drop=True)
+        )
+        top_permits_slices = {
+            key: slice(positions[0], positions[-1] + 1)
+            for key, positions in top_permits.groupby(_GROUP_LEVELS, dropna=False).indices.items()
+        }
+        return cls(totals=totals, counts=counts,
+                   top_permits=top_permits[["PERMIT_IDENTIFIER", "value"]],
+                   top_permits_slices=top_permits_slices, top_k=top_k)
+
+    @classmethod
+    def from_file(cls, eua_path: str | Path, top_k: int = 50) -> "AllowancesCube":
+        """ Build the cube from an Excel file with verified emissions. """
+        return cls.from_long_data(get_allowances_long_data(eua_path), top_k)
+
+    def _key(self, registry_code: str, main_activity_code: Optional[int], year: int) -> tuple:
+        activity = _ALL_ACTIVITIES if main_activity_code is None else main_activity_code
+        return (registry_code, activity, year)
+
+    def get_total(self, registry_code: str, year: int,
+                  main_activity_code: Optional[int] = None) -> float:
+        """ Total verified emissions (in megatons CO2), zero for an empty group. """
+        return float(self.totals.get(self._key(registry_code, main_activity_code, year), 0.0))
+
+    def get_count(self, registry_code: str, year: int,
+                  main_activity_code: Optional[int] = None) -> int:
+        """ Number of permits with non-zero verified emissions. """
+        return int(self.counts.get(self._key(registry_code, main_activity_code, year), 0))
+
+    def get_top_permits(self, registry_code: str, year: int,
+                        main_activity_code: Optional[int] = None, k: int = 15,
+                        exclude: Iterable[str] = ()) -> pd.Series:
+        """
+        Returns k largest permits of the group (indexed by permit codes, with emissions in
+        megatons CO2), skipping the excluded ones (e.g. permits already covered by a definition).
+        Only the top_k permits of each group are kept in the cube, a ValueError is raised when
+        they run out before k permits are found (build the cube with a larger top_k then).
+        """
+        key = self._key(registry_code, main_activity_code, year)
+        if key not in self.top_permits_slices:
+            return pd.Series(dtype=float, name="value")
+        df = self.top_permits.iloc[self.top_permits_slices[key]]
+        exclude = set(exclude)
+        if exclude:
+            df = df[~df["PERMIT_IDENTIFIER"].isin(exclude)]
+        if len(df) < k and self.counts[key] > self.top_k:
+            raise ValueError(f"Only {self.top_k} largest permits of {key} are kept in the cube, "
+                             f"{k} permits (skipping {len(exclude)}) need a larger top_k")
+        return df.head(k).set_index("PERMIT_IDENTIFIER")["value"]
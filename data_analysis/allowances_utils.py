@@ -1,17 +1,105 @@
 """ Utils to load allowances data (EUA) from an Excel file. """
 
+from pathlib import Path
 from typing import Optional
 
 import numpy as np
+import openpyxl
 import pandas as pd
+import pyarrow.parquet as pq
 
+from data_analysis.cache_utils import get_cache_dir, get_file_hash, write_parquet_atomically
 
-def _find_first_row(df: pd.DataFrame) -> int:
+# The header row (starting with REGISTRY_CODE) is expected within this many leading rows.
+_MAX_HEADER_ROW = 50
+
+# Bump when the parsing changes, so that stale cache entries are not reused.
+_CACHE_VERSION = 2
+
+
+def _is_emissions_column(column: str) -> bool:
+    return column.startswith("VERIFIED_EMISSIONS_")
+
+
+def _convert_cell(value):
+    """ Integral numbers are read as int, as pd.read_excel does (e.g. 123, not 123.0). """
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    return value
+
+
+def _read_workbook(eua_path: str | Path) -> pd.DataFrame:
+    """
+    Stream the first sheet of the workbook in a single pass. Leading lines of comments are
+    skipped until the header row (starting with REGISTRY_CODE) is found.
+    """
+    workbook = openpyxl.load_workbook(eua_path, read_only=True, data_only=True)
+    try:
+        rows = workbook.worksheets[0].iter_rows(values_only=True)
+        header = None
+        for _, row in zip(range(_MAX_HEADER_ROW), rows):
+            if row and row[0] == "REGISTRY_CODE":
+                header = row
+                break
+        if header is None:
+            raise ValueError(f"Header row with REGISTRY_CODE not found in {eua_path}")
+        # The iterator continues right after the header row.
+        records = [row for row in rows if any(value is not None for value in row)]
+    finally:
+        workbook.close()
+
+    columns = [i for i, name in enumerate(header) if name is not None]
+    df = pd.DataFrame.from_records(
+        [[_convert_cell(record[i]) if i < len(record) else None for i in columns]
+         for record in records],
+        columns=[str(header[i]) for i in columns],
+    ).infer_objects()
+
+    for column in df.columns:
+        if _is_emissions_column(column):
+            # Some elements are string "Excluded", keep them as missing values.
+            df[column] = pd.to_numeric(df[column], errors="coerce")
+        elif df[column].dtype == object:
+            kinds = set(df[column].dropna().map(type))
+            if kinds and kinds <= {int, float}:
+                # Numeric columns with missing values (e.g. activity codes).
+                df[column] = pd.to_numeric(df[column])
+            elif str in kinds and len(kinds) > 1:
+                # Columns mixing numbers and strings cannot be stored in a columnar format.
+                df[column] = df[column].map(lambda value: None if pd.isna(value) else str(value))
+    return df
+
+
+def _get_allowances_cache_path(eua_path: str | Path) -> Path:
+    """
+    Returns the path of the columnar copy of the workbook, parsing it on the first call.
+    The copy is keyed by the hash of the file, so that updated workbooks are parsed again.
+    """
+    cache_path = get_cache_dir("eua") / f"{get_file_hash(eua_path)[:24]}-v{_CACHE_VERSION}.parquet"
+    if not cache_path.exists():
+        write_parquet_atomically(_read_workbook(eua_path), cache_path, index=False)
+    return cache_path
+
+
+def get_allowances_columns(eua_path: str | Path) -> list[str]:
+    """ Returns the names of all columns of the dataset. """
+    return pq.read_schema(_get_allowances_cache_path(eua_path)).names
+
+
+def _read_allowances_table(cache_path: Path, columns: Optional[list[str]] = None,
+                           registry_code: Optional[str] = None) -> pd.DataFrame:
+    filters = [("REGISTRY_CODE", "==", registry_code)] if registry_code is not None else None
+    return pd.read_parquet(cache_path, columns=columns, filters=filters)
+
+
+def load_allowances_table(eua_path: str | Path, columns: Optional[list[str]] = None,
+                          registry_code: Optional[str] = None) -> pd.DataFrame:
     """
-    Find the first row (header) of the dataset, i.e. calculate how many
-    leading lines of comments the sheet contains.
+    Import the whole allowances table (as in the Excel file), reading only the given columns
+    and optionally only rows of a given registry. Verified emissions are in tons CO2, with
+    non-numeric values (such as "Excluded") converted to missing values.
     """
-    return int(np.where(df[0] == "REGISTRY_CODE")[0][0])
+    return _read_allowances_table(_get_allowances_cache_path(eua_path), columns, registry_code)
 
 
 def get_allowances_data(year: int, registry_code: str,
@@ -22,24 +110,101 @@ def get_allowances_data(year: int, registry_code: str,
     CO2.
     """
     emissions_column = f"VERIFIED_EMISSIONS_{year}"
-
-    # First pass to find the header row.
-    df_test = pd.read_excel(eua_path, header=None, nrows=50)
-    skip_rows = _find_first_row(df_test)
-
-    # Second pass to read the whole file.
-    df = pd.read_excel(eua_path, skiprows=skip_rows)
-    if emissions_column not in df.columns:
+    # Resolve the cache once, finding it hashes the whole workbook.
+    cache_path = _get_allowances_cache_path(eua_path)
+    if emissions_column not in pq.read_schema(cache_path).names:
         raise KeyError(f"Verified emissions for {year} not present in dataset")
+
+    df = _read_allowances_table(
+        cache_path,
+        columns=["PERMIT_IDENTIFIER", emissions_column, "IDENTIFIER_IN_REG",
+                 "MAIN_ACTIVITY_TYPE_CODE", "REGISTRY_CODE"],
+        registry_code=registry_code,
+    )
     df = df.rename(columns={emissions_column: "value"})
 
-    main_activity_code_condition = True
     if main_activity_code is not None:
-        main_activity_code_condition = (df["MAIN_ACTIVITY_TYPE_CODE"] == main_activity_code)
-    df = df.loc[(main_activity_code_condition & (df["REGISTRY_CODE"] == registry_code)),
-                ["PERMIT_IDENTIFIER", "value", "IDENTIFIER_IN_REG", "MAIN_ACTIVITY_TYPE_CODE"]]
-    df.set_index('PERMIT_IDENTIFIER', inplace=True)
-    # Some elements are string "Excluded" or -1, convert that to zeros. Convert tons to megatons.
-    df["value"] = pd.to_numeric(df["value"], errors="coerce").fillna(0).clip(lower=0).div(1e6)
-    df.sort_values("value", ascending=False, inplace=True)
+        df = df[df["MAIN_ACTIVITY_TYPE_CODE"] == main_activity_code]
+    df = df[["PERMIT_IDENTIFIER", "value", "IDENTIFIER_IN_REG", "MAIN_ACTIVITY_TYPE_CODE"]]
+    df = df.set_index("PERMIT_IDENTIFIER")
+    # Some elements are missing ("Excluded") or -1, convert that to zeros. Convert tons to megatons.
+    df["value"] = df["value"].fillna(0).clip(lower=0).div(1e6)
+    df = df.sort_values("value", ascending=False)
     return df
+
+
+def get_allowances_long_data(eua_path: str | Path) -> pd.DataFrame:
+    """
+    Import verified emissions of all permits for all years present in the dataset. The dataframe
+    is indexed by (PERMIT_IDENTIFIER, year, REGISTRY_CODE) and has columns 'value', in megatons
+    CO2, and 'MAIN_ACTIVITY_TYPE_CODE'.
+    """
+    cache_path = _get_allowances_cache_path(eua_path)
+    emissions_columns = [column for column in pq.read_schema(cache_path).names
+                         if _is_emissions_column(column)]
+    df = _read_allowances_table(
+        cache_path,
+        columns=["PERMIT_IDENTIFIER", "REGISTRY_CODE", "MAIN_ACTIVITY_TYPE_CODE", *emissions_columns],
+    )
+    df = df.melt(id_vars=["PERMIT_IDENTIFIER", "REGISTRY_CODE", "MAIN_ACTIVITY_TYPE_CODE"],
+                 value_vars=emissions_columns, var_name="year", value_name="value")
+    df["year"] = df["year"].str.removeprefix("VERIFIED_EMISSIONS_").astype(int)
+    df["REGISTRY_CODE"] = df["REGISTRY_CODE"].astype("category")
+    # Some elements are missing ("Excluded") or -1, convert that to zeros. Convert tons to megatons.
+    df["value"] = df["value"].fillna(0).clip(lower=0).div(1e6)
+    df = df.set_index(["PERMIT_IDENTIFIER", "year", "REGISTRY_CODE"]).sort_index()
+    return df[["value", "MAIN_ACTIVITY_TYPE_CODE"]]
+
+
+def get_allowances_statistics(df_long: pd.DataFrame) -> pd.DataFrame:
+    """
+    Compute emissions, shares of the registry total and ranks within the registry (1 is the
+    largest emitter) of all permits in all years of a long table from get_allowances_long_data.
+    The dataframe is indexed by (PERMIT_IDENTIFIER, REGISTRY_CODE) and has columns
+    (statistic, year) for statistics 'value', 'share' and 'rank'.
+    """
+    df_wide = df_long["value"].unstack("year", fill_value=0.0)
+    by_registry = df_wide.groupby(level="REGISTRY_CODE", observed=True)
+    df_shares = df_wide / by_registry.transform("sum")
+    df_ranks = by_registry.rank(ascending=False, method="min")
+    return pd.concat({"value": df_wide, "share": df_shares, "rank": df_ranks},
+                     axis=1, names=["statistic", "year"])
+
+
+def get_allowances_changes(df_long: pd.DataFrame, year: int, comparison_year: int) -> pd.DataFrame:
+    """
+    Compare emissions of all permits in a year with a comparison year. The dataframe is indexed
+    by (PERMIT_IDENTIFIER, REGISTRY_CODE) and has columns with values, shares and ranks in both
+    years, absolute ('change') and relative ('change_pct') change of emissions, change of the
+    share and shift in rank (positive when the permit moved up towards the largest emitters).
+    """
+    df_stats = get_allowances_statistics(df_long)
+    df_current = df_stats.xs(year, axis=1, level="year")
+    df_comparison = df_stats.xs(comparison_year, axis=1, level="year")
+
+    df = df_current.join(df_comparison.add_prefix("comparison_"))
+    df["change"] = df["value"] - df["comparison_value"]
+    df["change_pct"] = (100 * df["change"] / df["comparison_value"]).replace(
+        [np.inf, -np.inf], np.nan)
+    df["share_change"] = df["share"] - df["comparison_share"]
+    df["rank_shift"] = df["comparison_rank"] - df["rank"]
+    return df.sort_values("value", ascending=False)
+
+
+def get_allowances_yearly_changes(df_long: pd.DataFrame) -> pd.DataFrame:
+    """
+    Compute year-over-year changes for the full series of all permits. The dataframe is indexed
+    by (PERMIT_IDENTIFIER, REGISTRY_CODE, year) and has columns 'value', 'share', 'rank',
+    'change' and 'rank_shift' (both relative to the previous year, missing for the first year).
+    """
+    df_stats = get_allowances_statistics(df_long)
+    wide_stats = {
+        "value": df_stats["value"],
+        "share": df_stats["share"],
+        "rank": df_stats["rank"],
+        "change": df_stats["value"].diff(axis=1),
+        "rank_shift": df_stats["rank"].shift(axis=1) - df_stats["rank"],
+    }
+    return pd.concat([df_wide.melt(ignore_index=False, value_name=name)
+                      .set_index("year", append=True)[name]
+                      for name, df_wide in wide_stats.items()], axis=1)
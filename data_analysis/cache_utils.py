@@ -0,0 +1,61 @@
+""" Utils to keep downloaded or parsed datasets in a local on-disk cache. """
+
+import hashlib
+import json
+import os
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# Environment variable to override the default location of the cache.
+CACHE_DIR_ENV = "FAKTAOKLIMATU_CACHE_DIR"
+
+
+def get_cache_dir(namespace: str) -> Path:
+    """
+    Returns the cache directory for a given namespace (e.g. "eurostat"), creating it if needed.
+    The cache lives in ~/.cache/faktaoklimatu unless overridden by the FAKTAOKLIMATU_CACHE_DIR
+    environment variable.
+    """
+    root = os.environ.get(CACHE_DIR_ENV) or os.path.join(
+        os.path.expanduser("~"), ".cache", "faktaoklimatu")
+    path = Path(root) / namespace
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+def get_content_key(*parts) -> str:
+    """
+    Returns a stable hash of the given JSON-serializable parts. Dictionaries are hashed
+    independently of the order of their keys.
+    """
+    payload = json.dumps(parts, sort_keys=True, default=str, separators=(",", ":"))
+    return hashlib.sha256(payload.encode("utf8")).hexdigest()
+
+
+def get_file_hash(path: str | Path) -> str:
+    """ Returns the SHA-256 hash of the contents of a file. """
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def write_parquet_atomically(df: pd.DataFrame, path: Path, **kwargs) -> None:
+    """
+    Write a dataframe into a parquet file via a temporary file, so that an interrupted write
+    never leaves a broken cache entry behind.
+    """
+    tmp_path = path.with_suffix(".tmp")
+    df.to_parquet(tmp_path, **kwargs)
+    os.replace(tmp_path, path)
+
+
+def write_npy_atomically(array: np.ndarray, path: Path) -> None:
+    """ Write a numpy array into a .npy file via a temporary file (as above). """
+    tmp_path = path.with_suffix(".tmp")
+    with open(tmp_path, "wb") as f:
+        np.save(f, array)
+    os.replace(tmp_path, path)
@@ -0,0 +1,229 @@
+""" Daily temperature normals and anomalies of ČHMÚ stations computed as array operations. """
+
+from typing import Iterable, Optional
+
+import numpy as np
+import pandas as pd
+
+from data_analysis.chmi_store import (
+    DAYS_IN_LEAP_YEAR,
+    TEMPERATURE_COLUMNS,
+    StationSeries,
+    StationStore,
+)
+
+ANOMALY_COLUMNS = ["anomaly_avg", "anomaly_max", "anomaly_min"]
+
+# Reference period as (first year, last year), both inclusive.
+Period = tuple[int, int]
+
+# Temperatures are measured in tenths of °C, rounding float32 values of the store back to them
+# gives the same doubles as parsing the source text, so days exactly at a threshold are not
+# counted at random.
+_DECIMALS = 1
+
+# Month and day of each index of days in a leap year.
+_LEAP_YEAR = pd.date_range("2000-01-01", "2000-12-31")
+
+
+def _smooth(values: np.ndarray, window: int) -> np.ndarray:
+    """ Circular moving sum over the days (axis 1) of the year. """
+    if window == 1:
+        return values
+    half = window // 2
+    padded = np.concatenate([values[:, -half:], values, values[:, :half]], axis=1)
+    sums = np.cumsum(padded, axis=1, dtype=np.float64)
+    previous = np.concatenate([np.zeros_like(sums[:, :1]), sums[:, :-window]], axis=1)
+    return sums[:, window - 1:] - previous
+
+
+class StationAnomalies:
+    """
+    Daily temperatures of many stations flattened into arrays keyed by station and day of year.
+    Normals of any reference period (plain or smoothed over a window of days) are computed with
+    a single bincount and anomalies by gathering them back onto the observations. Sums of
+    reference periods and computed anomalies are kept, so appended days only update what they
+    affect.
+    """
+
+    def __init__(self, series: Iterable[StationSeries]):
+        self.station_ids: list[str] = []
+        self.dates = np.empty(0, dtype="datetime64[D]")
+        self.years = np.empty(0, dtype=np.int16)
+        self.keys = np.empty(0, dtype=np.int64)
+        self.values = np.empty((0, len(TEMPERATURE_COLUMNS)))
+        # Per reference period: sums and numbers of (non-missing) temperatures per key.
+        self._sums: dict[Period, np.ndarray] = {}
+        self._counts: dict[Period, np.ndarray] = {}
+        self._normals: dict[tuple[Period, int], np.ndarray] = {}
+        self._anomalies: dict[tuple[Period, int], np.ndarray] = {}
+        self.append(series)
+
+    @classmethod
+    def from_store(cls, store: StationStore, station_ids: Optional[list[str]] = None,
+                   start: Optional[str] = None, end: Optional[str] = None) -> "StationAnomalies":
+        """ Stations (all by default) from the store between the start and end dates. """
+        station_ids = station_ids or store.get_station_ids()
+        return cls(store.load(id).get_range(start, end) for id in station_ids)
+
+    @property
+    def _num_keys(self) -> int:
+        return len(self.station_ids) * DAYS_IN_LEAP_YEAR
+
+    def _get_station_index(self) -> np.ndarray:
+        return self.keys // DAYS_IN_LEAP_YEAR
+
+    def _accumulate(self, rows: np.ndarray | slice, reference: Period) -> np.ndarray:
+        """ Add rows within the reference period to its sums, return their (distinct) keys. """
+        years = self.years[rows]
+        in_reference = (reference[0] <= years) & (years <= reference[1])
+        keys = self.keys[rows][in_reference]
+        values = self.values[rows][in_reference]
+        # Missing temperatures are left out of the sums and counts of their column only.
+        for i in range(values.shape[1]):
+            is_valid = ~np.isnan(values[:, i])
+            self._counts[reference][:, i] += np.bincount(keys, weights=is_valid,
+                                                         minlength=self._num_keys).astype(np.int64)
+            self._sums[reference][:, i] += np.bincount(keys, weights=np.nan_to_num(values[:, i]),
+                                                       minlength=self._num_keys)
+        return np.flatnonzero(np.bincount(keys, minlength=self._num_keys))
+
+    def get_normals(self, reference: Period, window: int = 1) -> np.ndarray:
+        """
+        Normals as an array of stations × days of the leap year × temperatures (avg, max, min).
+        Normals are means over the reference period, smoothed ones pool all days within the
+        (odd) window centered at the day, wrapping around the end of the year.
+        """
+        if window < 1 or window % 2 == 0 or window > DAYS_IN_LEAP_YEAR:
+            raise ValueError(f"Window of normals has to be an odd number of days, not {window}")
+        if reference not in self._sums:
+            self._sums[reference] = np.zeros((self._num_keys, len(TEMPERATURE_COLUMNS)))
+            self._counts[reference] = np.zeros((self._num_keys, len(TEMPERATURE_COLUMNS)),
+                                               dtype=np.int64)
+            self._accumulate(slice(None), reference)
+        if (reference, window) not in self._normals:
+            shape = (len(self.station_ids), DAYS_IN_LEAP_YEAR)
+            sums = _smooth(self._sums[reference].reshape(shape + (-1,)), window)
+            counts = _smooth(self._counts[reference].reshape(shape + (-1,)), window)
+            with np.errstate(invalid="ignore", divide="ignore"):
+                self._normals[(reference, window)] = np.where(counts > 0, sums / counts, np.nan)
+        return self._normals[(reference, window)]
+
+    def get_anomalies(self, reference: Period, window: int = 1) -> np.ndarray:
+        """ Anomalies of all observations (rows) from the normals, columns as in the values. """
+        if (reference, window) not in self._anomalies:
+            normals = self.get_normals(reference, window).reshape(self._num_keys, -1)
+            self._anomalies[(reference, window)] = self.values - np.take(normals, self.keys, axis=0)
+        return self._anomalies[(reference, window)]
+
+    def append(self, series: Iterable[StationSeries]) -> None:
+        """
+        Append days of (new or known) stations. Sums of the reference periods are updated by the
+        new days only and only anomalies on the days of year whose normals changed are computed
+        again.
+        """
+        old_size = len(self.keys)
+        last_dates = self._get_last_dates()
+        dates, years, keys, values = [self.dates], [self.years], [self.keys], [self.values]
+        for s in series:
+            if not len(s):
+                continue
+            if s.station_id not in self.station_ids:
+                self.station_ids.append(s.station_id)
+            elif s.station_id in last_dates and s.dates[0] <= last_dates[s.station_id]:
+                raise ValueError(f"Appended days of station {s.station_id} have to follow "
+                                 f"{last_dates[s.station_id]}")
+            last_dates[s.station_id] = s.dates[-1]
+            station_index = self.station_ids.index(s.station_id)
+            dates.append(s.dates)
+            years.append(s.get_years().astype(np.int16))
+            keys.append(station_index * DAYS_IN_LEAP_YEAR + s.day_index.astype(np.int64))
+            station_values = np.column_stack([getattr(s, c) for c in TEMPERATURE_COLUMNS])
+            values.append(np.round(station_values.astype(np.float64), _DECIMALS))
+        self.dates = np.concatenate(dates)
+        self.years = np.concatenate(years)
+        self.keys = np.concatenate(keys)
+        self.values = np.concatenate(values)
+
+        new_rows = slice(old_size, None)
+        affected_keys = {}
+        for reference in self._sums:
+            missing = self._num_keys - len(self._counts[reference])
+            self._counts[reference] = np.pad(self._counts[reference], ((0, missing), (0, 0)))
+            self._sums[reference] = np.pad(self._sums[reference], ((0, missing), (0, 0)))
+            affected_keys[reference] = self._accumulate(new_rows, reference)
+        self._normals.clear()
+
+        for (reference, window), anomalies in self._anomalies.items():
+            normals = self.get_normals(reference, window).reshape(self._num_keys, -1)
+            # Smoothed normals change also on the neighbouring days within the window.
+            keys = affected_keys[reference]
+            offsets = np.arange(-(window // 2), window // 2 + 1)
+            days = (keys[:, np.newaxis] % DAYS_IN_LEAP_YEAR + offsets) % DAYS_IN_LEAP_YEAR
+            keys = np.unique((keys // DAYS_IN_LEAP_YEAR)[:, np.newaxis] * DAYS_IN_LEAP_YEAR + days)
+            old_keys = self.keys[:old_size]
+            rows = np.flatnonzero(np.isin(old_keys, keys))
+            anomalies[rows] = self.values[rows] - normals[old_keys[rows]]
+            self._anomalies[(reference, window)] = np.concatenate(
+                [anomalies, self.values[new_rows] - normals[self.keys[new_rows]]])
+
+    def _get_last_dates(self) -> dict[str, np.datetime64]:
+        if not len(self.keys):
+            return {}
+        station_index = self._get_station_index()
+        last = np.full(len(self.station_ids), np.datetime64("NaT"), dtype="datetime64[D]")
+        np.maximum.at(last.view(np.int64), station_index, self.dates.view(np.int64))
+        return dict(zip(self.station_ids, last))
+
+    def count_exceedances(
+        self, thresholds: list[float], periods: list[Period], reference: Period,
+        window: int = 1, column: str = "tmax", per_year: bool = True
+    ) -> pd.DataFrame:
+        """
+        Numbers of days with an anomaly above positive thresholds (or below negative ones) per
+        station and period, by default divided by the number of years of the period with data.
+        """
+        anomalies = self.get_anomalies(reference, window)[:, TEMPERATURE_COLUMNS.index(column)]
+        station_index = self._get_station_index()
+        num_stations = len(self.station_ids)
+
+        counts = np.zeros((num_stations, len(periods), len(thresholds)))
+        for p, (first_year, last_year) in enumerate(periods):
+            rows = np.flatnonzero((first_year <= self.years) & (self.years <= last_year))
+            period_anomalies = anomalies[rows]
+            for t, threshold in enumerate(thresholds):
+                hits = (period_anomalies > threshold if threshold >= 0
+                        else period_anomalies < threshold)
+                counts[:, p, t] = np.bincount(station_index[rows], weights=hits,
+                                              minlength=num_stations)
+            if per_year:
+                station_years = np.bincount(
+                    station_index[rows] * (last_year - first_year + 1)
+                    + self.years[rows] - first_year,
+                    minlength=num_stations * (last_year - first_year + 1))
+                num_years = np.count_nonzero(station_years.reshape(num_stations, -1), axis=1)
+                with np.errstate(invalid="ignore", divide="ignore"):
+                    counts[:, p] /= num_years[:, np.newaxis]
+
+        index = pd.MultiIndex.from_product(
+            [self.station_ids, [f"{first}–{last}" for first, last in periods]],
+            names=["station_id", "period"])
+        return pd.DataFrame(counts.reshape(-1, len(thresholds)), index=index, columns=thresholds)
+
+    def get_normals_frame(self, reference: Period, window: int = 1) -> pd.DataFrame:
+        """ Long dataframe (station_id, month, day, normal_avg, normal_max, normal_min). """
+        normals = self.get_normals(reference, window).reshape(self._num_keys, -1)
+        return pd.DataFrame({
+            "station_id": np.repeat(self.station_ids, DAYS_IN_LEAP_YEAR),
+            "month": np.tile(_LEAP_YEAR.month, len(self.station_ids)),
+            "day": np.tile(_LEAP_YEAR.day, len(self.station_ids)),
+        } | {f"normal_{c[1:]}": normals[:, i] for i, c in enumerate(TEMPERATURE_COLUMNS)})
+
+    def to_frame(self, reference: Period, window: int = 1) -> pd.DataFrame:
+        """ Long dataframe of all observations with their anomalies (as daily_anomalies in R). """
+        anomalies = self.get_anomalies(reference, window)
+        return pd.DataFrame(
+            {"date": self.dates,
+             "station_id": np.asarray(self.station_ids)[self._get_station_index()]}
+            | {c: self.values[:, i] for i, c in enumerate(TEMPERATURE_COLUMNS)}
+            | {c: anomalies[:, i] for i, c in enumerate(ANOMALY_COLUMNS)})
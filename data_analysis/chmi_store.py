@@ -0,0 +1,176 @@
+""" Compact columnar store of daily temperatures from ČHMÚ stations (see data/chmi). """
+
+import json
+from dataclasses import dataclass, fields
+from pathlib import Path
+from typing import Iterable, Optional
+
+import numpy as np
+import pandas as pd
+
+from data_analysis.cache_utils import get_cache_dir, get_file_hash, write_npy_atomically
+
+CHMI_DATA_DIR = Path(__file__).parents[1] / "data" / "chmi"
+
+TEMPERATURE_COLUMNS = ["tavg", "tmax", "tmin"]
+
+# Days are indexed by their position in a leap year, so that the same calendar day has the same
+# index in every year (0 for 1 January, 59 for 29 February, 365 for 31 December).
+DAYS_IN_LEAP_YEAR = 366
+_MONTH_OFFSETS = np.cumsum([0, 31, 29, 31, 30, 31, 30, 31, 31, 30, 31, 30])
+
+# Bump when the layout of the store changes, so that stations are converted again.
+_STORE_VERSION = 1
+_META_FILE = "meta.json"
+
+
+def get_day_index(months: np.ndarray | int, days: np.ndarray | int) -> np.ndarray:
+    """ Index of calendar days (given by month and day) in a leap year. """
+    return (_MONTH_OFFSETS[np.asarray(months) - 1] + np.asarray(days) - 1).astype(np.int16)
+
+
+@dataclass
+class StationSeries:
+    """
+    Daily temperatures (in °C) of a single station. Columns are arrays sorted by date, loaded
+    from the store they are memory-mapped, so slices are views which read only what is used.
+    """
+    station_id: str
+    dates: np.ndarray
+    day_index: np.ndarray
+    tavg: np.ndarray
+    tmax: np.ndarray
+    tmin: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.dates)
+
+    def _take(self, positions: slice | np.ndarray) -> "StationSeries":
+        return StationSeries(station_id=self.station_id,
+                             **{f.name: getattr(self, f.name)[positions]
+                                for f in fields(self) if f.name != "station_id"})
+
+    def get_years(self) -> np.ndarray:
+        return self.dates.astype("datetime64[Y]").astype(int) + 1970
+
+    def get_range(self, start: Optional[str] = None, end: Optional[str] = None) -> "StationSeries":
+        """ Days between the start and end dates (both inclusive, e.g. "1961-01-01"). """
+        begin = 0 if start is None else np.searchsorted(self.dates, np.datetime64(start, "D"))
+        stop = (len(self.dates) if end is None
+                else np.searchsorted(self.dates, np.datetime64(end, "D"), side="right"))
+        return self._take(slice(begin, stop))
+
+    def get_day(self, month: int, day: int) -> "StationSeries":
+        """ The given calendar day in all years. """
+        return self._take(np.flatnonzero(self.day_index == get_day_index(month, day)))
+
+    def to_frame(self) -> pd.DataFrame:
+        """ Dataframe indexed by dates with a column per temperature. """
+        return pd.DataFrame({column: getattr(self, column) for column in TEMPERATURE_COLUMNS},
+                            index=pd.DatetimeIndex(self.dates, name="date"))
+
+
+def read_station_csv(csv_path: str | Path, station_id: Optional[str] = None) -> StationSeries:
+    """ Parse a station CSV (with columns Y, M, D, TAVG, TMAX, TMIN) into arrays. """
+    df = pd.read_csv(csv_path, dtype={"Y": np.int32, "M": np.int8, "D": np.int8,
+                                      "TAVG": np.float32, "TMAX": np.float32,
+                                      "TMIN": np.float32})
+    dates = pd.to_datetime(pd.DataFrame({"year": df["Y"], "month": df["M"], "day": df["D"]}))
+    order = np.argsort(dates.to_numpy(), kind="stable")
+    df = df.iloc[order]
+    return StationSeries(
+        station_id=station_id or Path(csv_path).stem,
+        dates=dates.to_numpy()[order].astype("datetime64[D]"),
+        day_index=get_day_index(df["M"].to_numpy(), df["D"].to_numpy()),
+        tavg=df["TAVG"].to_numpy(),
+        tmax=df["TMAX"].to_numpy(),
+        tmin=df["TMIN"].to_numpy(),
+    )
+
+
+class StationStore:
+    """
+    Directory with one partition per station, each with a .npy file per column (dates, indices of
+    days and float32 temperatures). Stations are converted from CSV only once (and again when
+    the CSV changes) and memory-mapped when loaded.
+    """
+
+    def __init__(self, store_dir: Optional[str | Path] = None):
+        self.store_dir = Path(store_dir) if store_dir is not None else get_cache_dir("chmi")
+        self._stations: dict[str, StationSeries] = {}
+
+    def _get_meta(self, station_id: str) -> Optional[dict]:
+        meta_path = self.store_dir / station_id / _META_FILE
+        if not meta_path.exists():
+            return None
+        with open(meta_path, encoding="utf8") as f:
+            return json.load(f)
+
+    def add_csv(self, csv_path: str | Path, station_id: Optional[str] = None) -> str:
+        """ Convert a station CSV into the store unless it is there already. """
+        station_id = station_id or Path(csv_path).stem
+        source_hash = get_file_hash(csv_path)
+        meta = {"version": _STORE_VERSION, "source_hash": source_hash}
+        if self._get_meta(station_id) == meta:
+            return station_id
+
+        station_dir = self.store_dir / station_id
+        station_dir.mkdir(parents=True, exist_ok=True)
+        # The metadata are written last, so that a partially written station is converted again.
+        (station_dir / _META_FILE).unlink(missing_ok=True)
+        series = read_station_csv(csv_path, station_id)
+        for f in fields(series):
+            if f.name != "station_id":
+                write_npy_atomically(getattr(series, f.name), station_dir / f"{f.name}.npy")
+        with open(station_dir / _META_FILE, "w", encoding="utf8") as f:
+            json.dump(meta, f)
+        self._stations.pop(station_id, None)
+        return station_id
+
+    def add_csv_dir(self, csv_dir: str | Path = CHMI_DATA_DIR) -> list[str]:
+        """ Convert all station CSVs in a directory (such as data/chmi). """
+        return [self.add_csv(csv_path) for csv_path in sorted(Path(csv_dir).glob("*.csv"))]
+
+    def get_station_ids(self) -> list[str]:
+        return sorted(path.parent.name for path in self.store_dir.glob(f"*/{_META_FILE}"))
+
+    def load(self, station_id: str) -> StationSeries:
+        """ Memory-mapped series of a station. """
+        if station_id not in self._stations:
+            station_dir = self.store_dir / station_id
+            if self._get_meta(station_id) is None:
+                raise KeyError(f"Station {station_id} is not in the store {self.store_dir}")
+            columns = {f.name: np.load(station_dir / f"{f.name}.npy", mmap_mode="r")
+                       for f in fields(StationSeries) if f.name != "station_id"}
+            self._stations[station_id] = StationSeries(station_id=station_id, **columns)
+        return self._stations[station_id]
+
+    def _to_frame(self, series: Iterable[StationSeries]) -> pd.DataFrame:
+        frames = [s.to_frame().reset_index().assign(station_id=s.station_id) for s in series]
+        columns = ["date", "station_id"] + TEMPERATURE_COLUMNS
+        if not frames:
+            return pd.DataFrame(columns=columns)
+        return pd.concat(frames, ignore_index=True)[columns]
+
+    def query(self, station_ids: Optional[list[str]] = None, start: Optional[str] = None,
+              end: Optional[str] = None) -> pd.DataFrame:
+        """
+        Long dataframe (date, station_id, tavg, tmax, tmin) of the given stations (all by
+        default) between the start and end dates (both inclusive).
+        """
+        station_ids = station_ids or self.get_station_ids()
+        return self._to_frame(self.load(id).get_range(start, end) for id in station_ids)
+
+    def query_day(self, month: int, day: int,
+                  station_ids: Optional[list[str]] = None) -> pd.DataFrame:
+        """ Long dataframe (as in query) with the given calendar day in all years. """
+        station_ids = station_ids or self.get_station_ids()
+        return self._to_frame(self.load(id).get_day(month, day) for id in station_ids)
+
+
+def get_station_store(store_dir: Optional[str | Path] = None,
+                      csv_dir: str | Path = CHMI_DATA_DIR) -> StationStore:
+    """ Store with all station CSVs from a directory (data/chmi by default) converted. """
+    store = StationStore(store_dir)
+    store.add_csv_dir(csv_dir)
+    return store
@@ -0,0 +1,142 @@
+""" Resolution of names of countries (as used by global datasets) to ISO 3166-1 alpha-3 codes. """
+
+import re
+import unicodedata
+from pathlib import Path
+from typing import Optional
+
+import pandas as pd
+import pycountry
+import yaml
+
+ALIASES_PATH = Path(__file__).parents[1] / "data" / "countries" / "aliases.yaml"
+
+# Normalized names of non-countries, resolved to no code.
+_NON_COUNTRY = ""
+
+
+def normalize_country_name(name: str) -> str:
+    """ Lower-case name without accents and punctuation, e.g. "cote d ivoire". """
+    name = unicodedata.normalize("NFKD", str(name))
+    name = "".join(char for char in name if not unicodedata.combining(char))
+    return " ".join(re.sub(r"[^\w]+", " ", name.casefold()).split())
+
+
+class CountryResolver:
+    """
+    Index of normalized names of countries built once from pycountry (names, official and common
+    names, alpha-2 and alpha-3 codes) and a persisted table of aliases, regional aggregates and
+    names which are not countries (see data/countries/aliases.yaml).
+    """
+
+    def __init__(self, aliases_path: str | Path = ALIASES_PATH):
+        self.aliases_path = Path(aliases_path)
+        with open(self.aliases_path, encoding="utf8") as f:
+            definition = yaml.safe_load(f) or {}
+
+        self.aliases: dict[str, str] = definition.get("aliases") or {}
+        self.aggregates: dict[str, dict] = definition.get("aggregates") or {}
+        self.non_countries: list[str] = definition.get("non_countries") or []
+
+        self.index: dict[str, str] = {}
+        for country in pycountry.countries:
+            for field in ("alpha_2", "alpha_3", "name", "official_name", "common_name"):
+                if hasattr(country, field):
+                    self.index[normalize_country_name(getattr(country, field))] = country.alpha_3
+        for name, code in self.aliases.items():
+            self.index[normalize_country_name(name)] = code
+
+        self.aggregate_index: dict[str, str] = {
+            normalize_country_name(name): code
+            for code, aggregate in self.aggregates.items()
+            for name in aggregate.get("names", []) + [code]
+        }
+        for name in self.non_countries:
+            self.index[normalize_country_name(name)] = _NON_COUNTRY
+
+    def add_alias(self, name: str, code: str, persist: bool = False) -> None:
+        """ Add an alias of a country, optionally also writing it into the aliases file. """
+        self.aliases[name] = code
+        self.index[normalize_country_name(name)] = code
+        if persist:
+            self.save_aliases()
+
+    def save_aliases(self) -> None:
+        """
+        Write aliases which differ from the aliases file into its aliases section. The rest of the
+        file (comments, aggregates and non-countries) is kept as it is.
+        """
+        with open(self.aliases_path, encoding="utf8") as f:
+            lines = f.read().splitlines(keepends=True)
+        persisted = (yaml.safe_load("".join(lines)) or {}).get("aliases") or {}
+        changed = {name: code for name, code in self.aliases.items() if persisted.get(name) != code}
+        if not changed:
+            return
+
+        if "aliases:\n" not in lines:
+            lines += ["\n" if lines else "", "aliases:\n"]
+        start = lines.index("aliases:\n") + 1
+        end = start
+        # The section ends with the first line which is not indented (e.g. an empty line).
+        while end < len(lines) and lines[end].startswith(" "):
+            end += 1
+        section = lines[start:end]
+        for i, line in enumerate(section):
+            name = next(iter(yaml.safe_load(line) or {}), None)
+            if name in changed:
+                section[i] = self._format_alias(name, changed.pop(name))
+        lines[start:end] = section + [self._format_alias(name, code)
+                                      for name, code in changed.items()]
+
+        with open(self.aliases_path, "w", encoding="utf8") as f:
+            f.writelines(lines)
+
+    @staticmethod
+    def _format_alias(name: str, code: str) -> str:
+        return "  " + yaml.safe_dump({name: code}, allow_unicode=True, width=1000)
+
+    def _resolve_normalized(self, name: str, aggregates: bool) -> Optional[str]:
+        if aggregates and name in self.aggregate_index:
+            return self.aggregate_index[name]
+        if name in self.aggregate_index:
+            return _NON_COUNTRY
+        return self.index.get(name)
+
+    def resolve_name(self, name: str, aggregates: bool = False) -> Optional[str]:
+        """ Code of a single country (or aggregate), None for non-countries and unknown names. """
+        return self._resolve_normalized(normalize_country_name(name), aggregates) or None
+
+    def resolve(self, names: pd.Series, aggregates: bool = False) -> pd.Series:
+        """
+        Codes of a whole column of names, each distinct name is resolved only once. Names of
+        non-countries (and of aggregates unless aggregates=True) resolve to missing values, unknown
+        names too and they are reported.
+        """
+        unique = pd.Series(names.dropna().unique())
+        normalized = unique.map(normalize_country_name)
+        codes = normalized.map(lambda name: self._resolve_normalized(name, aggregates))
+        unresolved = unique[codes.isna()].tolist()
+        if unresolved:
+            print(f"Warning: unresolved names of countries: {', '.join(map(str, unresolved))}")
+        translations = dict(zip(unique, codes.where(codes != _NON_COUNTRY)))
+        return names.map(translations)
+
+    def get_unresolved(self, names: pd.Series) -> list:
+        """ Distinct names which are neither known countries, aggregates nor non-countries. """
+        return [name for name in names.dropna().unique()
+                if self._resolve_normalized(normalize_country_name(name), True) is None]
+
+    def get_members(self, aggregate_code: str) -> list[str]:
+        """ Codes of the member countries of an aggregate (empty if they are not defined). """
+        return list(self.aggregates.get(aggregate_code, {}).get("members", []))
+
+
+_country_resolver: Optional[CountryResolver] = None
+
+
+def get_country_resolver() -> CountryResolver:
+    """ Resolver with the default aliases, built once per process. """
+    global _country_resolver
+    if _country_resolver is None:
+        _country_resolver = CountryResolver()
+    return _country_resolver
@@ -0,0 +1,159 @@
+""" Utils to load EDGAR emissions of greenhouse gases (xls releases in data/edgar) from a cache. """
+
+from enum import Enum, EnumMeta
+from pathlib import Path
+from typing import Iterable, Optional
+
+import numpy as np
+import pandas as pd
+
+from data_analysis.cache_utils import (
+    get_cache_dir,
+    get_content_key,
+    get_file_hash,
+    write_parquet_atomically,
+)
+
+EDGAR_DATA_DIR = Path(__file__).parents[1] / "data" / "edgar"
+
+
+class Gas(Enum):
+    CO2 = "CO2"
+    CH4 = "CH4"
+    N2O = "N2O"
+
+
+# Files of gases in releases (directories in data/edgar).
+EDGAR_RELEASES: dict[str, dict[Gas, str]] = {
+    "v6.0": {
+        Gas.CO2: "v60_CO2_excl_short-cycle_org_C_1970_2018.xls",
+        Gas.CH4: "v60_CH4_1970_2018.xls",
+        Gas.N2O: "v60_N2O_1970_2018.xls",
+    },
+    "v8.0": {
+        Gas.CO2: "IEA_EDGAR_CO2_1970_2022.xlsx",
+        Gas.CH4: "EDGAR_CH4_1970_2022.xlsx",
+        Gas.N2O: "EDGAR_N2O_1970_2022.xlsx",
+    },
+}
+
+# Global warming potentials (over 100 years) of IPCC assessment reports.
+GWP_SETS: dict[str, dict[Gas, float]] = {
+    "AR4": {Gas.CO2: 1, Gas.CH4: 25, Gas.N2O: 298},
+    "AR5": {Gas.CO2: 1, Gas.CH4: 28, Gas.N2O: 265},
+    "AR6": {Gas.CO2: 1, Gas.CH4: 27.9, Gas.N2O: 273},
+}
+
+# Codes of international shipping and aviation (not attributed to countries).
+INTERNATIONAL_CODES = ["SEA", "AIR"]
+
+# Sheet with emissions by sectors (IPCC 2006 codes), the header is at the 10th row.
+_SECTORS_SHEET = "IPCC 2006"
+_HEADER_ROW = 9
+
+# Bump when the parsing changes, so that stale cache entries are not reused.
+_CACHE_VERSION = 2
+
+
+def _read_sheet(path: Path, gas: Gas) -> pd.DataFrame:
+    """ Emissions (in kt) of a gas by country, sector and year as a long table. """
+    df = pd.read_excel(path, sheet_name=_SECTORS_SHEET, header=_HEADER_ROW)
+    sector_column = next(column for column in df.columns if str(column).startswith("ipcc_code"))
+    year_columns = [column for column in df.columns if str(column).startswith("Y_")]
+    id_columns = ["Country_code_A3", sector_column] + (
+        ["fossil_bio"] if "fossil_bio" in df.columns else [])
+    df = df.melt(id_vars=id_columns, value_vars=year_columns, var_name="year", value_name="value")
+    df = df.rename(columns={"Country_code_A3": "code", sector_column: "sector"})
+    df["year"] = df["year"].str[2:].astype(int)
+    df["gas"] = gas.value
+    return df.dropna(subset=["value"])
+
+
+def _get_edgar_cache_path(version: str, gas: Gas, data_dir: Path) -> Path:
+    """
+    Returns the path of the long table of a gas in a release, parsing its xls file on the first
+    call. The table is keyed by the hash of the file, so that an updated file is parsed again.
+    """
+    path = data_dir / version / EDGAR_RELEASES[version][gas]
+    key = get_content_key(version, gas.value, get_file_hash(path))
+    cache_path = (get_cache_dir("edgar")
+                  / f"{version}-{gas.value}-{key[:24]}-v{_CACHE_VERSION}.parquet")
+    if not cache_path.exists():
+        df = _read_sheet(path, gas)
+        for column in ["gas", "code", "sector", "fossil_bio"]:
+            if column in df.columns:
+                df[column] = df[column].astype("category")
+        columns = ["gas", "code", "year", "sector"] + (
+            ["fossil_bio"] if "fossil_bio" in df.columns else []) + ["value"]
+        write_parquet_atomically(df[columns], cache_path, index=False)
+    return cache_path
+
+
+def get_group_codes(group: EnumMeta | Iterable[str]) -> list[str]:
+    """ Codes of a group given as an enum of geos (such as edgar_geo.EU) or codes. """
+    if isinstance(group, EnumMeta):
+        return [member.value for member in group]
+    return list(group)
+
+
+def load_edgar(version: str = "v8.0", gases: Optional[list[Gas]] = None,
+               codes: Optional[EnumMeta | Iterable[str]] = None,
+               years: Optional[tuple[int, int]] = None, international: bool = True,
+               data_dir: str | Path = EDGAR_DATA_DIR) -> pd.DataFrame:
+    """
+    Import emissions (in kt of each gas) of a release as a long table with columns gas, code,
+    year, sector (IPCC 2006 code), fossil_bio (if present in the release) and value. Rows can be
+    restricted to gases, codes of countries (e.g. edgar_geo.EU) and a range of years (inclusive),
+    international shipping and aviation can be left out. Each xls file is parsed only once and
+    only files of the given gases are read.
+    """
+    if version not in EDGAR_RELEASES:
+        raise KeyError(f"Unknown EDGAR release {version}, known are {', '.join(EDGAR_RELEASES)}")
+    filters = []
+    if codes is not None:
+        filters.append(("code", "in", get_group_codes(codes)))
+    if not international:
+        filters.append(("code", "not in", INTERNATIONAL_CODES))
+    if years is not None:
+        filters += [("year", ">=", years[0]), ("year", "<=", years[1])]
+    gases = list(EDGAR_RELEASES[version]) if gases is None else gases
+    df = pd.concat([pd.read_parquet(_get_edgar_cache_path(version, gas, Path(data_dir)),
+                                    filters=filters or None) for gas in gases],
+                   ignore_index=True)
+    # Categories of the files differ, concatenated text columns are categorical again.
+    for column in ["gas", "code", "sector", "fossil_bio"]:
+        if column in df.columns:
+            df[column] = df[column].astype("category")
+    return df
+
+
+def get_gwp_weights(df: pd.DataFrame, gwp: str | dict[Gas, float] = "AR5") -> np.ndarray:
+    """ GWP of the gas of each row, mapped once per distinct gas. """
+    gwp = GWP_SETS[gwp] if isinstance(gwp, str) else gwp
+    gases = df["gas"].astype("category").cat.remove_unused_categories()
+    missing = [gas for gas in gases.cat.categories if Gas(gas) not in gwp]
+    if missing:
+        raise ValueError(f"No GWP of {', '.join(missing)}")
+    weights = np.array([gwp[Gas(gas)] for gas in gases.cat.categories] + [np.nan])
+    return weights[gases.cat.codes.to_numpy()]
+
+
+def get_emissions_by_gas(df: pd.DataFrame, gwp: str | dict[Gas, float] = "AR5",
+                         by: Iterable[str] = ("code", "year"),
+                         groups: Optional[dict[str, EnumMeta | Iterable[str]]] = None
+                         ) -> pd.DataFrame:
+    """
+    Emissions (in kt) summed by the given columns with a column per gas and a column "ghg" in kt
+    CO2eq weighted by the GWP set (a single vectorized weighting of all rows). Groups of countries
+    (e.g. {"EU27": edgar_geo.EU}) are summed into rows of their codes instead.
+    """
+    by = list(by)
+    df = df.assign(ghg=df["value"] * get_gwp_weights(df, gwp))
+    if groups is not None:
+        df = pd.concat([df.iloc[:0]] + [df[df["code"].isin(get_group_codes(members))]
+                                        .assign(code=name) for name, members in groups.items()],
+                       ignore_index=True)
+    df_gases = df.pivot_table(index=by, columns="gas", values="value", aggfunc="sum",
+                              observed=True)
+    df_gases.columns = df_gases.columns.astype(str)
+    return df_gases.join(df.groupby(by, observed=True)["ghg"].sum(min_count=1))
@@ -0,0 +1,138 @@
+""" Utils to load the yearly electricity data of EMBER (long format) from a columnar cache. """
+
+import csv
+import os
+import shutil
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pa_csv
+import pyarrow.dataset as ds
+
+from data_analysis.cache_utils import get_cache_dir, get_file_hash
+from data_analysis.country_resolver import get_country_resolver
+
+EMBER_YEARLY_PATH = (Path(__file__).parents[1] / "data" / "ember"
+                     / "yearly_full_release_long_format.csv")
+
+# The cache is partitioned by these columns, so that filters on them only read matching files.
+PARTITION_COLUMNS = ["Category", "Unit"]
+
+# Units of values which can be summed over countries (unlike shares in % or intensities).
+ADDITIVE_UNITS = ["TWh", "GW", "mtCO2"]
+
+# Releases of the dataset name the column with ISO 3 codes differently.
+_CODE_COLUMNS = ["ISO 3 code", "Country code"]
+
+# Bump when the layout of the cache changes, so that stale cache entries are not reused.
+_CACHE_VERSION = 1
+
+
+def _read_csv(csv_path: str | Path) -> pa.Table:
+    """ Parse the CSV with text columns (areas, variables, codes, ...) dictionary-encoded. """
+    # Empty fields (such as codes of regions) are missing values, as in R's read_csv.
+    table = pa_csv.read_csv(csv_path,
+                            convert_options=pa_csv.ConvertOptions(strings_can_be_null=True))
+    for i, field in enumerate(table.schema):
+        if pa.types.is_string(field.type) or pa.types.is_large_string(field.type):
+            table = table.set_column(i, field.name, pc.dictionary_encode(table[field.name]))
+    return table
+
+
+def _get_ember_cache_path(csv_path: str | Path) -> Path:
+    """
+    Returns the directory of the partitioned columnar copy of the CSV, converting it on the
+    first call. The copy is keyed by the hash of the file, so that new releases are converted
+    again.
+    """
+    cache_path = get_cache_dir("ember") / f"{get_file_hash(csv_path)[:24]}-v{_CACHE_VERSION}"
+    if not cache_path.exists():
+        tmp_path = cache_path.with_suffix(".tmp")
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        ds.write_dataset(_read_csv(csv_path), tmp_path, format="parquet",
+                         partitioning=PARTITION_COLUMNS, partitioning_flavor="hive")
+        os.replace(tmp_path, cache_path)
+    return cache_path
+
+
+def _get_csv_columns(csv_path: str | Path) -> list[str]:
+    """ Names of the columns in the header of the CSV. """
+    with open(csv_path, encoding="utf8", newline="") as f:
+        return next(csv.reader(f))
+
+
+def get_code_column(df: pd.DataFrame) -> str:
+    """ Name of the column with ISO 3 codes of areas in this release of the dataset. """
+    return next(column for column in _CODE_COLUMNS if column in df.columns)
+
+
+def load_ember_yearly(csv_path: str | Path = EMBER_YEARLY_PATH,
+                      columns: Optional[list[str]] = None,
+                      categories: Optional[list[str]] = None,
+                      units: Optional[list[str]] = None,
+                      variables: Optional[list[str]] = None,
+                      areas: Optional[list[str]] = None,
+                      eu: Optional[bool] = None,
+                      years: Optional[tuple[int, int]] = None) -> pd.DataFrame:
+    """
+    Import the yearly data (as in the CSV) reading only the given columns and rows matching all
+    given filters: categories (e.g. "Electricity generation"), units (e.g. "TWh"), variables,
+    areas (names as in the column Area), membership in the EU and a range of years (inclusive).
+    Filters on categories and units only read their partitions. Text columns are categorical,
+    columns are in the order of the CSV.
+    """
+    filters = []
+    for column, values in (("Category", categories), ("Unit", units),
+                           ("Variable", variables), ("Area", areas)):
+        if values is not None:
+            filters.append((column, "in", list(values)))
+    if eu is not None:
+        filters.append(("EU", "==", int(eu)))
+    if years is not None:
+        filters += [("Year", ">=", years[0]), ("Year", "<=", years[1])]
+    df = pd.read_parquet(_get_ember_cache_path(csv_path), columns=columns,
+                         filters=filters or None)
+    # Partition columns are read last, put them back to their place in the CSV.
+    return df[[column for column in _get_csv_columns(csv_path) if column in df.columns]]
+
+
+def aggregate_areas(df: pd.DataFrame, groups: Optional[dict[str, list[str]]] = None,
+                    value_column: str = "Value") -> pd.DataFrame:
+    """
+    Sum values of countries into groups (codes of groups to ISO 3 codes of their members, EU27
+    from data/countries/aliases.yaml by default) per year, category, subcategory, variable and
+    unit (those present in the dataframe). Countries are mapped to groups once per distinct code
+    and rows are grouped by integer codes of the categorical columns. The codes of groups are in
+    the column of ISO 3 codes. Aggregate areas of the dataset (such as "EU" or "World") have no
+    ISO 3 code of a country, so they are never added to groups (no double counting). Only values
+    in additive units (ADDITIVE_UNITS) are summed, rows with other units (such as shares in % or
+    intensities in gCO2/kWh) are left out with a warning.
+    """
+    if groups is None:
+        groups = {"EU27": get_country_resolver().get_members("EU27")}
+    code_column = get_code_column(df)
+    if "Unit" in df.columns:
+        is_additive = df["Unit"].isin(ADDITIVE_UNITS).to_numpy()
+        if not is_additive.all():
+            units = sorted(df.loc[~is_additive, "Unit"].astype(str).unique())
+            print(f"Warning: values in {', '.join(units)} cannot be summed, leaving them out.")
+            df = df[is_additive]
+    codes = df[code_column].astype("category")
+    keys = [column for column in ["Year", "Category", "Subcategory", "Variable", "Unit"]
+            if column in df.columns]
+
+    frames = []
+    for group, members in groups.items():
+        # Membership of each distinct code, gathered onto rows by their integer codes.
+        is_member = np.append(codes.cat.categories.isin(members), False)
+        rows = is_member[codes.cat.codes.to_numpy()]
+        df_group = (df.loc[rows, keys + [value_column]]
+                    .groupby(keys, observed=True, as_index=False)[value_column].sum())
+        frames.append(df_group.assign(**{code_column: group}))
+    if not frames:
+        return pd.DataFrame(columns=[code_column] + keys + [value_column])
+    return pd.concat(frames, ignore_index=True)[[code_column] + keys + [value_column]]
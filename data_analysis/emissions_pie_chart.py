@@ -1,11 +1,15 @@
 """ Utils to generate CSV data and plots for emissions pie charts. """
 
+from collections import Counter
 from dataclasses import dataclass
+from itertools import chain
 from typing import Optional
 
 import matplotlib.pyplot as plt
 import pandas as pd
 
+from data_analysis.sectors import TOTAL_EMISSIONS_CODES, aggregate_codes
+
 
 @dataclass
 class Wedge:
@@ -31,12 +35,7 @@ def _get_wedge(
 
 
 def get_total_emissions_value(df_crf_and_allowances: pd.DataFrame) -> float:
-    # The TOTX4_MEMONIA code was dropped in a 2025 revision, so we
-    # need to calculate it manually from the available components.
-    return (
-        df_crf_and_allowances.loc["TOTX4_MEMO", "value"]
-        + df_crf_and_allowances.loc["CRF1D1A", "value"]
-    )
+    return sum(df_crf_and_allowances.loc[key, "value"] for key in TOTAL_EMISSIONS_CODES)
 
 
 def get_emissions_value(key: str, df_crf_and_allowances: pd.DataFrame) -> float:
@@ -50,7 +49,10 @@ def get_emissions_value(key: str, df_crf_and_allowances: pd.DataFrame) -> float:
 def get_emissions_sum_value(
     keys: list[str], df_crf_and_allowances: pd.DataFrame
 ) -> float:
-    return sum(get_emissions_value(key, df_crf_and_allowances) for key in keys)
+    # Codes present more than once in the data (e.g. in both CRF and allowances rows) are summed.
+    values = df_crf_and_allowances["value"].groupby(level=0).sum(min_count=1)
+    coefficients = pd.Series(Counter(keys), dtype=float).to_frame("value")
+    return aggregate_codes(values.to_frame().T, coefficients)["value"].iloc[0]
 
 
 def get_emissions_wedges(
@@ -79,6 +81,87 @@ def get_emissions_wedges(
     return output
 
 
+@dataclass
+class WedgeMatrix:
+    """
+    Wedge definitions (with codes, remainders and nested breakdowns) compiled into a linear map
+    from emissions of codes to values of wedges. A wedge is the sum of its codes, a remainder is
+    the value of its parent (or the total emissions for top-level wedges) minus all codes of its
+    siblings. Applied to a table with one row per geo and year and one column per code, it gives
+    the values of all inner and outer wedges at once.
+    """
+    wedges: pd.DataFrame
+    matrix: pd.DataFrame
+    total: pd.Series
+
+    @classmethod
+    def from_definition(cls, definition: list[dict]) -> "WedgeMatrix":
+        wedges: list[dict] = []
+        coefficients: list[Counter] = []
+
+        def add_wedges(definition: list[dict], parent_coefficients: Counter,
+                       parent_id: Optional[str], depth: int) -> None:
+            all_codes = sum((wedge_def.get("codes", []) for wedge_def in definition), start=[])
+            for wedge_def in definition:
+                if "codes" in wedge_def:
+                    wedge_coefficients = Counter(wedge_def["codes"])
+                elif "remainder" in wedge_def:
+                    wedge_coefficients = parent_coefficients.copy()
+                    wedge_coefficients.subtract(all_codes)
+                else:
+                    assert False, "A definition must have codes or remainder"
+
+                wedge = _get_wedge(wedge_def, 0.0, parent_id)
+                wedges.append(vars(wedge) | {"depth": depth})
+                coefficients.append(wedge_coefficients)
+                if "breakdown" in wedge_def:
+                    add_wedges(wedge_def["breakdown"], wedge_coefficients, wedge.id, depth + 1)
+
+        total = Counter(TOTAL_EMISSIONS_CODES)
+        add_wedges(definition, total, None, 0)
+
+        df_wedges = pd.DataFrame(wedges).drop(columns="value").set_index("id")
+        codes = list(dict.fromkeys(chain(total, *coefficients)))
+        matrix = pd.DataFrame(coefficients, index=df_wedges.index, columns=codes)
+        return cls(wedges=df_wedges, matrix=matrix.T.fillna(0.0).astype(float),
+                   total=pd.Series(total, index=codes, dtype=float).fillna(0.0))
+
+    def get_values(self, df_codes: pd.DataFrame) -> pd.DataFrame:
+        """
+        Values of all wedges (columns by full wedge ids) for each row of a table with one column
+        per code (e.g. from pivot_emissions_panel). Codes missing in the table are reported once
+        and counted as 0.0.
+        """
+        return aggregate_codes(df_codes, self.matrix)
+
+    def get_total_values(self, df_codes: pd.DataFrame) -> pd.Series:
+        """ Total emissions for each row of a table with one column per code. """
+        return aggregate_codes(df_codes, self.total.to_frame("total"))["total"]
+
+    def get_wedges(self, values: pd.Series, depth: int = 0) -> list[Wedge]:
+        """
+        Wedges of the given depth (0 for the inner circle, 1 for the outer one) for a single row
+        of the values returned by get_values.
+        """
+        df = self.wedges[self.wedges["depth"] == depth]
+        return [
+            Wedge(id=id, value=values[id], label=row["label"], color=row["color"],
+                  parent_id=None if pd.isna(row["parent_id"]) else row["parent_id"])
+            for id, row in df.iterrows()
+        ]
+
+
+def pivot_emissions_panel(df_panel: pd.DataFrame) -> pd.DataFrame:
+    """
+    Turn a panel indexed by (geo, src_crf, year) (as returned by get_eurostat_crf_panel) into a
+    table indexed by (geo, year) with one column per CRF code. Geos and years with no data at
+    all are dropped.
+    """
+    df = df_panel["value"].unstack("src_crf").dropna(how="all")
+    df.columns = df.columns.astype(str)
+    return df
+
+
 def print_emissions_wedges_to_csv(wedges: list[Wedge], csv_path: str) -> pd.DataFrame:
     df = pd.DataFrame(wedges).set_index("id")
     # Remove wedges with empty labels and remove the color column (not needed by Illustrator).
@@ -93,8 +176,10 @@ def draw_emissions_pie_chart(
     inner_wedges: list[Wedge],
     outer_wedges: list[Wedge],
     total_value: float,
+    output_path: Optional[str] = None,
 ) -> None:
-    """Define parameters to draw the plot"""
+    """Define parameters to draw the plot. The plot is saved into output_path if given,
+    shown otherwise."""
     fig, ax = plt.subplots(figsize=(12, 12))
     fig.patch.set_facecolor("white")
     inner_size = 0.35
@@ -138,4 +223,8 @@ def draw_emissions_pie_chart(
     total_emisions = round(total_value, 2)
     ax.annotate(total_emisions, xy=(0.1, 0.1), xytext=(-0.15, -0.01), fontsize=25)
 
-    plt.show()
+    if output_path is None:
+        plt.show()
+    else:
+        fig.savefig(output_path)
+        plt.close(fig)
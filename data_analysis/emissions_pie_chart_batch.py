@@ -0,0 +1,216 @@
+"""
+Generates emissions pie chart packages (Illustrator CSVs and a preview chart) for many geos and
+years at once, e.g.:
+
+    python -m data_analysis.emissions_pie_chart_batch --geos CZ SK EU27_2020 --years 2022 2023
+
+The CRF panel is loaded once and all wedges are computed in a single vectorized pass, only writing
+the outputs (into a directory per geo) is distributed to a process pool.
+
+Only definitions from CRF codes are supported: wedges of individual installations from verified
+emissions (allowances), as in the CZ notebook, are left to the notebooks.
+"""
+
+import argparse
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from datetime import date
+from pathlib import Path
+
+import matplotlib
+import pandas as pd
+
+from data_analysis.emissions_pie_chart import (
+    Wedge,
+    WedgeMatrix,
+    draw_emissions_pie_chart,
+    pivot_emissions_panel,
+    print_emissions_wedges_to_csv,
+)
+from data_analysis.eurostat_crf_utils import get_eurostat_crf_panel
+from data_analysis.eurostat_geo import Geo, eu27_geo_dict
+from data_analysis.eurostat_population_utils import get_eurostat_population_data_for_geo
+from data_analysis.illustrator_strings import czech_float, print_illustrator_strings_to_csv
+from data_analysis.sectors import (
+    Sector,
+    Subsector,
+    SubsectorPalette,
+    get_sector_definition,
+    get_subsector_definition,
+)
+
+
+def get_default_definition() -> list[dict]:
+    """
+    Definition of the chart from CRF codes only (as in the EU notebook). Colors come from a fresh
+    palette, so they are the same in every process.
+    """
+    palette = SubsectorPalette()
+    return [
+        get_sector_definition(Sector.INDUSTRY) |
+        {'breakdown': [
+            get_subsector_definition(Sector.INDUSTRY, Subsector.METAL, palette),
+            get_subsector_definition(Sector.INDUSTRY, Subsector.MINERAL, palette),
+            get_subsector_definition(Sector.INDUSTRY, Subsector.FUELS, palette),
+            {'id': 'chemical',
+             'label': 'Chemický průmysl',
+             'color': palette.get_next_color(Sector.INDUSTRY),
+             'codes': ['CRF1A2C', 'CRF2B']},
+            {'id': 'f-gases',
+             'label': 'F-plyny',
+             'color': palette.get_next_color(Sector.INDUSTRY),
+             'codes': ['CRF2F']},
+            {'id': 'other',
+             'label': 'Ostatní průmysl',
+             'color': palette.get_next_color(Sector.INDUSTRY),
+             'remainder': True},
+        ]},
+        get_sector_definition(Sector.TRANSPORT) |
+        {'breakdown': [
+            get_subsector_definition(Sector.TRANSPORT, Subsector.CARS, palette),
+            get_subsector_definition(Sector.TRANSPORT, Subsector.TRUCKS_BUSES, palette),
+            get_subsector_definition(Sector.TRANSPORT, Subsector.AIRPLANES, palette),
+            {'id': 'other',
+             'label': 'Ostatní doprava',
+             'color': palette.get_next_color(Sector.TRANSPORT),
+             'remainder': True}
+        ]},
+        get_sector_definition(Sector.ELECTRICITY_HEAT),
+        get_sector_definition(Sector.AGRICULTURE),
+        get_sector_definition(Sector.BUILDINGS),
+        get_sector_definition(Sector.WASTE),
+        get_sector_definition(Sector.OTHER),
+    ]
+
+
+@dataclass
+class PieChartPackage:
+    """ Everything needed to write the outputs for a single geo and year. """
+    geo: str
+    year: int
+    inner_wedges: list[Wedge]
+    outer_wedges: list[Wedge]
+    total_value: float
+    strings: dict[str, str]
+
+
+# Names (in locative and genitive) and slugs of geos with their own notebook.
+NOTEBOOK_STRINGS: dict[str, dict[str, str]] = {
+    Geo.CZ.value: {"country-name-l": "v ČR", "country-name-g": "České republiky",
+                   "slug": "emise-cr"},
+    Geo.SK.value: {"country-name-l": "Slovenska", "country-name-g": "Slovenska",
+                   "slug": "emise-sr"},
+    Geo.EU27.value: {"country-name-l": "v EU", "country-name-g": "Evropské unie",
+                     "slug": "emise-eu-detail"},
+}
+
+# Decimals of the total and LULUCF emissions (in Mt CO2eq), the EU is in whole megatons.
+_WEIGHT_DECIMALS = {Geo.EU27.value: 0}
+
+
+def _get_names(geo: str) -> dict[str, str]:
+    if geo in NOTEBOOK_STRINGS:
+        return NOTEBOOK_STRINGS[geo]
+    name = {key.value: name for key, name in eu27_geo_dict.items()}.get(geo, geo)
+    return {"country-name-l": f"v zemi {name}", "country-name-g": f"země {name}",
+            "slug": f"emise-{geo.lower()}"}
+
+
+def _get_strings(geo: str, year: int, total_value: float, lulucf_emissions: float) -> dict:
+    """ Strings with the same keys as in the pie chart notebooks. """
+    population = get_eurostat_population_data_for_geo(geo, year)
+    emissions_per_person = total_value * 1_000_000 / population
+    lulucf_emissions_abs = abs(lulucf_emissions)
+    names = _get_names(geo)
+    decimals = _WEIGHT_DECIMALS.get(geo, 2)
+    return {
+        "country-name-l": names["country-name-l"],
+        "country-name-g": names["country-name-g"],
+        "year": year,
+        "total-weight": czech_float(total_value, decimals),
+        "total-per-person": czech_float(emissions_per_person, 2),
+        "lulucf-emissions-abs": czech_float(lulucf_emissions_abs, decimals),
+        "lulucf-emissions-pct": czech_float(lulucf_emissions_abs / total_value * 100, 0),
+        "data-source": "Evropská agentura pro životní prostředí",
+        "version": date.today().strftime("%Y-%m-%d"),
+        "slug": names["slug"],
+    }
+
+
+def get_pie_chart_packages(
+    definition: list[dict], geos: list[str], years: list[int]
+) -> list[PieChartPackage]:
+    """ Compute wedges of all combinations of geos and years from the shared CRF panel. """
+    df_codes = pivot_emissions_panel(get_eurostat_crf_panel())
+    keys = [(geo, year) for geo in geos for year in years]
+    missing = [key for key in keys if key not in df_codes.index]
+    if missing:
+        print(f"Warning: no CRF data for {', '.join(f'{geo} {year}' for geo, year in missing)}, "
+              "skipped.")
+    df_codes = df_codes.loc[[key for key in keys if key not in missing]]
+
+    matrix = WedgeMatrix.from_definition(definition)
+    df_values = matrix.get_values(df_codes)
+    total_values = matrix.get_total_values(df_codes)
+    lulucf_values = df_codes.get("CRF4", pd.Series(0.0, index=df_codes.index)).fillna(0.0)
+
+    packages = []
+    for geo, year in df_codes.index:
+        values = df_values.loc[(geo, year)]
+        total_value = total_values.loc[(geo, year)]
+        if pd.isna(total_value):
+            print(f"Warning: missing total emissions for {geo} {year}, skipped.")
+            continue
+        packages.append(PieChartPackage(
+            geo=geo,
+            year=year,
+            inner_wedges=matrix.get_wedges(values, depth=0),
+            outer_wedges=matrix.get_wedges(values, depth=1),
+            total_value=total_value,
+            strings=_get_strings(geo, year, total_value, lulucf_values.loc[(geo, year)]),
+        ))
+    return packages
+
+
+def write_pie_chart_package(package: PieChartPackage, output_dir: str | Path) -> Path:
+    """ Write the CSVs for Illustrator and the chart into a directory of the geo. """
+    geo_dir = Path(output_dir) / package.geo
+    geo_dir.mkdir(parents=True, exist_ok=True)
+    prefix = geo_dir / f"output-{package.geo}-{package.year}"
+    wedges = package.inner_wedges + package.outer_wedges
+    print_emissions_wedges_to_csv(wedges, f"{prefix}-wedges.csv")
+    print_illustrator_strings_to_csv(package.strings, f"{prefix}-strings.csv")
+    draw_emissions_pie_chart(package.geo, package.year, package.inner_wedges,
+                             package.outer_wedges, package.total_value,
+                             output_path=f"{prefix}-chart.png")
+    return geo_dir
+
+
+def _init_worker() -> None:
+    # Workers only save charts into files.
+    matplotlib.use("Agg")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Generate emissions pie chart packages for many geos and years.")
+    parser.add_argument("--geos", nargs="+", default=[geo.value for geo in Geo],
+                        help="Eurostat geo codes (all EU countries and EU27_2020 by default).")
+    parser.add_argument("--years", nargs="+", type=int, required=True)
+    parser.add_argument("--output-dir", default="output")
+    parser.add_argument("--jobs", type=int, default=os.cpu_count(),
+                        help="Number of worker processes.")
+    args = parser.parse_args()
+
+    packages = get_pie_chart_packages(get_default_definition(), args.geos, args.years)
+    with ProcessPoolExecutor(max_workers=args.jobs, initializer=_init_worker) as executor:
+        futures = [executor.submit(write_pie_chart_package, package, args.output_dir)
+                   for package in packages]
+        for package, future in zip(packages, futures):
+            try:
+                geo_dir = future.result()
+                print(f"{package.geo} {package.year}: written into {geo_dir}")
+            except Exception as e:
+                # E.g. negative remainders which cannot be drawn, other packages are still written.
+                print(f"Warning: {package.geo} {package.year} failed: {e!r}")
@@ -0,0 +1,144 @@
+""" Local on-disk cache of datasets downloaded from the Eurostat API. """
+
+import os
+import time
+from pathlib import Path
+from typing import Any, Optional, Protocol
+
+import eurostat
+import pandas as pd
+
+from data_analysis.cache_utils import get_cache_dir, get_content_key, write_parquet_atomically
+
+# Cached slices older than this are downloaded again (unless in offline mode).
+DEFAULT_TTL_SECONDS = 7 * 24 * 60 * 60
+
+# Set this environment variable to "1" to never touch the network.
+OFFLINE_ENV = "FAKTAOKLIMATU_OFFLINE"
+
+# Filter parameters which do not select a dimension but a range of periods.
+_PERIOD_PARS = ("startPeriod", "endPeriod")
+
+
+class EurostatClient(Protocol):
+    """ Anything with the interface of the `eurostat` module used by this package. """
+
+    def get_data_df(self, code: str, filter_pars: Optional[dict] = None) -> pd.DataFrame:
+        ...
+
+
+class EurostatOfflineError(LookupError):
+    """ Raised when a dataset is requested in offline mode and it is not cached. """
+
+
+class LocalEurostatClient:
+    """
+    Stand-in for the Eurostat client which serves datasets from local fixtures instead of the
+    network. Fixtures are dataframes (or paths to CSV / parquet files) in the same wide format
+    as returned by `eurostat.get_data_df`, keyed by dataset code.
+    """
+
+    def __init__(self, fixtures: dict[str, pd.DataFrame | str | Path]):
+        self.fixtures = fixtures
+
+    def _load_fixture(self, code: str) -> pd.DataFrame:
+        if code not in self.fixtures:
+            raise KeyError(f"No fixture for dataset {code}")
+        fixture = self.fixtures[code]
+        if isinstance(fixture, pd.DataFrame):
+            return fixture.copy()
+        if str(fixture).endswith(".parquet"):
+            return pd.read_parquet(fixture)
+        return pd.read_csv(fixture)
+
+    def get_data_df(self, code: str, filter_pars: Optional[dict] = None) -> pd.DataFrame:
+        df = self._load_fixture(code)
+        df.columns = df.columns.map(str)
+        filter_pars = filter_pars or {}
+
+        for key, value in filter_pars.items():
+            if key in _PERIOD_PARS:
+                continue
+            # The geo dimension is merged with time in the name of the column.
+            column = next((col for col in df.columns if col.split("\\")[0] == key), None)
+            if column is None:
+                raise KeyError(f"Unknown dimension {key} in dataset {code}")
+            values = value if isinstance(value, list) else [value]
+            df = df[df[column].astype(str).isin([str(v) for v in values])]
+
+        start = filter_pars.get("startPeriod")
+        end = filter_pars.get("endPeriod")
+        period_columns = [col for col in df.columns if col.isdigit()]
+        dropped = [col for col in period_columns
+                   if (start is not None and int(col) < int(start))
+                   or (end is not None and int(col) > int(end))]
+        return df.drop(columns=dropped).reset_index(drop=True)
+
+
+_client: EurostatClient = eurostat
+_cache_dir: Optional[Path] = None
+_ttl_seconds: float = DEFAULT_TTL_SECONDS
+_offline: bool = os.environ.get(OFFLINE_ENV) == "1"
+
+
+def configure_eurostat_cache(client: Optional[EurostatClient] = None,
+                             cache_dir: Optional[str | Path] = None,
+                             ttl_seconds: Optional[float] = None,
+                             offline: Optional[bool] = None) -> None:
+    """
+    Change the settings of the cache. Only the given settings are changed. The `client` can be
+    replaced e.g. by a `LocalEurostatClient` serving fixtures.
+    """
+    global _client, _cache_dir, _ttl_seconds, _offline
+    if client is not None:
+        _client = client
+    if cache_dir is not None:
+        _cache_dir = Path(cache_dir)
+        _cache_dir.mkdir(parents=True, exist_ok=True)
+    if ttl_seconds is not None:
+        _ttl_seconds = ttl_seconds
+    if offline is not None:
+        _offline = offline
+
+
+def _normalize_filter_pars(filter_pars: dict) -> dict[str, Any]:
+    """ Normalize filter values so that e.g. 2023 and "2023" map to the same cache entry. """
+    normalized = {}
+    for key, value in filter_pars.items():
+        if isinstance(value, (list, tuple, set)):
+            normalized[key] = sorted(str(v) for v in value)
+        else:
+            normalized[key] = str(value)
+    return normalized
+
+
+def _get_cache_path(code: str, filter_pars: dict) -> Path:
+    cache_dir = _cache_dir or get_cache_dir("eurostat")
+    key = get_content_key(code, _normalize_filter_pars(filter_pars))
+    return cache_dir / f"{code}-{key[:24]}.parquet"
+
+
+def get_eurostat_data_df(code: str, filter_pars: Optional[dict] = None) -> pd.DataFrame:
+    """
+    Drop-in replacement for `eurostat.get_data_df` which keeps the downloaded slices in a local
+    cache keyed by dataset code and normalized filter parameters. Cached slices are reused until
+    they expire; in offline mode they are reused regardless of age and the network is never
+    touched. Column names are always strings.
+    """
+    filter_pars = filter_pars or {}
+    path = _get_cache_path(code, filter_pars)
+
+    if path.exists():
+        age = time.time() - path.stat().st_mtime
+        if _offline or age < _ttl_seconds:
+            return pd.read_parquet(path)
+    if _offline:
+        raise EurostatOfflineError(
+            f"Dataset {code} with filter {filter_pars} is not cached and offline mode is on")
+
+    df = _client.get_data_df(code, filter_pars=filter_pars)
+    if df is None:
+        raise LookupError(f"Eurostat returned no data for {code} with filter {filter_pars}")
+    df.columns = df.columns.map(str)
+    write_parquet_atomically(df, path, index=False)
+    return df
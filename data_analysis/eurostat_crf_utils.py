@@ -2,9 +2,9 @@
 
 from typing import Optional
 
-import eurostat
 import pandas as pd
 
+from data_analysis.eurostat_cache import get_eurostat_data_df
 from data_analysis.eurostat_geo import Geo
 
 
@@ -26,7 +26,7 @@ def get_eurostat_crf_data(geo: Optional[Geo | str], crf_code: Optional[str], yea
         filter_pars["src_crf"] = crf_code
         main_dimension = "geo"
 
-    df = eurostat.get_data_df("env_air_gge", filter_pars=filter_pars)
+    df = get_eurostat_data_df("env_air_gge", filter_pars=filter_pars)
     # Pandas query() does not allow backslash in column names so "rename column" is needed.
     # In some versions of data, the column is called geo\time, in some geo\TIME_PERIOD.
     # In some version of python/pandas/eurostat, the year column name is a (numeric) string.
@@ -39,18 +39,54 @@ def get_eurostat_crf_data(geo: Optional[Geo | str], crf_code: Optional[str], yea
     return df
 
 
-def get_eurostat_crf_data_for_geo(geo: Geo, year: int) -> pd.DataFrame:
-    return get_eurostat_crf_data(geo, None, year)
+# The whole panel, loaded lazily by get_eurostat_crf_panel().
+_crf_panel: Optional[pd.DataFrame] = None
+
+
+def get_eurostat_crf_panel(reload: bool = False) -> pd.DataFrame:
+    """
+    Import the whole GHG panel (all geos, CRF codes and years) from Eurostat at once.
+    The dataframe is indexed by (geo, src_crf, year) with categorical geo and CRF code levels and
+    has a single column, "value", in megatons CO2eq. The panel is loaded only once per process.
+    """
+    global _crf_panel
+    if _crf_panel is not None and not reload:
+        return _crf_panel
+
+    df = get_eurostat_data_df("env_air_gge", filter_pars={"airpol": "GHG", "unit": "MIO_T"})
+    df = df.rename(columns={"geo\\time": "geo", "geo\\TIME_PERIOD": "geo"})
+    year_columns = [col for col in df.columns if str(col).isdigit()]
+    df = df.melt(id_vars=["geo", "src_crf"], value_vars=year_columns,
+                 var_name="year", value_name="value")
+    df["year"] = df["year"].astype(int)
+    df["geo"] = df["geo"].astype("category")
+    df["src_crf"] = df["src_crf"].astype("category")
+    _crf_panel = df.set_index(["geo", "src_crf", "year"]).sort_index()
+    return _crf_panel
+
+
+def _slice_crf_panel(key: tuple, levels: tuple[str, str], main_dimension: str) -> pd.DataFrame:
+    df = get_eurostat_crf_panel().xs(key, level=levels)
+    # Plain string index, so that the slice can be concatenated with other data.
+    df.index = df.index.astype(str).rename(main_dimension)
+    return df
+
+
+def get_eurostat_crf_data_for_geo(geo: Geo | str, year: int) -> pd.DataFrame:
+    """ Slice of the CRF panel for a given geo and year, indexed by CRF codes. """
+    geo_code = geo.value if isinstance(geo, Geo) else geo
+    return _slice_crf_panel((geo_code, year), ("geo", "year"), "src_crf")
 
 
 def get_eurostat_crf_data_for_code(crf_code: str, year: int) -> pd.DataFrame:
+    """ Slice of the CRF panel for a given CRF code and year, indexed by geo. """
     # Hotfix for a missing code.
     if crf_code == "TOTX4_MEMONIA":
         # The TOTX4_MEMONIA code was dropped in a 2025 revision, so we
         # need to calculate it manually from the available components.
-        df_totx4_memo = get_eurostat_crf_data(None, "TOTX4_MEMO", year)
+        df_totx4_memo = get_eurostat_crf_data_for_code("TOTX4_MEMO", year)
         # CRF1D1A is the code for international aviation.
-        df_intl_aviation = get_eurostat_crf_data(None, "CRF1D1A", year)
+        df_intl_aviation = get_eurostat_crf_data_for_code("CRF1D1A", year)
         return df_totx4_memo + df_intl_aviation
 
-    return get_eurostat_crf_data(None, crf_code, year)
+    return _slice_crf_panel((crf_code, year), ("src_crf", "year"), "geo")
@@ -1,31 +1,72 @@
 """ Utils to load demographic data from eurostat. """
 
-import eurostat
+from datetime import date
+from typing import Optional
+
 import pandas as pd
 
+from data_analysis.eurostat_cache import get_eurostat_data_df
 from data_analysis.eurostat_geo import Geo
 
+# First year loaded into the population index when a year is requested for the first time.
+DEFAULT_START_YEAR = 1990
 
-def get_eurostat_population_data(year: int) -> int:
-    """ Returns population count for given geo and year """
-    df: pd.DataFrame = eurostat.get_data_df('demo_pjan', filter_pars={
-        'startPeriod': year,
-        'endPeriod': year,
+# Population counts indexed by (geo, year), shared across all calls in the process.
+_population_index: Optional[pd.Series] = None
+_loaded_years: set[int] = set()
+
+
+def load_eurostat_population_data(start_year: int, end_year: int) -> pd.Series:
+    """
+    Import population counts for all geos and a range of years in a single request and add them
+    to the shared population index. Returns the index, a series of integers indexed by
+    (geo, year).
+    """
+    global _population_index
+    df: pd.DataFrame = get_eurostat_data_df('demo_pjan', filter_pars={
+        'startPeriod': start_year,
+        'endPeriod': end_year,
         'age': 'TOTAL',
         'sex': 'T',
     })
-    # Pandas query() does not allow backslash in column names so "rename column" is needed.
     # In some versions of data, the column is called geo\time, in some geo\TIME_PERIOD.
-    # In some version of python/pandas/eurostat, the year column name is a (numeric) string.
-    year_column_name = str(year)
     df = df.rename(columns={'geo\\time': 'geo',
-                            'geo\\TIME_PERIOD': 'geo',
-                            year_column_name: 'value'})
-    df = df[['geo', 'value']]
-    df = df.set_index('geo')
+                            'geo\\TIME_PERIOD': 'geo'})
+    year_columns = [col for col in df.columns if str(col).isdigit()]
+    population = (
+        df.melt(id_vars=['geo'], value_vars=year_columns, var_name='year', value_name='value')
+        .dropna(subset=['value'])
+        .astype({'year': int, 'value': 'int64'})
+        .set_index(['geo', 'year'])['value']
+    )
+
+    if _population_index is not None:
+        population = pd.concat([_population_index.drop(population.index, errors='ignore'),
+                                population])
+    _population_index = population.sort_index()
+    _loaded_years.update(range(start_year, end_year + 1))
+    return _population_index
+
+
+def _get_population_index(year: int) -> pd.Series:
+    """ Returns the population index, loading the default range of years if needed. """
+    if year not in _loaded_years:
+        load_eurostat_population_data(min(DEFAULT_START_YEAR, year),
+                                      max(date.today().year, year))
+    return _population_index
+
+
+def get_eurostat_population_data(year: int) -> pd.DataFrame:
+    """
+    Returns population counts for all geos in a given year. The dataframe is indexed by geo and
+    has a single column, 'value'.
+    """
+    df = _get_population_index(year).xs(year, level='year').to_frame('value')
+    df.index.name = 'geo'
     return df
 
 
-def get_eurostat_population_data_for_geo(geo: Geo, year: int) -> int:
-    df = get_eurostat_population_data(year)
-    return df.loc[geo.value, "value"]
+def get_eurostat_population_data_for_geo(geo: Geo | str, year: int) -> int:
+    """ Returns population count for given geo and year """
+    geo_code = geo.value if isinstance(geo, Geo) else geo
+    return int(_get_population_index(year).loc[(geo_code, year)])
@@ -0,0 +1,95 @@
+""" Mapping of ETS permits to facilities (or wedges of emission charts). """
+
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterable
+
+import numpy as np
+import pandas as pd
+
+
+@dataclass
+class FacilityIndex:
+    """
+    Compiled mapping of permit codes to facilities. Every permit has an integer code of its
+    facility (a position in `facilities`). Permits assigned to more than one facility are kept
+    with their first facility and listed in `duplicates`.
+    """
+    permits: pd.Index
+    facility_codes: np.ndarray
+    facilities: pd.Index
+    duplicates: pd.DataFrame
+
+    @classmethod
+    def from_mapping(cls, df_mapping: pd.DataFrame) -> "FacilityIndex":
+        """
+        Build the index from a dataframe with columns 'facility_id' and 'permit_id', one row per
+        permit.
+        """
+        df_mapping = df_mapping.dropna(subset=["permit_id"])
+        facility_codes, facilities = pd.factorize(df_mapping["facility_id"])
+        is_duplicate = df_mapping["permit_id"].duplicated(keep=False)
+        duplicates = df_mapping.loc[is_duplicate, ["permit_id", "facility_id"]]
+        if not duplicates.empty:
+            print(f"Warning: permits mapped more than once: "
+                  f"{', '.join(duplicates['permit_id'].unique())}")
+
+        first = ~df_mapping["permit_id"].duplicated(keep="first").to_numpy()
+        return cls(permits=pd.Index(df_mapping["permit_id"].to_numpy()[first]),
+                   facility_codes=facility_codes[first],
+                   facilities=pd.Index(facilities, name="facility_id"),
+                   duplicates=duplicates.reset_index(drop=True))
+
+    @classmethod
+    def from_csv(cls, path: str | Path, separator: str = "|") -> "FacilityIndex":
+        """
+        Build the index from a CSV file with columns 'facility_id' and 'permit_ids' (permit
+        codes joined by the separator), such as data/EUA/top-emitters-cz.csv.
+        """
+        df = pd.read_csv(path, usecols=["facility_id", "permit_ids"])
+        df["permit_id"] = df["permit_ids"].str.split(separator)
+        df = df.explode("permit_id")
+        df["permit_id"] = df["permit_id"].str.strip()
+        return cls.from_mapping(df[["facility_id", "permit_id"]])
+
+    @classmethod
+    def from_wedge_definition(cls, definition: list[dict]) -> "FacilityIndex":
+        """
+        Build the index from permit codes of all wedges with allowances in a definition of an
+        emissions pie chart. Facilities are the full ids of the wedges (as in Wedge.id).
+        """
+        rows = []
+        for wedge_def in definition:
+            for sub_wedge in wedge_def.get("breakdown", []):
+                if "allowances" in sub_wedge:
+                    wedge_id = f"{wedge_def['id']}_{sub_wedge['id']}"
+                    rows += [(wedge_id, code) for code in sub_wedge["codes"]]
+        return cls.from_mapping(pd.DataFrame(rows, columns=["facility_id", "permit_id"]))
+
+    def get_facility_codes(self, permits: Iterable[str]) -> np.ndarray:
+        """ Returns integer codes of facilities for the given permits, -1 for unmapped permits. """
+        positions = self.permits.get_indexer(pd.Index(permits))
+        if len(self.permits) == 0:
+            return positions
+        return np.where(positions >= 0, self.facility_codes[positions], -1)
+
+    def get_permit_ids(self) -> list[str]:
+        """ Returns all mapped permit codes (e.g. to filter allowances data). """
+        return self.permits.tolist()
+
+    def get_unmapped(self, values: pd.Series | pd.DataFrame) -> pd.Series | pd.DataFrame:
+        """ Returns the rows of permit-indexed values whose permits are not mapped. """
+        return values[~values.index.isin(self.permits)]
+
+    def aggregate(self, values: pd.Series | pd.DataFrame) -> pd.Series | pd.DataFrame:
+        """
+        Sum permit-indexed values (e.g. emissions, possibly with one column per year) into
+        facilities in a single pass. Unmapped permits are skipped, facilities with no matching
+        permits get zeros.
+        """
+        codes = self.get_facility_codes(values.index)
+        mapped = codes >= 0
+        summed = values[mapped].groupby(codes[mapped]).sum()
+        summed = summed.reindex(range(len(self.facilities)), fill_value=0)
+        summed.index = self.facilities
+        return summed
@@ -6,50 +6,90 @@ import gettext
 import shutil
 from string import Template
 
+
+def _flatten(data, prefix=''):
+    for key, value in data.items():
+        full_key = f'{prefix}{key}'
+        if isinstance(value, dict):
+            yield from _flatten(value, f'{full_key}.')
+        else:
+            yield full_key, value
+
+
 class Translator():
     def __init__(self, translations_folder='../loc', locale='en'):
+        # Locales are loaded only when used.
+        self.files = {}
         self.data = {}
+        # Per locale: templates by dotted keys and memoized names of countries.
+        self.templates = {}
+        self.country_names = {}
+        self.country_translations = {}
 
         files = glob.glob(os.path.join(translations_folder, f'*.yaml'))
         for file in files:
             loc = os.path.splitext(os.path.basename(file))[0]
-            with open(file, 'r', encoding='utf8') as f:
-                self.data[loc] = yaml.safe_load(f)
+            self.files[loc] = file
 
         self.set_locale(locale)
 
     def set_locale(self, loc):
-        if loc in self.data:
+        if loc in self.files:
             self.locale = loc
-            # pycountry doesn't translate iso3166-1 to english since this is the base language
-            if self.locale != 'en':
-                self.country_translations = gettext.translation(
-                    'iso3166-1', pycountry.LOCALES_DIR, languages=[self.get_locale()])
-                self.country_translations.install()
         else:
             raise Exception(f"Invalid locale {loc}")
 
     def get_locale(self):
         return self.locale
 
+    def _get_templates(self):
+        loc = self.get_locale()
+        if loc not in self.templates:
+            with open(self.files[loc], 'r', encoding='utf8') as f:
+                self.data[loc] = yaml.safe_load(f) or {}
+            # Empty (null) leaves are missing translations rather than the text "None".
+            self.templates[loc] = {key: Template(str(value))
+                                   for key, value in _flatten(self.data[loc])
+                                   if value is not None}
+        return self.templates[loc]
+
     def translate(self, key, **kwargs):
-        datatoken = self.data[self.get_locale()]
-        for token in key.split('.'):
-            datatoken = datatoken.get(token)
-        return Template(datatoken).safe_substitute(**kwargs)
+        templates = self._get_templates()
+        if key not in templates:
+            raise KeyError(f"Missing translation of {key} in locale {self.get_locale()}")
+        return templates[key].safe_substitute(**kwargs)
+
+    def _translate_country_name(self, key):
+        # attempt to resolve overrides first
+        if key in self._get_templates():
+            return self.translate(key)
+
+        country = pycountry.countries.get(alpha_3=key)
+        if country is None:
+            raise KeyError(f"Unknown country code {key}")
+        # pycountry doesn't translate iso3166-1 to english since this is the base language
+        if self.locale == 'en':
+            return country.name
+        if self.locale not in self.country_translations:
+            self.country_translations[self.locale] = gettext.translation(
+                'iso3166-1', pycountry.LOCALES_DIR, languages=[self.get_locale()])
+        return self.country_translations[self.locale].gettext(country.name)
 
     def translate_country(self, key):
         if key == '':
             return ''
-        
-        # attempt to resolve overrides first
-        try:
-            return self.translate(key)
-        except:
-            None
 
-        if self.locale != 'en':
-            _ = self.country_translations.gettext
-            return _(pycountry.countries.get(alpha_3=key).name)
-        else:
-            return pycountry.countries.get(alpha_3=key).name
+        names = self.country_names.setdefault(self.get_locale(), {})
+        if key not in names:
+            names[key] = self._translate_country_name(key)
+        return names[key]
+
+    def translate_series(self, keys, **kwargs):
+        """ Translate a whole column of keys, each distinct key only once. Missing values are kept. """
+        translations = {key: self.translate(key, **kwargs) for key in keys.dropna().unique()}
+        return keys.map(translations)
+
+    def translate_countries(self, codes):
+        """ Translate a whole column of ISO3 codes (or override keys) to names of countries. """
+        translations = {code: self.translate_country(code) for code in codes.dropna().unique()}
+        return codes.map(translations)
@@ -0,0 +1,166 @@
+""" Loading of daily capacity factors from PECD (Pan-European Climate Database, see data/pecd). """
+
+from dataclasses import dataclass
+from enum import Enum
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+PECD_DATA_DIR = Path(__file__).parents[1] / "data" / "pecd"
+
+# PECD climate years have no 29 February.
+DAYS_IN_YEAR = 365
+_MONTH_OFFSETS = np.cumsum([0, 31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30])
+
+
+class Technology(Enum):
+    SOLAR = "solar"
+    WIND = "wind"
+
+
+# Technologies of the capacities in "PEMMDB Generation" and of per-country capacity factors.
+PEMMDB_SOURCES = {
+    "Solar (Photovoltaic)": "solar",
+    "Wind Onshore": "onshore",
+    "Wind Offshore": "offshore",
+}
+
+
+def get_day_index(months: np.ndarray, days: np.ndarray) -> np.ndarray:
+    """ Index of days (given by month and day) in a year without 29 February. """
+    return _MONTH_OFFSETS[np.asarray(months).astype(int) - 1] + np.asarray(days).astype(int) - 1
+
+
+def get_dates(years: np.ndarray, day_index: np.ndarray) -> pd.DatetimeIndex:
+    """ Dates of days given by years and indices of days in a year without 29 February. """
+    dates = pd.date_range("2001-01-01", "2001-12-31")[day_index]
+    return pd.DatetimeIndex(pd.to_datetime(pd.DataFrame(
+        {"year": years, "month": dates.month, "day": dates.day})))
+
+
+def get_daily_file_path(technology: Technology, region: str, target_year: int = 2025,
+                        data_dir: str | Path = PECD_DATA_DIR) -> Path:
+    """ Daily file prepared by spolehlivost-oze-prep.ipynb, e.g. for region "cz" or "europe". """
+    return Path(data_dir) / f"eraa2023-ty{target_year}-daily-{technology.value}-{region}.parquet"
+
+
+def get_country_daily_file_path(technology: str, target_year: int = 2025,
+                                data_dir: str | Path = PECD_DATA_DIR) -> Path:
+    """
+    Daily file of all countries of a technology (as in PEMMDB_SOURCES, e.g. "onshore") written
+    by data_analysis.pecd_hourly.
+    """
+    return Path(data_dir) / f"eraa2023-ty{target_year}-daily-{technology}-countries.parquet"
+
+
+@dataclass
+class DailyCapacityFactors:
+    """
+    Daily capacity factors of a region as arrays of climate years × days of the year, aligned
+    across technologies.
+    """
+    region: str
+    years: np.ndarray
+    months: np.ndarray
+    days: np.ndarray
+    cf: dict[Technology, np.ndarray]
+
+    def get_dates(self, year_index: np.ndarray, day_index: np.ndarray) -> pd.DatetimeIndex:
+        """ Dates of days given by indices of climate years and days of the year. """
+        return get_dates(self.years[year_index], day_index)
+
+
+def _read_daily_file(path: Path) -> tuple[np.ndarray, np.ndarray]:
+    """ Climate years and a matrix of years × days of capacity factors from a daily file. """
+    df = pd.read_parquet(path, columns=["year", "month", "day", "cf"])
+    years, year_index = np.unique(df["year"].to_numpy(), return_inverse=True)
+    day_index = get_day_index(df["month"].to_numpy(), df["day"].to_numpy())
+    if len(df) != len(years) * DAYS_IN_YEAR or np.any(day_index >= DAYS_IN_YEAR):
+        raise ValueError(f"{path} does not have {DAYS_IN_YEAR} days in each climate year")
+    cf = np.full((len(years), DAYS_IN_YEAR), np.nan)
+    cf[year_index, day_index] = df["cf"].to_numpy()
+    if np.isnan(cf).any():
+        raise ValueError(f"{path} has duplicate or missing days")
+    return years, cf
+
+
+def load_daily_capacity_factors(region: str, target_year: int = 2025,
+                                data_dir: str | Path = PECD_DATA_DIR) -> DailyCapacityFactors:
+    """ Daily capacity factors of all technologies of a region (such as "cz" or "europe"). """
+    cf = {}
+    years = None
+    for technology in Technology:
+        path = get_daily_file_path(technology, region, target_year, data_dir)
+        technology_years, cf[technology] = _read_daily_file(path)
+        if years is not None and not np.array_equal(years, technology_years):
+            raise ValueError(f"Climate years of {path} differ from other technologies")
+        years = technology_years
+
+    dates = pd.date_range("2001-01-01", "2001-12-31")
+    return DailyCapacityFactors(region=region, years=years, months=dates.month.to_numpy(),
+                                days=dates.day.to_numpy(), cf=cf)
+
+
+@dataclass
+class CountryCapacityFactors:
+    """
+    Daily capacity factors as an array of countries × technologies × climate years × days, zero
+    where a country has no capacity factors of a technology (e.g. no offshore wind).
+    """
+    countries: list[str]
+    technologies: list[str]
+    years: np.ndarray
+    cf: np.ndarray
+
+
+def get_country_capacity_factors(frames: dict[str, pd.DataFrame]) -> CountryCapacityFactors:
+    """ Align daily frames of technologies (columns country, year, month, day and cf). """
+    countries = sorted(set().union(*(df["country"].unique() for df in frames.values())))
+    years = np.unique(np.concatenate([df["year"].to_numpy() for df in frames.values()]))
+    cf = np.zeros((len(countries), len(frames), len(years), DAYS_IN_YEAR))
+    for k, (technology, df) in enumerate(frames.items()):
+        sizes = df["country"].value_counts()
+        incomplete = sizes.index[sizes != len(years) * DAYS_IN_YEAR].tolist()
+        if incomplete:
+            print(f"Warning: incomplete {technology} capacity factors of {', '.join(incomplete)}, "
+                  "missing days are zero.")
+        cf[pd.Categorical(df["country"], categories=countries).codes,
+           k,
+           np.searchsorted(years, df["year"].to_numpy()),
+           get_day_index(df["month"].to_numpy(), df["day"].to_numpy())] = df["cf"].to_numpy()
+    return CountryCapacityFactors(countries=countries, technologies=list(frames), years=years,
+                                  cf=cf)
+
+
+def load_country_capacity_factors(paths: Optional[dict[str, str | Path]] = None,
+                                  target_year: int = 2025,
+                                  data_dir: str | Path = PECD_DATA_DIR) -> CountryCapacityFactors:
+    """
+    Per-country daily capacity factors from parquet files of technologies, by default the files
+    of all technologies of PEMMDB_SOURCES written by data_analysis.pecd_hourly.
+    """
+    if paths is None:
+        paths = {technology: get_country_daily_file_path(technology, target_year, data_dir)
+                 for technology in PEMMDB_SOURCES.values()}
+    return get_country_capacity_factors({
+        technology: pd.read_parquet(path, columns=["country", "year", "month", "day", "cf"])
+        for technology, path in paths.items()
+    })
+
+
+def load_pemmdb_capacities(path: str | Path = PECD_DATA_DIR / "ERAA2023 PEMMDB Generation.xlsx",
+                           target_year: int = 2025) -> pd.DataFrame:
+    """
+    Installed capacities of solar, onshore and offshore wind from "PEMMDB Generation" summed
+    over bidding zones of countries, with columns technology, country and capacity_mw.
+    """
+    df = pd.read_excel(path, sheet_name=f"TY{target_year}", header=1, usecols="B:BE", nrows=23)
+    df = df.rename(columns={df.columns[0]: "source"})
+    df = df[df["source"].isin(PEMMDB_SOURCES)]
+    df = df.melt(id_vars="source", var_name="zone", value_name="capacity_mw")
+    df["capacity_mw"] = pd.to_numeric(df["capacity_mw"], errors="coerce")
+    df = df[df["capacity_mw"] > 0]
+    return (df.assign(technology=df["source"].map(PEMMDB_SOURCES), country=df["zone"].str[:2])
+            .groupby(["technology", "country"], as_index=False)["capacity_mw"].sum())
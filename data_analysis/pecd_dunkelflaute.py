@@ -0,0 +1,119 @@
+"""
+Detection of low-output episodes of renewables ("Dunkelflaute") in daily PECD capacity factors,
+as in spolehlivost-oze.ipynb: days when the combined output of solar and wind stays under a share
+of its long-term mean.
+"""
+
+from typing import Iterable, Optional
+
+import numpy as np
+import pandas as pd
+
+from data_analysis.pecd import DailyCapacityFactors, Technology
+
+# Share of solar in the installed capacities of the combination (2 : 3 for solar : wind).
+DEFAULT_SOLAR_SHARE = 0.4
+# Combined output under this share of the long-term mean makes a day of Dunkelflaute.
+DEFAULT_THRESHOLD = 0.25
+
+
+def get_combined_relative(factors: DailyCapacityFactors, solar_share: float = DEFAULT_SOLAR_SHARE,
+                          months: Optional[list[int]] = None) -> np.ndarray:
+    """
+    Combined output of solar and wind relative to its mean, as climate years × days. Days outside
+    the given months (if any) are left out of the mean and are NaN, so that they split episodes.
+    """
+    combined = (solar_share * factors.cf[Technology.SOLAR]
+                + (1 - solar_share) * factors.cf[Technology.WIND])
+    if months is not None:
+        combined = np.where(np.isin(factors.months, months), combined, np.nan)
+    return combined / np.nanmean(combined)
+
+
+def _get_runs(below: np.ndarray) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """ Run-length encoding of each row: indices of rows, first columns and lengths of runs. """
+    padded = np.zeros((below.shape[0], below.shape[1] + 2), dtype=np.int8)
+    padded[:, 1:-1] = below
+    changes = np.diff(padded, axis=1)
+    rows, starts = np.nonzero(changes == 1)
+    _, ends = np.nonzero(changes == -1)
+    return rows, starts, ends - starts
+
+
+def find_episodes(factors: DailyCapacityFactors, relative: np.ndarray,
+                  threshold: float = DEFAULT_THRESHOLD, min_days: int = 1) -> pd.DataFrame:
+    """
+    Episodes of at least min_days consecutive days under the threshold within a climate year,
+    as a dataframe with columns year, start_date, num_days and min_relative.
+    """
+    rows, starts, lengths = _get_runs(relative < threshold)
+    keep = lengths >= min_days
+    rows, starts, lengths = rows[keep], starts[keep], lengths[keep]
+    # Minimum of each run as a reduction over the days of all runs laid out one after another.
+    offsets = np.cumsum(lengths) - lengths
+    positions = (np.repeat(rows * relative.shape[1] + starts - offsets, lengths)
+                 + np.arange(lengths.sum()))
+    min_relative = (np.minimum.reduceat(relative.ravel()[positions], offsets)
+                    if len(lengths) else np.empty(0))
+    return pd.DataFrame({
+        "year": factors.years[rows],
+        "start_date": factors.get_dates(rows, starts),
+        "num_days": lengths,
+        "min_relative": min_relative,
+    })
+
+
+def get_duration_distribution(episodes: pd.DataFrame, num_years: int) -> pd.DataFrame:
+    """
+    Occurrences of episodes by their lengths with their proportion (in %) and the number of days
+    (in total and per year) in episodes at least as long, as in the notebook.
+    """
+    df = episodes["num_days"].value_counts().sort_index().rename("occurrences").reset_index()
+    df["proportion"] = 100 * df["occurrences"] / df["occurrences"].sum()
+    df["cum_occurrences"] = (df["occurrences"] * df["num_days"])[::-1].cumsum()[::-1]
+    df["avg_cum_occurrences"] = df["cum_occurrences"] / num_years
+    return df
+
+
+def sweep_episodes(relative: np.ndarray, thresholds: Iterable[float],
+                   windows: Iterable[int]) -> pd.DataFrame:
+    """
+    Numbers of episodes and of days in them per year for all combinations of thresholds and
+    minimal lengths (windows) at once. N consecutive days stay under a threshold exactly when
+    their rolling maximum does, so episodes of at least N days are runs of such windows.
+    """
+    thresholds = np.asarray(list(thresholds), dtype=float)
+    windows = sorted(set(windows))
+    # Days without data never count as under a threshold.
+    rolling_max = np.where(np.isnan(relative), np.inf, relative)
+    num_years = relative.shape[0]
+
+    results = []
+    for window in range(1, windows[-1] + 1):
+        if window > 1:
+            rolling_max = np.maximum(rolling_max[:, :-1], relative[:, window - 1:])
+            rolling_max[np.isnan(rolling_max)] = np.inf
+        if window not in windows:
+            continue
+        below = rolling_max[..., np.newaxis] < thresholds
+        starts = below[:, :1].sum(axis=(0, 1)) + (below[:, 1:] & ~below[:, :-1]).sum(axis=(0, 1))
+        days = below.sum(axis=(0, 1)) + (window - 1) * starts
+        results.append(pd.DataFrame({
+            "window": window,
+            "threshold": thresholds,
+            "episodes_per_year": starts / num_years,
+            "days_per_year": days / num_years,
+        }))
+    return pd.concat(results, ignore_index=True).set_index(["window", "threshold"])
+
+
+def sweep_regions(regions: Iterable[DailyCapacityFactors], thresholds: Iterable[float],
+                  windows: Iterable[int], solar_share: float = DEFAULT_SOLAR_SHARE,
+                  months: Optional[list[int]] = None) -> pd.DataFrame:
+    """ Sweep of thresholds and windows (as above) for many regions, indexed also by region. """
+    thresholds, windows = list(thresholds), list(windows)
+    return pd.concat({
+        factors.region: sweep_episodes(get_combined_relative(factors, solar_share, months),
+                                       thresholds, windows)
+        for factors in regions
+    }, names=["region"])
@@ -0,0 +1,215 @@
+"""
+Builds the daily files in data/pecd from the hourly PECD files (as in spolehlivost-oze-prep.ipynb)
+without loading them whole, together with daily files of all countries per technology (the input
+of data_analysis.pecd_portfolios), e.g.:
+
+    python -m data_analysis.pecd_hourly --input-dir data/pecd --jobs 4
+
+Hourly files are streamed row group by row group: only the needed columns are read and row groups
+which cannot contain the requested countries are skipped. Each task sums capacity factors into
+daily sums and counts per country. The partial sums from a process pool are then combined, so
+memory stays bounded by a row group and the daily sums.
+"""
+
+import argparse
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Optional
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+from data_analysis.cache_utils import write_parquet_atomically
+from data_analysis.pecd import (
+    PECD_DATA_DIR,
+    Technology,
+    get_country_daily_file_path,
+    get_daily_file_path,
+    load_pemmdb_capacities,
+)
+
+# Names of technologies (as in PEMMDB_SOURCES) in the names of the hourly files.
+HOURLY_FILE_TECHNOLOGIES = {
+    "solar": "LFSolarPV",
+    "onshore": "Wind_Onshore",
+    "offshore": "Wind_Offshore",
+}
+
+# The country of the daily files of a single country.
+DEFAULT_COUNTRY = "CZ"
+
+DAY_COLUMNS = ["year", "month", "day"]
+_KEY_COLUMNS = ["country"] + DAY_COLUMNS
+
+# Number of row groups aggregated by a single task.
+_ROW_GROUPS_PER_TASK = 4
+
+
+def get_hourly_file_path(technology: str, target_year: int = 2025,
+                         data_dir: str | Path = PECD_DATA_DIR) -> Path:
+    return (Path(data_dir)
+            / f"PECD-ERAA2023-{HOURLY_FILE_TECHNOLOGIES[technology]}-{target_year}.parquet")
+
+
+def _may_contain(statistics: Optional[pq.Statistics], countries: Optional[list[str]]) -> bool:
+    """ Whether a row group may contain any of the countries according to its statistics. """
+    if countries is None or statistics is None or not statistics.has_min_max:
+        return True
+    return any(statistics.min <= country <= statistics.max for country in countries)
+
+
+def _empty_sums() -> pd.DataFrame:
+    return pd.DataFrame({"sum": pd.Series(dtype=float), "count": pd.Series(dtype=float)},
+                        index=pd.MultiIndex.from_tuples([], names=_KEY_COLUMNS))
+
+
+def aggregate_row_groups(path: str | Path, row_groups: list[int],
+                         countries: Optional[list[str]] = None) -> pd.DataFrame:
+    """
+    Daily sums and counts of hourly capacity factors per country (indexed by country, year, month
+    and day) in the given row groups of an hourly file, reading one row group at a time.
+    """
+    parquet_file = pq.ParquetFile(path)
+    country_column = parquet_file.schema_arrow.get_field_index("country")
+    sums = _empty_sums()
+    for i in row_groups:
+        statistics = parquet_file.metadata.row_group(i).column(country_column).statistics
+        if not _may_contain(statistics, countries):
+            continue
+        table = parquet_file.read_row_group(i, columns=_KEY_COLUMNS + ["cf"])
+        if countries is not None:
+            mask = pc.is_in(pc.cast(table["country"], pa.string()),
+                            value_set=pa.array(countries, type=pa.string()))
+            table = table.filter(mask)
+        if table.num_rows == 0:
+            continue
+        df = table.to_pandas()
+        df["country"] = df["country"].astype(str)
+        partial = df.groupby(_KEY_COLUMNS)["cf"].agg(["sum", "count"])
+        sums = sums.add(partial, fill_value=0)
+    return sums
+
+
+def aggregate_hourly_files(paths: dict[str, str | Path], countries: Optional[list[str]] = None,
+                           jobs: Optional[int] = None) -> dict[str, pd.DataFrame]:
+    """
+    Daily sums and counts (as above) of hourly files of technologies, with chunks of row groups
+    of all files aggregated in a process pool.
+    """
+    tasks = []
+    for technology, path in paths.items():
+        num_row_groups = pq.ParquetFile(path).num_row_groups
+        for first in range(0, num_row_groups, _ROW_GROUPS_PER_TASK):
+            row_groups = list(range(first, min(first + _ROW_GROUPS_PER_TASK, num_row_groups)))
+            tasks.append((technology, path, row_groups))
+
+    sums = {technology: _empty_sums() for technology in paths}
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        futures = [executor.submit(aggregate_row_groups, path, row_groups, countries)
+                   for _, path, row_groups in tasks]
+        for (technology, _, _), future in zip(tasks, futures):
+            sums[technology] = sums[technology].add(future.result(), fill_value=0)
+    return {technology: df.sort_index() for technology, df in sums.items()}
+
+
+def _to_daily_file_frame(cf: pd.Series) -> pd.DataFrame:
+    """ Frame of daily means (indexed by year, month and day) as written by the notebook. """
+    df = cf.rename("cf").reset_index().sort_values(DAY_COLUMNS, ignore_index=True)
+    return df.astype({"year": "int32", "month": "float64", "day": "float64", "cf": "float64"})
+
+
+def get_country_daily(sums: pd.DataFrame, country: str = DEFAULT_COUNTRY) -> pd.DataFrame:
+    """ Daily means of hourly capacity factors of a single country. """
+    df = sums.xs(country, level="country")
+    return _to_daily_file_frame(df["sum"] / df["count"])
+
+
+def get_countries_daily(sums: pd.DataFrame) -> pd.DataFrame:
+    """ Daily means of hourly capacity factors of all countries (with a column country). """
+    df = (sums["sum"] / sums["count"]).rename("cf").reset_index()
+    return df.astype({"country": "str", "year": "int32", "month": "float64", "day": "float64",
+                      "cf": "float64"})
+
+
+def get_europe_daily_solar(sums: pd.DataFrame, capacities: pd.Series) -> pd.DataFrame:
+    """ Means of hourly capacity factors weighted by solar capacities of countries (in MW). """
+    weights = capacities.reindex(sums.index.get_level_values("country")).to_numpy()
+    df = sums.assign(sum=sums["sum"] * weights, count=sums["count"] * weights).dropna()
+    df = df.groupby(level=DAY_COLUMNS).sum()
+    return _to_daily_file_frame(df["sum"] / df["count"])
+
+
+def get_europe_daily_wind(onshore_sums: pd.DataFrame, offshore_sums: pd.DataFrame,
+                          capacities: pd.DataFrame) -> pd.DataFrame:
+    """
+    Daily means over countries of their onshore and offshore capacity factors weighted by their
+    capacities (columns onshore and offshore in MW, indexed by country).
+    """
+    df = pd.concat({
+        "onshore": onshore_sums["sum"] / onshore_sums["count"],
+        "offshore": offshore_sums["sum"] / offshore_sums["count"],
+    }, axis=1).fillna(0.0)
+    capacities = capacities.reindex(columns=["onshore", "offshore"]).fillna(0.0)
+    df = df[df.index.get_level_values("country").isin(capacities.index)]
+    weights = capacities.reindex(df.index.get_level_values("country")).to_numpy()
+    cf = (df[["onshore", "offshore"]].to_numpy() * weights).sum(axis=1) / weights.sum(axis=1)
+    cf = pd.Series(cf, index=df.index).groupby(level=DAY_COLUMNS).mean()
+    return _to_daily_file_frame(cf)
+
+
+def build_daily_files(input_dir: str | Path = PECD_DATA_DIR,
+                      output_dir: str | Path = PECD_DATA_DIR,
+                      target_year: int = 2025, capacities_path: Optional[str | Path] = None,
+                      jobs: Optional[int] = None) -> list[Path]:
+    """
+    Write the daily solar and wind files of Czechia and of Europe and the daily files of all
+    countries of each technology from the hourly files.
+    """
+    df_capacities = load_pemmdb_capacities(
+        capacities_path or Path(input_dir) / "ERAA2023 PEMMDB Generation.xlsx", target_year)
+    capacities = df_capacities.pivot_table(index="country", columns="technology",
+                                           values="capacity_mw", aggfunc="sum")
+    countries = sorted(set(capacities.index) | {DEFAULT_COUNTRY})
+    paths = {technology: get_hourly_file_path(technology, target_year, input_dir)
+             for technology in HOURLY_FILE_TECHNOLOGIES}
+    sums = aggregate_hourly_files(paths, countries, jobs)
+
+    wind_capacities = capacities.reindex(columns=["onshore", "offshore"])
+    outputs = {
+        (Technology.SOLAR, "cz"): get_country_daily(sums["solar"]),
+        (Technology.WIND, "cz"): get_country_daily(sums["onshore"]),
+        (Technology.SOLAR, "europe"): get_europe_daily_solar(
+            sums["solar"], capacities["solar"].dropna()),
+        (Technology.WIND, "europe"): get_europe_daily_wind(
+            sums["onshore"], sums["offshore"], wind_capacities.dropna(how="all")),
+    }
+    written = []
+    for (technology, region), df in outputs.items():
+        path = get_daily_file_path(technology, region, target_year, output_dir)
+        write_parquet_atomically(df, path, index=False)
+        written.append(path)
+    for technology, technology_sums in sums.items():
+        path = get_country_daily_file_path(technology, target_year, output_dir)
+        write_parquet_atomically(get_countries_daily(technology_sums), path, index=False)
+        written.append(path)
+    return written
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Build daily PECD files from the hourly ones with bounded memory.")
+    parser.add_argument("--input-dir", default=PECD_DATA_DIR)
+    parser.add_argument("--output-dir", default=PECD_DATA_DIR)
+    parser.add_argument("--target-year", type=int, default=2025)
+    parser.add_argument("--capacities", help="PEMMDB Generation workbook (in the input dir "
+                                             "by default).")
+    parser.add_argument("--jobs", type=int, default=os.cpu_count(),
+                        help="Number of worker processes.")
+    args = parser.parse_args()
+
+    for path in build_daily_files(args.input_dir, args.output_dir, args.target_year,
+                                  args.capacities, args.jobs):
+        print(f"Written {path}")
@@ -0,0 +1,126 @@
+"""
+Batched evaluation of capacity-mix scenarios over per-country daily PECD capacity factors: how
+much aggregating solar and wind across borders smooths the combined output (as weighted by the
+"PEMMDB Generation" capacities in spolehlivost-oze-prep.ipynb, but for many mixes at once).
+"""
+
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from data_analysis.pecd import CountryCapacityFactors, get_dates
+
+# Length (in days) of the worst period of combined output in the summary.
+DEFAULT_WORST_PERIOD_DAYS = 7
+
+
+def get_capacity_matrix(df_capacities: pd.DataFrame, countries: list[str],
+                        technologies: list[str]) -> np.ndarray:
+    """
+    Capacities (with columns technology, country and capacity_mw, as from
+    load_pemmdb_capacities) as an array of countries × technologies.
+    """
+    unknown = sorted(set(df_capacities["country"]) - set(countries))
+    if unknown:
+        print(f"Warning: no capacity factors of {', '.join(unknown)}, their capacities are ignored.")
+    df = df_capacities.pivot_table(index="country", columns="technology", values="capacity_mw",
+                                   aggfunc="sum")
+    return df.reindex(index=countries, columns=technologies).fillna(0.0).to_numpy()
+
+
+def get_aggregation_scenarios(capacities: np.ndarray, countries: list[str],
+                              groups: dict[str, list[str]]) -> tuple[np.ndarray, list[str]]:
+    """
+    Scenarios keeping capacities (countries × technologies) only in groups of countries, e.g.
+    a single country against the whole of Europe. Returns countries × technologies × scenarios.
+    """
+    masks = np.array([np.isin(countries, members) for members in groups.values()]).T
+    return capacities[:, :, np.newaxis] * masks[:, np.newaxis, :], list(groups)
+
+
+@dataclass
+class ScenarioResults:
+    """ Aggregate output of scenarios and its statistics. """
+    scenarios: list[str]
+    countries: list[str]
+    years: np.ndarray
+    # Aggregate capacity factors as scenarios × climate years × days.
+    cf: np.ndarray
+    summary: pd.DataFrame
+    # Correlations of daily outputs of countries as scenarios × countries × countries.
+    country_correlations: np.ndarray
+
+    def get_country_correlations(self, scenario: str) -> pd.DataFrame:
+        return pd.DataFrame(self.country_correlations[self.scenarios.index(scenario)],
+                            index=self.countries, columns=self.countries)
+
+
+def evaluate_scenarios(factors: CountryCapacityFactors, capacities: np.ndarray,
+                       scenarios: list[str],
+                       worst_period_days: int = DEFAULT_WORST_PERIOD_DAYS) -> ScenarioResults:
+    """
+    Evaluate scenarios given by capacities as countries × technologies × scenarios (in the order
+    of the capacity factors) with a single matrix multiplication. The summary has per scenario:
+    - mean and standard deviation of the aggregate capacity factor,
+    - variance reduction against the same capacities with perfectly correlated outputs,
+    - the worst day (and its relative output), the 1st and 5th percentiles of relative output,
+    - the worst relative mean output over worst_period_days within a climate year.
+    """
+    num_countries, num_technologies, num_years, num_days = factors.cf.shape
+    if capacities.shape != (num_countries, num_technologies, len(scenarios)):
+        raise ValueError(f"Capacities have shape {capacities.shape}, expected "
+                         f"{(num_countries, num_technologies, len(scenarios))}")
+    totals = capacities.sum(axis=(0, 1))
+    if np.any(totals <= 0):
+        empty = [scenario for scenario, total in zip(scenarios, totals) if total <= 0]
+        raise ValueError(f"Scenarios without any capacity: {', '.join(empty)}")
+
+    series = factors.cf.reshape(num_countries * num_technologies, -1)
+    weights = capacities.reshape(num_countries * num_technologies, -1)
+    cf = (weights.T @ series) / totals[:, np.newaxis]
+
+    mean = cf.mean(axis=1)
+    std = cf.std(axis=1)
+    # Standard deviation of the same mix if all series moved together.
+    correlated_std = (weights.T @ series.std(axis=1)) / totals
+    relative = cf / mean[:, np.newaxis]
+    worst = relative.argmin(axis=1)
+    percentiles = np.quantile(relative, [0.01, 0.05], axis=1)
+
+    # Rolling means within climate years from cumulative sums over days.
+    cumsum = np.cumsum(relative.reshape(len(scenarios), num_years, num_days), axis=2)
+    cumsum = np.concatenate([np.zeros_like(cumsum[..., :1]), cumsum], axis=2)
+    rolling = (cumsum[..., worst_period_days:]
+               - cumsum[..., :-worst_period_days]) / worst_period_days
+
+    summary = pd.DataFrame({
+        "mean_cf": mean,
+        "std_cf": std,
+        "variance_reduction": 1 - std ** 2 / correlated_std ** 2,
+        "worst_date": get_dates(factors.years[worst // num_days], worst % num_days),
+        "worst_day_relative": relative[np.arange(len(scenarios)), worst],
+        "p01_relative": percentiles[0],
+        "p05_relative": percentiles[1],
+        f"worst_{worst_period_days}_days_relative": rolling.min(axis=(1, 2)),
+    }, index=pd.Index(scenarios, name="scenario"))
+
+    # Covariances of all series at once, then of countries' outputs in each scenario.
+    centered = series - series.mean(axis=1, keepdims=True)
+    covariance = (centered @ centered.T / series.shape[1]).reshape(
+        num_countries, num_technologies, num_countries, num_technologies)
+    country_covariance = np.einsum("cks,dls,ckdl->scd", capacities, capacities, covariance,
+                                   optimize=True)
+    country_std = np.sqrt(np.diagonal(country_covariance, axis1=1, axis2=2))
+    with np.errstate(invalid="ignore", divide="ignore"):
+        country_correlations = (country_covariance / country_std[:, :, np.newaxis]
+                                / country_std[:, np.newaxis, :])
+
+    return ScenarioResults(
+        scenarios=scenarios,
+        countries=factors.countries,
+        years=factors.years,
+        cf=cf.reshape(len(scenarios), num_years, num_days),
+        summary=summary,
+        country_correlations=country_correlations,
+    )
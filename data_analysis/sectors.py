@@ -1,8 +1,14 @@
 """ Utils to get CRF codes for sectors. """
 
+from collections import Counter
+from dataclasses import dataclass
 from enum import Enum
+from itertools import chain
+from pathlib import Path
 from typing import Optional
 
+import pandas as pd
+
 
 class Sector(Enum):
     INDUSTRY = "industry"
@@ -44,6 +50,26 @@ SUBSECTOR_CODES: dict[Subsector, list[str]] = {
     Subsector.AIRPLANES: ['CRF1D1A', 'CRF1A3A'],
 }
 
+SUBSECTOR_SECTOR: dict[Subsector, Sector] = {
+    Subsector.METAL: Sector.INDUSTRY,
+    Subsector.MINERAL: Sector.INDUSTRY,
+    Subsector.CHEMICAL: Sector.INDUSTRY,
+    Subsector.FUELS: Sector.INDUSTRY,
+    Subsector.CARS: Sector.TRANSPORT,
+    Subsector.TRUCKS_BUSES: Sector.TRANSPORT,
+    Subsector.AIRPLANES: Sector.TRANSPORT,
+}
+
+# The TOTX4_MEMONIA code was dropped in a 2025 revision, so the total is
+# computed manually from the available components.
+TOTAL_EMISSIONS_CODES = ["TOTX4_MEMO", "CRF1D1A"]
+
+# Sector with all emissions not covered by the other sectors.
+REMAINDER_SECTOR = Sector.OTHER
+
+# Table of sector codes for lib/R/emissions-utils.r, see scripts/write-emission-sector-codes.py.
+R_SECTOR_CODES_PATH = Path(__file__).parents[1] / "lib" / "R" / "emission-sector-codes.csv"
+
 SECTOR_LABEL_CZ: dict[Sector, str] = {
     Sector.INDUSTRY: "Průmysl",
     Sector.TRANSPORT: "Doprava (včetně letecké)",
@@ -74,23 +100,36 @@ SECTOR_COLOR_INTERNAL: dict[Sector, str] = {
     Sector.OTHER: "#f8c551",
 }
 
-_subsector_color_sector: Optional[Sector] = None
-_subsector_color_order: Optional[Sector] = 0
+class SubsectorPalette:
+    """
+    Colors of subsectors, each next subsector of a sector gets a lighter shade of the sector
+    color. The counter starts again whenever the sector changes. Use a separate palette for each
+    chart, so that colors do not depend on what was generated before (e.g. in parallel workers).
+    """
 
+    def __init__(self) -> None:
+        self._sector: Optional[Sector] = None
+        self._order = 0
 
-def get_next_internal_subsector_color(sector: Sector) -> str:
-    global _subsector_color_sector, _subsector_color_order
-    # Keep an internal counter for given sector (in a global variable)
-    if sector == _subsector_color_sector:
-        _subsector_color_order += 1
-    else:
-        _subsector_color_sector = sector
-        _subsector_color_order = 1
+    def get_next_color(self, sector: Sector) -> str:
+        if sector == self._sector:
+            self._order += 1
+        else:
+            self._sector = sector
+            self._order = 1
+
+        # For internal purposes, only decrease the alpha value from the base color
+        assert self._order <= 10, "only up to 10 subsectors is supported"
+        alpha = 255 - 24 * self._order
+        return SECTOR_COLOR_INTERNAL[sector] + hex(alpha)[2:]
 
-    # For internal purposes, only decrease the alpha value from the base color
-    assert _subsector_color_order <= 10, "only up to 10 subsectors is supported"
-    alpha = 255 - 24 * _subsector_color_order
-    return SECTOR_COLOR_INTERNAL[sector] + hex(alpha)[2:]
+
+# Palette shared by notebooks that do not pass their own.
+_default_palette = SubsectorPalette()
+
+
+def get_next_internal_subsector_color(sector: Sector) -> str:
+    return _default_palette.get_next_color(sector)
 
 
 def get_sector_definition(sector: Sector) -> dict:
@@ -104,14 +143,135 @@ def get_sector_definition(sector: Sector) -> dict:
         return definition | {'remainder': True}
 
 
-def get_subsector_definition(sector: Sector, subsector: Subsector) -> dict:
+def get_subsector_definition(sector: Sector, subsector: Subsector,
+                             palette: Optional[SubsectorPalette] = None) -> dict:
+    palette = palette or _default_palette
     return {'id': subsector.value,
             'codes': SUBSECTOR_CODES[subsector],
             'label': SUBSECTOR_LABEL_CZ[subsector],
-            'color': get_next_internal_subsector_color(sector)}
+            'color': palette.get_next_color(sector)}
 
 
 def get_invisible_subsector_definition() -> dict:
     # Sectors without label are not plotted (nor included in the CSV).
     return {'label': '',
             'color': '#ffffff00'}
+
+
+def aggregate_codes(df_codes: pd.DataFrame, matrix: pd.DataFrame) -> pd.DataFrame:
+    """
+    Linear combinations of codes, for each row of a table with one column per code (e.g. one row
+    per geo and year). The matrix has one row per code and one column per output. Missing codes
+    are reported once and counted as 0.0, outputs using a NaN value are NaN.
+    """
+    matrix = matrix[(matrix != 0).any(axis=1)]
+    missing = [code for code in matrix.index if code not in df_codes.columns]
+    if missing:
+        print(f"Warning: missing CRF codes {', '.join(missing)} in the data, filled with 0.0.")
+    values = df_codes.reindex(columns=matrix.index, fill_value=0.0)
+    result = values.fillna(0.0) @ matrix
+    is_nan = (values.isna().astype(float) @ (matrix != 0).astype(float)) > 0
+    return result.mask(is_nan)
+
+
+def _is_covered(code: str, by_code: str) -> bool:
+    # CRF codes are hierarchical, e.g. CRF1A3B1 is a part of CRF1A3B.
+    return code.startswith(by_code)
+
+
+def _find_overlaps(codes: list[tuple[str, str]]) -> list[str]:
+    """ Pairs of (owner, code) where a code is counted twice, directly or via an ancestor. """
+    problems = []
+    for i, (owner, code) in enumerate(codes):
+        for other_owner, other_code in codes[i + 1:]:
+            if code == other_code:
+                problems.append(f"{code} is in both {owner} and {other_owner}")
+            elif _is_covered(code, other_code) or _is_covered(other_code, code):
+                problems.append(f"{code} ({owner}) overlaps with {other_code} ({other_owner})")
+    return problems
+
+
+def _to_matrix(coefficients: dict[Enum, Counter], codes: list[str]) -> pd.DataFrame:
+    matrix = pd.DataFrame(list(coefficients.values()), columns=codes,
+                          index=[key.value for key in coefficients])
+    return matrix.T.fillna(0.0).astype(float)
+
+
+@dataclass
+class SectorHierarchy:
+    """
+    Sectors and subsectors compiled into matrices that turn CRF emissions into their totals (one
+    row per code, one column per sector / subsector). The remainder sector (OTHER) is the total
+    emissions minus all the other sectors. The codes are validated when compiled: no code may be
+    counted twice (either directly or via a code of its ancestor) and subsectors must be parts of
+    their sectors.
+    """
+    sector_matrix: pd.DataFrame
+    subsector_matrix: pd.DataFrame
+
+    @classmethod
+    def from_codes(cls,
+                   sector_codes: dict[Sector, list[str]] = SECTOR_CODES,
+                   subsector_codes: dict[Subsector, list[str]] = SUBSECTOR_CODES,
+                   subsector_sector: dict[Subsector, Sector] = SUBSECTOR_SECTOR
+                   ) -> "SectorHierarchy":
+        problems = _find_overlaps([(sector.value, code)
+                                   for sector, codes in sector_codes.items() for code in codes])
+        if REMAINDER_SECTOR in sector_codes:
+            problems.append(f"{REMAINDER_SECTOR.value} is a remainder and cannot have codes")
+        for sector in set(subsector_sector.values()):
+            problems += _find_overlaps([(subsector.value, code)
+                                        for subsector, codes in subsector_codes.items()
+                                        if subsector_sector[subsector] == sector
+                                        for code in codes])
+        for subsector, codes in subsector_codes.items():
+            sector = subsector_sector[subsector]
+            problems += [f"{code} ({subsector.value}) is not a part of {sector.value}"
+                         for code in codes
+                         if not any(_is_covered(code, by_code)
+                                    for by_code in sector_codes.get(sector, []))]
+        if problems:
+            raise ValueError("Invalid sector codes: " + "; ".join(problems))
+
+        sectors = {sector: Counter(codes) for sector, codes in sector_codes.items()}
+        remainder = Counter(TOTAL_EMISSIONS_CODES)
+        remainder.subtract(chain(*sector_codes.values()))
+        sectors[REMAINDER_SECTOR] = remainder
+        subsectors = {subsector: Counter(codes) for subsector, codes in subsector_codes.items()}
+
+        codes = list(dict.fromkeys(chain(*sectors.values(), *subsectors.values())))
+        return cls(sector_matrix=_to_matrix(sectors, codes),
+                   subsector_matrix=_to_matrix(subsectors, codes))
+
+    def get_sector_totals(self, df_codes: pd.DataFrame) -> pd.DataFrame:
+        """
+        Totals of all sectors (columns by sector ids) for each row of a table with one column per
+        CRF code (e.g. one row per geo and year).
+        """
+        return aggregate_codes(df_codes, self.sector_matrix)
+
+    def get_subsector_totals(self, df_codes: pd.DataFrame) -> pd.DataFrame:
+        """ Totals of all subsectors (columns by subsector ids), as in get_sector_totals. """
+        return aggregate_codes(df_codes, self.subsector_matrix)
+
+    def get_sector_codes_table(self) -> pd.DataFrame:
+        """ Long table of non-zero coefficients of codes in sectors (sector, code, coefficient). """
+        df = self.sector_matrix.T.rename_axis(index="sector", columns="code").stack()
+        df = df[df != 0].astype(int).rename("coefficient").reset_index()
+        return df[["sector", "code", "coefficient"]]
+
+
+_sector_hierarchy: Optional[SectorHierarchy] = None
+
+
+def get_sector_hierarchy() -> SectorHierarchy:
+    """ The hierarchy of the sectors and subsectors defined above, compiled once. """
+    global _sector_hierarchy
+    if _sector_hierarchy is None:
+        _sector_hierarchy = SectorHierarchy.from_codes()
+    return _sector_hierarchy
+
+
+def write_sector_codes_table(path: str | Path = R_SECTOR_CODES_PATH) -> None:
+    """ Write the codes of sectors into the CSV table used by R notebooks. """
+    get_sector_hierarchy().get_sector_codes_table().to_csv(path, index=False)
@@ -1,26 +1,42 @@
+#' Names of emission categories for sector ids used in data_analysis/sectors.py
+#'
+#' @export
+emission_sector_categories <-
+  c(
+    "electricity-heat" = "PowerHeat",
+    industry           = "Industry",
+    transport          = "Transport",
+    buildings          = "Buildings",
+    agriculture        = "Agriculture",
+    waste              = "Waste",
+    other              = "Other"
+  )
+
 #' Calculate emission categories from CRF data
 #'
+#' Sectors are sums of CRF codes (with coefficients) listed in
+#' emission-sector-codes.csv, which is generated from data_analysis/sectors.py
+#' by running `python scripts/write-emission-sector-codes.py`. The path is
+#' relative to the notebooks directory. A category is NA where some of its
+#' codes are missing in the data.
+#'
 #' @export
-fakta_calculate_emission_categories <- function(.data, values_col) {
-  # Pivot to a wide tibble for easier calculations.
-  pivot_wider(.data, names_from = "Code", values_from = {{ values_col }}) |>
-    mutate(
-      # Group into sectors by summing components.
-      PowerHeat = CRF1A1A,
-      Industry = CRF1A2 + CRF1A1B + CRF1A1C + CRF1A3E + CRF2 + CRF1B,
-      Transport = CRF1A3A + CRF1A3B + CRF1A3C + CRF1A3D + CRF1D1A,
-      Buildings = CRF1A4A + CRF1A4B,
-      Agriculture = CRF3 + CRF1A4C,
-      Waste = CRF5,
-      Other = TOTX4_MEMO + CRF1D1A - PowerHeat - Industry - Transport -
-        Buildings - Agriculture - Waste
-    ) |>
-    select(!(starts_with("CRF") | starts_with("TOTX"))) |>
-    # Turn back into long format.
-    pivot_longer(
-      PowerHeat:Other,
-      names_to = "Category",
-      values_to = as_label(enquo(values_col))
+fakta_calculate_emission_categories <- function(
+    .data, values_col, codes_path = "../lib/R/emission-sector-codes.csv") {
+  sector_codes <- read_csv(codes_path, show_col_types = FALSE) |>
+    mutate(Category = unname(emission_sector_categories[sector])) |>
+    select(Category, Code = code, Coefficient = coefficient)
+  key_cols <- setdiff(names(.data), as_label(enquo(values_col)))
+
+  .data |>
+    distinct(pick(!c(Code, {{ values_col }}))) |>
+    cross_join(sector_codes) |>
+    # Codes missing in the data are NA, so that their categories are NA too.
+    left_join(.data, by = key_cols) |>
+    # Group into sectors by summing components.
+    summarise(
+      {{ values_col }} := sum({{ values_col }} * Coefficient),
+      .by = !c(Code, {{ values_col }}, Coefficient)
     )
 }
 
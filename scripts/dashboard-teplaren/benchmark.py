@@ -0,0 +1,307 @@
+#!/usr/bin/env python
+"""Benchmark of the heating plant dashboard export on synthetic workbooks.
+
+Generates workbooks with the four sheets read by `read_dataset` at several
+multiples of today's numbers of plants and projects, times each stage of the
+export and records its peak memory. Results are written as JSON, so that they
+can be compared across commits (see `--compare`)."""
+
+import argparse
+import io
+import json
+import logging
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable
+
+import openpyxl
+import pandas as pd
+
+from serialize import (
+    CHP_STATUS_MAP,
+    DH_STATUS_MAP,
+    FUELS_MAP,
+    compute_highlights,
+    process_rows,
+    read_dataset,
+)
+from writers import YamlWriter
+
+# Approximate size of the dataset today (number of rows in each sheet).
+BASE_COUNTS: dict[str, int] = {
+    "plants": 100,
+    "mf_projects": 150,
+    "chp_projects": 200,
+    "ippc_permits": 100,
+}
+
+DEFAULT_SCALES = (1, 10, 100)
+
+DH_SYSTEMS_COLUMNS = [
+    "whole",
+    "publish_to_web",
+    "name",
+    "name_details",
+    "lon",
+    "lat",
+    "status_simple",
+    "status_text",
+    "status_notes",
+    "owner",
+    "owner_web",
+    "num_households",
+    "munis_supplied_simple",
+    "fuels_main_today",
+    "fuels_main_future",
+    "fuels_secondary_future",
+    "fuels_secondary_today",
+    "other_heating",
+    "share_households",
+    "share_households_dhs_in_czechia",
+    "ghg_2021",
+    "ghg_2022",
+    "ghg_2023",
+    "ghg_note",
+    "ghg_share",
+    "mf_application_ids",
+    "chp_application_ids",
+    "ippc_ids",
+]
+
+
+def generate_workbook(filename: str | Path, scale: int = 1, seed: int = 0) -> None:
+    """Write a synthetic workbook with `scale` times today's numbers of plants
+    and projects. The sheets have the same names, leading rows and columns as
+    the real dataset, values are random but deterministic for a given seed."""
+
+    rng = random.Random(seed)
+    counts = {key: count * scale for key, count in BASE_COUNTS.items()}
+    mf_ids = [str(100000 + i) for i in range(counts["mf_projects"])]
+    chp_ids = [f"KVET-{i:06d}" for i in range(counts["chp_projects"])]
+    ippc_ids = [f"IPPC-{i:06d}" for i in range(counts["ippc_permits"])]
+    fuels = list(FUELS_MAP)
+
+    def maybe(value: Any, probability: float) -> Any:
+        return value if rng.random() < probability else None
+
+    def sample_ids(ids: list[str], probability: float, max_count: int) -> str | None:
+        return maybe(", ".join(rng.sample(ids, rng.randint(1, max_count))), probability)
+
+    # Workbooks are written in write-only mode to keep large ones in bounds.
+    workbook = openpyxl.Workbook(write_only=True)
+
+    sheet = workbook.create_sheet("Výstup Přehled velkých tepláren")
+    sheet.append(["Přehled velkých tepláren"])
+    sheet.append([])
+    sheet.append(DH_SYSTEMS_COLUMNS)
+    for i in range(counts["plants"]):
+        sheet.append([
+            rng.random() < 0.95,
+            1 if rng.random() < 0.8 else 0,
+            f"Teplárna {i}",
+            maybe(f"provoz {i}", 0.5),
+            maybe(round(12.1 + 6.7 * rng.random(), 4), 0.95),
+            maybe(round(48.6 + 2.4 * rng.random(), 4), 0.95),
+            rng.choice(list(DH_STATUS_MAP)),
+            f"Stav teplárny {i}",
+            f"Poznámky k teplárně {i}",
+            f"Vlastník {i % 37}",
+            maybe(f"https://vlastnik-{i % 37}.cz", 0.7),
+            rng.randint(100, 100_000),
+            maybe(f"Obec {i}", 0.8),
+            ", ".join(rng.sample(fuels, 2)),
+            maybe(", ".join(rng.sample(fuels, 1)), 0.7),
+            maybe(rng.choice(fuels), 0.5),
+            maybe(rng.choice(fuels), 0.3),
+            maybe("Elektřina", 0.2),
+            maybe(rng.random(), 0.9),
+            maybe(rng.random() / counts["plants"], 0.9),
+            maybe(1e6 * rng.random(), 0.9),
+            1e6 * rng.random(),
+            maybe(1e6 * rng.random(), 0.9),
+            maybe("Odhad emisí", 0.2),
+            rng.random() / counts["plants"],
+            sample_ids(mf_ids, 0.6, 3),
+            sample_ids(chp_ids, 0.4, 3),
+            sample_ids(ippc_ids, 0.4, 2),
+        ])
+
+    sheet = workbook.create_sheet("Vstup ModFond projekty")
+    sheet.append(["Projekty podpořené z Modernizačního fondu"])
+    sheet.append([])
+    sheet.append([
+        "Číslo RM",
+        "Výzva",
+        "Název akce",
+        "Název stručně",
+        "Dotace (Kč)",
+        "Dotace původně (Kč)",
+        "Vyplaceno (Kč)",
+    ])
+    for i, mf_id in enumerate(mf_ids):
+        amount = rng.randint(1_000_000, 500_000_000)
+        sheet.append([
+            int(mf_id),
+            f"HEAT {i % 5}",
+            f"Modernizace  zdroje\n tepla {i}",
+            f"Modernizace {i}",
+            amount,
+            amount * (1 + rng.random() / 5),
+            amount * rng.random(),
+        ])
+
+    sheet = workbook.create_sheet("Vstup Podpora KVET")
+    for _ in range(4):
+        sheet.append(["Provozní podpora KVET"])
+    sheet.append([
+        "Kód",
+        "Instalovaný výkon (MWe)",
+        "Datum \nuvedení do \nprovozu",
+        "Stav",
+        "Druh paliva",
+    ])
+    for chp_id in chp_ids:
+        sheet.append([
+            chp_id,
+            50 * rng.random(),
+            datetime(rng.randint(2015, 2026), rng.randint(1, 12), 1),
+            rng.choice(list(CHP_STATUS_MAP)),
+            rng.choice(["Zemní  plyn", "Biomasa\n tuhá", "Bioplyn"]),
+        ])
+
+    sheet = workbook.create_sheet("Vstup IPPC řízení")
+    sheet.append(["Řízení IPPC"])
+    sheet.append(["Kód", "Název zařízení dle IPPC", "Odkaz"])
+    for ippc_id in ippc_ids:
+        sheet.append([ippc_id, f"Zařízení {ippc_id}", f"https://ippc.example/{ippc_id}"])
+
+    workbook.save(filename)
+
+
+def measure(function: Callable[[], Any], repeat: int) -> tuple[Any, dict[str, float]]:
+    """Run the function `repeat` times and once more under tracemalloc.
+    Returns its result with the best time (in seconds) and peak memory of
+    Python allocations (in bytes)."""
+
+    seconds = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        seconds.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    try:
+        function()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return result, {"seconds": min(seconds), "peak_bytes": peak}
+
+
+def benchmark_scale(scale: int, workdir: Path, repeat: int) -> dict[str, dict[str, float]]:
+    filename = workdir / f"dashboard-{scale}x.xlsx"
+    generate_workbook(filename, scale)
+
+    # A fresh cache directory for each run, so that sheets are really parsed.
+    def read() -> Any:
+        with tempfile.TemporaryDirectory(dir=workdir) as cache_dir:
+            return read_dataset(filename, cache_dir=cache_dir)
+
+    stages = {}
+    dataset, stages["read_sheets"] = measure(read, repeat)
+    df_dhs_visible = dataset.dh_systems.query("publish_to_web == 1")
+    df_dhs_hidden = dataset.dh_systems.query("publish_to_web != 1")
+
+    (items, _, _), stages["process_rows"] = measure(
+        lambda: process_rows(
+            df_dhs_visible, dataset.mf_projects, dataset.chp_projects, dataset.ippc_permits
+        ),
+        repeat,
+    )
+    highlights, stages["highlights"] = measure(
+        lambda: compute_highlights(df_dhs_visible, df_dhs_hidden), repeat
+    )
+
+    def dump_yaml() -> None:
+        writer = YamlWriter(io.StringIO())
+        for item in items:
+            writer.write_item(item)
+        writer.finish({"highlights": highlights, "items": None})
+
+    _, stages["yaml_dump"] = measure(dump_yaml, repeat)
+    return stages
+
+
+def git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"],
+            capture_output=True,
+            check=True,
+            cwd=Path(__file__).parent,
+            text=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare_reports(report: dict, baseline: dict) -> None:
+    """Print relative changes of time and memory against a baseline report."""
+
+    print(f"Comparison with {baseline.get('commit')}:")
+    for scale, stages in report["scales"].items():
+        for stage, result in stages.items():
+            base = baseline["scales"].get(scale, {}).get(stage)
+            if base is None:
+                continue
+            print(
+                f"  {scale:>4}x {stage:<12} "
+                f"time {result['seconds'] / base['seconds'] - 1:+7.1%}  "
+                f"memory {result['peak_bytes'] / base['peak_bytes'] - 1:+7.1%}"
+            )
+
+
+if __name__ == "__main__":
+    logging.basicConfig(
+        format="%(levelname)s [%(asctime)s] %(message)s",
+        datefmt="%Y-%m-%d %H:%M:%S",
+        level=logging.INFO,
+        stream=sys.stderr,
+    )
+    logger = logging.getLogger()
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scales", type=int, nargs="+", default=list(DEFAULT_SCALES))
+    parser.add_argument("--repeat", type=int, default=3, help="Best of this many runs is reported.")
+    parser.add_argument("--output", default="benchmark-results.json")
+    parser.add_argument("--compare", help="Earlier report to compare the results with.")
+    args = parser.parse_args()
+
+    report = {
+        "commit": git_commit(),
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "base_counts": BASE_COUNTS,
+        "scales": {},
+    }
+    with tempfile.TemporaryDirectory() as workdir:
+        for scale in args.scales:
+            logger.info(f"Benchmarking {scale}x today's dataset...")
+            report["scales"][str(scale)] = benchmark_scale(scale, Path(workdir), args.repeat)
+
+    with open(args.output, "w", encoding="utf8") as f:
+        json.dump(report, f, indent=2)
+    logger.info(f"Results written to {args.output}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf8") as f:
+            compare_reports(report, json.load(f))
@@ -9,15 +9,10 @@ OUTFILE="sfzp_aktivni_IS"
 curl -L -o "$OUTFILE.csv" "$URL"
 echo "Downloaded to $OUTFILE.csv"
 
-# Keep only lines containing "ModF"
-{ head -n 1 "$OUTFILE.csv"; grep "ModF" "$OUTFILE.csv"; } > "$OUTFILE.ModF.csv"
-echo "Filtered to only ModF entries in $OUTFILE.ModF.csv"
-
-# Keep only lines containing "HEAT" or "I+"
-{ head -n 1 "$OUTFILE.csv"; grep -E "HEAT|I\+" "$OUTFILE.csv"; } > "$OUTFILE.CHP.csv"
-echo "Filtered to only HEAT or I+ entries in $OUTFILE.CHP.csv"
+# Entries of ModF and of its HEAT and I+ programmes are summed by serialize.py
+# (see sfzp.py) directly from this file.
 
 # Note that the output CSV uses Single Low-9 Quotation Mark inside the company name instead of comma
 # to avoid conflict with the CSV delimiter (and avoid escaping).
 
-echo "Replace . by "," in numeric columns after importing into Google Sheets"
\ No newline at end of file
+echo "Replace . by "," in numeric columns after importing into Google Sheets"
@@ -1,15 +1,22 @@
 #!/usr/bin/env python
+import argparse
+import hashlib
+import json
 import locale
 import logging
 import math
+import pickle
 import re
 import sys
+from dataclasses import dataclass
 from pathlib import Path
-from typing import Any
+from typing import Any, Iterator
 
 import numpy as np
 import pandas as pd
-import yaml
+
+from sfzp import read_sfzp_totals
+from writers import WRITERS, QuotedString, write_gzip_copy
 
 CHP_STATUS_MAP: dict[str, str] = {
     "B: nepodpořeno": "rejected",
@@ -42,13 +49,11 @@ FUELS_MAP: dict[str, str] = {
 }
 
 
-class QuotedString(str):
-    """Wrapper for strings to enforce that it always be surrounded with
-    quotes in YAML representation."""
+# Bump when the parsing of the workbook changes, so that stale cache entries are not reused.
+DATASET_CACHE_VERSION = 2
 
-    @staticmethod
-    def yaml_represent(dumper: yaml.Dumper, data: Any) -> yaml.Node:
-        return dumper.represent_scalar("tag:yaml.org,2002:str", data, style="'")
+# Bump when the items or totals kept for incremental builds change.
+BUILD_STATE_VERSION = 1
 
 
 def approximate_xy_coordinates(lon: float, lat: float) -> tuple[float, float] | None:
@@ -72,117 +77,331 @@ def nan_default(value: Any, default: Any = None) -> Any:
     return value
 
 
-def process_row(row: pd.Series, df_mf: pd.DataFrame, df_chp: pd.DataFrame, df_ippc: pd.DataFrame) -> dict:
-    ghg_cols = [col for col in row.index if col.startswith("ghg_2")]
-    ghg_cols.reverse()  # Reverse to have the latest year last.
-    emissions = row[ghg_cols][::-1].astype(float).div(1e6).round(3)
-    coords = approximate_xy_coordinates(row["lon"], row["lat"])
-
-    item = {
-        "name": row["name"],
-        "name_details": row["name_details"],
-        "x": round(coords[0], 1) if coords else None,
-        "y": round(coords[1], 1) if coords else None,
-        "lon": round(row["lon"], 2) if coords else None,
-        "lat": round(row["lat"], 2) if coords else None,
-        "status": DH_STATUS_MAP.get(row["status_simple"], "unknown"),
-        "status_text": row["status_text"],
-        "notes": row["status_notes"],
-        "owner": row["owner"],
-        "owner_web": nan_default(row["owner_web"]),
-        "num_households": int(nan_default(row["num_households"], 0)),
-        "munis_supplied": nan_default(row["munis_supplied_simple"]),
-        "fuels_main_today": row["fuels_main_today"],
-    }
+def _explode_ids(df_dhs: pd.DataFrame, column: str, df_projects: pd.DataFrame) -> pd.DataFrame:
+    """Explode a column with lists of project IDs and join the referenced
+    projects. The `plant` column holds positions of the plants in `df_dhs`,
+    rows keep the order of plants and of IDs within each plant."""
 
-    if not emissions.isna().all():
-        item["emissions_mtco2eq"] = emissions.fillna(0.0).tolist()
-        item["emissions_latest"] = item["emissions_mtco2eq"][-1]
+    ids = df_dhs[column].reset_index(drop=True)
+    ids = ids[ids.map(lambda x: isinstance(x, list) and len(x) > 0)].explode()
+    df = df_projects.loc[ids.tolist()].rename_axis("id").reset_index()
+    df.insert(0, "plant", ids.index.to_numpy())
+    return df
 
-    if isinstance(row["ghg_note"], str) and row["ghg_note"] != "":
-        item["emissions_note"] = row["ghg_note"]
 
-    for col in (
-        "fuels_main_future",
-        "fuels_secondary_future",
-        "fuels_secondary_today",
-        "other_heating",
-    ):
-        if (isinstance(row[col], str) or isinstance(row[col], list)) and len(
-            row[col]
-        ) > 0:
-            item[col] = row[col]
+def _group_by_plant(plants: pd.Series, entries: list[dict]) -> dict[int, list[dict]]:
+    """Group entries of an exploded table by the plant they belong to."""
 
-    if not np.isnan(row["share_households"]):
-        item["share_households"] = round(100 * row["share_households"])
+    grouped: dict[int, list[dict]] = {}
+    for plant, entry in zip(plants.tolist(), entries):
+        grouped.setdefault(plant, []).append(entry)
+    return grouped
 
-    if not np.isnan(row["share_households_dhs_in_czechia"]):
-        item["share_households_dhs_in_czechia"] = row["share_households_dhs_in_czechia"]
-    else:
-        item["share_households_dhs_in_czechia"] = 0.0
-
-    # Include ModF subsidies.
-    mf_ids = row["mf_application_ids"]
-    mf_subsidies_total = 0
-    if isinstance(mf_ids, list) and len(mf_ids) > 0:
-        item["mf_subsidies"] = []
-
-        for mf_id, mf_row in df_mf.loc[mf_ids].iterrows():
-            item["mf_subsidies"].append(
-                {
-                    "call": mf_row.Call,
-                    "application_id": mf_id,
-                    "name": mf_row.ShortName,
-                    "long_name": mf_row.LongName,
-                    "amount": round(mf_row["Amount"]),
-                    "amount_original": round(mf_row["AmountOriginal"]),
-                    "paid_percent": round(mf_row["AmountPaid"] / mf_row["Amount"] * 100),
-                }
-            )
 
-        mf_subsidies_total = round(df_mf.loc[mf_ids, "Amount"].sum())
-        item["mf_subsidies_total"] = mf_subsidies_total
-        item["mf_subsidies_per_household"] = round(
-            1e6 * mf_subsidies_total / row["num_households"]
+def _process_mf_subsidies(
+    df_dhs: pd.DataFrame, df_mf: pd.DataFrame
+) -> tuple[dict[int, list[dict]], dict[int, int]]:
+    df = _explode_ids(df_dhs, "mf_application_ids", df_mf)
+    entries = [
+        {
+            "call": call,
+            "application_id": mf_id,
+            "name": short_name,
+            "long_name": long_name,
+            "amount": round(amount),
+            "amount_original": round(amount_original),
+            "paid_percent": round(paid_percent),
+        }
+        for call, mf_id, short_name, long_name, amount, amount_original, paid_percent in zip(
+            df["Call"].tolist(),
+            df["id"].tolist(),
+            df["ShortName"].tolist(),
+            df["LongName"].tolist(),
+            df["Amount"].tolist(),
+            df["AmountOriginal"].tolist(),
+            (df["AmountPaid"] / df["Amount"] * 100).tolist(),
         )
+    ]
+    totals = {plant: round(total) for plant, total in df.groupby("plant")["Amount"].sum().items()}
+    return _group_by_plant(df["plant"], entries), totals
 
-    # Include CHP subsidies
-    chp_ids = row["chp_application_ids"]
-    chp_subsidies_total_accepted = 0
-    if isinstance(chp_ids, list) and len(chp_ids) > 0:
-        item["chp_subsidies"] = []
-        sum_power = 0
-        for chp_id, chp_row in df_chp.loc[chp_ids].iterrows():
-            status = CHP_STATUS_MAP.get(chp_row["Status"], "unknown")
-            if status == "accepted":
-                sum_power += chp_row["Power"]
-            item["chp_subsidies"].append(
-                {
-                    "power": round(chp_row["Power"]),
-                    "since": QuotedString(chp_row["SinceDate"].strftime("%m/%Y")),
-                    "fuel": chp_row["Fuel"],
-                    "status": status,
-                }
-            )
-        chp_subsidies_total_accepted = round(sum_power)
-        item["chp_subsidies_total_accepted"] = chp_subsidies_total_accepted
-
-    # Include IPPC permits
-    ippc_ids = row["ippc_ids"]
-    if isinstance(ippc_ids, list) and len(ippc_ids) > 0:
-        item["ippc_permits"] = []
-        for ippc_id, ippc_row in df_ippc.loc[ippc_ids].iterrows():
-            item["ippc_permits"].append(
-                {
-                    "name": ippc_row["Name"],
-                    "url": ippc_row["URL"],
-                }
+
+def _process_chp_subsidies(
+    df_dhs: pd.DataFrame, df_chp: pd.DataFrame
+) -> tuple[dict[int, list[dict]], dict[int, int]]:
+    df = _explode_ids(df_dhs, "chp_application_ids", df_chp)
+    status = df["Status"].map(CHP_STATUS_MAP).fillna("unknown")
+    entries = [
+        {
+            "power": round(power),
+            "since": QuotedString(since.strftime("%m/%Y")),
+            "fuel": fuel,
+            "status": status,
+        }
+        for power, since, fuel, status in zip(
+            df["Power"].tolist(),
+            df["SinceDate"].tolist(),
+            df["Fuel"].tolist(),
+            status.tolist(),
+        )
+    ]
+    accepted_power = df["Power"].where(status == "accepted", 0.0)
+    totals = {
+        plant: round(total)
+        for plant, total in accepted_power.groupby(df["plant"]).sum().items()
+    }
+    return _group_by_plant(df["plant"], entries), totals
+
+
+def _process_ippc_permits(df_dhs: pd.DataFrame, df_ippc: pd.DataFrame) -> dict[int, list[dict]]:
+    df = _explode_ids(df_dhs, "ippc_ids", df_ippc)
+    entries = [
+        {"name": name, "url": url}
+        for name, url in zip(df["Name"].tolist(), df["URL"].tolist())
+    ]
+    return _group_by_plant(df["plant"], entries)
+
+
+def iter_processed_rows(
+    df_dhs: pd.DataFrame, df_mf: pd.DataFrame, df_chp: pd.DataFrame, df_ippc: pd.DataFrame
+) -> Iterator[tuple[dict, int, int]]:
+    """Build items for all plants in a batch. The lists of linked ModF, CHP
+    and IPPC projects are exploded and joined with the project tables in one
+    go and the per-plant totals are computed with a groupby. Yields the item
+    of each plant with its totals of ModF subsidies and of accepted CHP power,
+    as soon as the item is assembled."""
+
+    ghg_cols = [col for col in df_dhs.columns if col.startswith("ghg_2")]
+    emissions = df_dhs[ghg_cols].astype(float).div(1e6).round(3)
+    has_emissions = emissions.notna().any(axis=1).tolist()
+    emissions_lists = emissions.fillna(0.0).values.tolist()
+
+    mf_subsidies, mf_totals = _process_mf_subsidies(df_dhs, df_mf)
+    chp_subsidies, chp_totals = _process_chp_subsidies(df_dhs, df_chp)
+    ippc_permits = _process_ippc_permits(df_dhs, df_ippc)
+
+    for plant, row in enumerate(df_dhs.to_dict("records")):
+        coords = approximate_xy_coordinates(row["lon"], row["lat"])
+
+        item = {
+            "name": row["name"],
+            "name_details": row["name_details"],
+            "x": round(coords[0], 1) if coords else None,
+            "y": round(coords[1], 1) if coords else None,
+            "lon": round(row["lon"], 2) if coords else None,
+            "lat": round(row["lat"], 2) if coords else None,
+            "status": DH_STATUS_MAP.get(row["status_simple"], "unknown"),
+            "status_text": row["status_text"],
+            "notes": row["status_notes"],
+            "owner": row["owner"],
+            "owner_web": nan_default(row["owner_web"]),
+            "num_households": int(nan_default(row["num_households"], 0)),
+            "munis_supplied": nan_default(row["munis_supplied_simple"]),
+            "fuels_main_today": row["fuels_main_today"],
+        }
+
+        if has_emissions[plant]:
+            item["emissions_mtco2eq"] = emissions_lists[plant]
+            item["emissions_latest"] = item["emissions_mtco2eq"][-1]
+
+        if isinstance(row["ghg_note"], str) and row["ghg_note"] != "":
+            item["emissions_note"] = row["ghg_note"]
+
+        for col in (
+            "fuels_main_future",
+            "fuels_secondary_future",
+            "fuels_secondary_today",
+            "other_heating",
+        ):
+            if (isinstance(row[col], str) or isinstance(row[col], list)) and len(
+                row[col]
+            ) > 0:
+                item[col] = row[col]
+
+        if not np.isnan(row["share_households"]):
+            item["share_households"] = round(100 * row["share_households"])
+
+        if not np.isnan(row["share_households_dhs_in_czechia"]):
+            item["share_households_dhs_in_czechia"] = row["share_households_dhs_in_czechia"]
+        else:
+            item["share_households_dhs_in_czechia"] = 0.0
+
+        # Include ModF subsidies.
+        mf_subsidies_total = 0
+        if plant in mf_subsidies:
+            item["mf_subsidies"] = mf_subsidies[plant]
+            mf_subsidies_total = mf_totals[plant]
+            item["mf_subsidies_total"] = mf_subsidies_total
+            item["mf_subsidies_per_household"] = round(
+                1e6 * mf_subsidies_total / row["num_households"]
             )
 
-    return item, mf_subsidies_total, chp_subsidies_total_accepted
+        # Include CHP subsidies
+        chp_subsidies_total_accepted = 0
+        if plant in chp_subsidies:
+            item["chp_subsidies"] = chp_subsidies[plant]
+            chp_subsidies_total_accepted = chp_totals[plant]
+            item["chp_subsidies_total_accepted"] = chp_subsidies_total_accepted
+
+        # Include IPPC permits
+        if plant in ippc_permits:
+            item["ippc_permits"] = ippc_permits[plant]
+
+        yield item, mf_subsidies_total, chp_subsidies_total_accepted
+
+
+def process_rows(
+    df_dhs: pd.DataFrame, df_mf: pd.DataFrame, df_chp: pd.DataFrame, df_ippc: pd.DataFrame
+) -> tuple[list[dict], list[int], list[int]]:
+    """Build items for all plants at once. Returns the items and per-plant
+    totals of ModF subsidies and of accepted CHP power."""
+
+    items = []
+    mf_subsidies_totals = []
+    chp_subsidies_totals_accepted = []
+    for item, mf_subsidies_total, chp_subsidies_total_accepted in iter_processed_rows(
+        df_dhs, df_mf, df_chp, df_ippc
+    ):
+        items.append(item)
+        mf_subsidies_totals.append(mf_subsidies_total)
+        chp_subsidies_totals_accepted.append(chp_subsidies_total_accepted)
+
+    return items, mf_subsidies_totals, chp_subsidies_totals_accepted
+
+
+def process_row(row: pd.Series, df_mf: pd.DataFrame, df_chp: pd.DataFrame, df_ippc: pd.DataFrame) -> tuple[dict, int, int]:
+    items, mf_subsidies_totals, chp_subsidies_totals_accepted = process_rows(
+        row.to_frame().T, df_mf, df_chp, df_ippc
+    )
+    return items[0], mf_subsidies_totals[0], chp_subsidies_totals_accepted[0]
+
+
+def plant_keys(df_dhs: pd.DataFrame) -> list[str]:
+    """Stable keys of plants for incremental builds: their names, made unique
+    with a counter for repeated names."""
+
+    keys = []
+    seen: dict[str, int] = {}
+    for name in df_dhs["name"].astype(str).tolist():
+        seen[name] = seen.get(name, 0) + 1
+        keys.append(name if seen[name] == 1 else f"{name} #{seen[name]}")
+    return keys
 
 
-def read_chp_supported_projects(filename: str | Path) -> pd.DataFrame:
+def fingerprint_plants(
+    df_dhs: pd.DataFrame, df_mf: pd.DataFrame, df_chp: pd.DataFrame, df_ippc: pd.DataFrame
+) -> list[str]:
+    """Fingerprints of the input rows of all plants, including the linked
+    ModF, CHP and IPPC rows. A fingerprint changes whenever anything that
+    goes into the item of the plant changes."""
+
+    linked = []
+    for column, df_projects in (
+        ("mf_application_ids", df_mf),
+        ("chp_application_ids", df_chp),
+        ("ippc_ids", df_ippc),
+    ):
+        df = _explode_ids(df_dhs, column, df_projects)
+        linked.append(_group_by_plant(df["plant"], df.drop(columns="plant").to_dict("records")))
+
+    fingerprints = []
+    for plant, row in enumerate(df_dhs.to_dict("records")):
+        digest = hashlib.sha256(repr(sorted(row.items())).encode("utf8"))
+        for linked_rows in linked:
+            digest.update(repr(linked_rows.get(plant, [])).encode("utf8"))
+        fingerprints.append(digest.hexdigest())
+    return fingerprints
+
+
+@dataclass
+class BuildState:
+    """Items and per-plant totals of the previous build, keyed by plant keys,
+    together with the fingerprints of the inputs they were built from."""
+
+    fingerprints: dict[str, str]
+    items: dict[str, dict]
+    mf_subsidies_totals: dict[str, int]
+    chp_subsidies_totals_accepted: dict[str, int]
+    mf_chp_shown_subsidies_total: int = 0
+    chp_shown_subsidies_total_accepted: int = 0
+    version: int = BUILD_STATE_VERSION
+
+    @classmethod
+    def load(cls, filename: str | Path) -> "BuildState | None":
+        """Load the state of the previous build, if there is a compatible one."""
+
+        if not Path(filename).exists():
+            return None
+        with open(filename, "rb") as f:
+            state = pickle.load(f)
+        if state.get("version") != BUILD_STATE_VERSION:
+            return None
+        return cls(**state)
+
+    def save(self, filename: str | Path) -> None:
+        tmp_path = Path(filename).with_suffix(".tmp")
+        with open(tmp_path, "wb") as f:
+            pickle.dump(vars(self), f)
+        tmp_path.replace(filename)
+
+
+def process_rows_incremental(
+    df_dhs: pd.DataFrame,
+    df_mf: pd.DataFrame,
+    df_chp: pd.DataFrame,
+    df_ippc: pd.DataFrame,
+    previous: BuildState | None,
+) -> tuple[BuildState, dict]:
+    """Build items for all plants, reprocessing only the plants whose inputs
+    changed since the previous build. Totals are updated from the deltas of
+    the changed plants. Returns the new state (with items in the current
+    order of plants) and a diff of added, changed and removed items."""
+
+    if previous is None:
+        previous = BuildState(fingerprints={}, items={}, mf_subsidies_totals={},
+                              chp_subsidies_totals_accepted={})
+
+    keys = plant_keys(df_dhs)
+    fingerprints = fingerprint_plants(df_dhs, df_mf, df_chp, df_ippc)
+    changed = [previous.fingerprints.get(key) != fingerprint
+               for key, fingerprint in zip(keys, fingerprints)]
+    changed_keys = [key for key, is_changed in zip(keys, changed) if is_changed]
+    removed_keys = sorted(set(previous.fingerprints) - set(keys))
+
+    new_items, new_mf_totals, new_chp_totals = process_rows(
+        df_dhs[changed], df_mf, df_chp, df_ippc
+    )
+    items = previous.items | dict(zip(changed_keys, new_items))
+    mf_totals = previous.mf_subsidies_totals | dict(zip(changed_keys, new_mf_totals))
+    chp_totals = previous.chp_subsidies_totals_accepted | dict(zip(changed_keys, new_chp_totals))
+
+    # Update the totals by the deltas of changed and removed plants.
+    mf_chp_shown_subsidies_total = previous.mf_chp_shown_subsidies_total
+    chp_shown_subsidies_total_accepted = previous.chp_shown_subsidies_total_accepted
+    for key in changed_keys + removed_keys:
+        mf_chp_shown_subsidies_total -= previous.mf_subsidies_totals.get(key, 0)
+        chp_shown_subsidies_total_accepted -= previous.chp_subsidies_totals_accepted.get(key, 0)
+    mf_chp_shown_subsidies_total += sum(new_mf_totals)
+    chp_shown_subsidies_total_accepted += sum(new_chp_totals)
+
+    state = BuildState(
+        fingerprints=dict(zip(keys, fingerprints)),
+        items={key: items[key] for key in keys},
+        mf_subsidies_totals={key: mf_totals[key] for key in keys},
+        chp_subsidies_totals_accepted={key: chp_totals[key] for key in keys},
+        mf_chp_shown_subsidies_total=mf_chp_shown_subsidies_total,
+        chp_shown_subsidies_total_accepted=chp_shown_subsidies_total_accepted,
+    )
+    diff = {
+        "added": [key for key in changed_keys if key not in previous.fingerprints],
+        "changed": [key for key in changed_keys if key in previous.fingerprints],
+        "removed": removed_keys,
+        "items": {key: state.items[key] for key in changed_keys},
+    }
+    return state, diff
+
+
+def read_chp_supported_projects(filename: str | Path | pd.ExcelFile) -> pd.DataFrame:
     column_mapping = {
         "Instalovaný výkon (MWe)": "Power",
         "Datum \nuvedení do \nprovozu": "SinceDate",
@@ -204,7 +423,7 @@ def read_chp_supported_projects(filename: str | Path) -> pd.DataFrame:
 
     return df
 
-def read_chp_ippc_permits(filename: str | Path) -> pd.DataFrame:
+def read_chp_ippc_permits(filename: str | Path | pd.ExcelFile) -> pd.DataFrame:
     column_mapping = {
         "Název zařízení dle IPPC": "Name",
         "Odkaz": "URL",
@@ -221,7 +440,7 @@ def read_chp_ippc_permits(filename: str | Path) -> pd.DataFrame:
     df = df[list(column_mapping)].rename(columns=column_mapping)
     return df
 
-def read_dh_systems(filename: str | Path) -> pd.DataFrame:
+def read_dh_systems(filename: str | Path | pd.ExcelFile) -> pd.DataFrame:
     def _map_fuels(fuels: list[str] | float) -> list[str] | float:
         if isinstance(fuels, list):
             return [FUELS_MAP.get(f, "unknown") for f in fuels]
@@ -262,7 +481,7 @@ def read_dh_systems(filename: str | Path) -> pd.DataFrame:
     return df
 
 
-def read_modernisation_fund_projects(filename: str | Path) -> pd.DataFrame:
+def read_modernisation_fund_projects(filename: str | Path | pd.ExcelFile) -> pd.DataFrame:
     column_mapping = {
         "Výzva": "Call",
         "Název akce": "LongName",
@@ -291,6 +510,87 @@ def read_modernisation_fund_projects(filename: str | Path) -> pd.DataFrame:
     return df
 
 
+def compute_highlights(df_dhs_visible: pd.DataFrame, df_dhs_hidden: pd.DataFrame) -> list[dict]:
+    """Aggregate shown plants by status, followed by all plants not shown."""
+
+    df_highlights = df_dhs_visible.groupby("status_simple").agg(
+        ghg_share=("ghg_share", "sum"),
+        num_households=("num_households", "sum"),
+        num_items=("name", "count"),
+    )
+    df_highlights = df_highlights.iloc[[1, 2, 0]]
+
+    highlights = [
+        {
+            "status": DH_STATUS_MAP[status_simple],
+            "number": int(row.num_items),
+            "num_households": int(row.num_households),
+            "ghg_share": round(100 * float(row.ghg_share), 2),
+        }
+        for status_simple, row in df_highlights.iterrows()
+    ]
+
+    highlights.append(
+        {
+            "status": "not-shown",
+            "number": len(df_dhs_hidden),
+            "num_households": int(df_dhs_hidden.num_households.sum()),
+            "ghg_share": round(100 * float(df_dhs_hidden.ghg_share.sum()), 2),
+        }
+    )
+
+    return highlights
+
+
+@dataclass
+class Dataset:
+    """All sheets of the dashboard workbook needed for the export."""
+
+    dh_systems: pd.DataFrame
+    mf_projects: pd.DataFrame
+    chp_projects: pd.DataFrame
+    ippc_permits: pd.DataFrame
+
+
+def file_hash(filename: str | Path) -> str:
+    digest = hashlib.sha256()
+    with open(filename, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def read_dataset(filename: str | Path, cache_dir: str | Path | None = None) -> Dataset:
+    """Read all sheets of the dashboard workbook, opening and parsing the file
+    only once (in read-only mode). The parsed sheets are cached in `cache_dir`
+    (next to the workbook by default) keyed by the hash of the workbook."""
+
+    filename = Path(filename)
+    cache_dir = Path(cache_dir) if cache_dir is not None else filename.parent / ".cache"
+    cache_path = cache_dir / f"{file_hash(filename)[:24]}-v{DATASET_CACHE_VERSION}.pickle"
+    if cache_path.exists():
+        with open(cache_path, "rb") as f:
+            return Dataset(**pickle.load(f))
+
+    # Pandas opens workbooks with openpyxl in read-only mode.
+    with pd.ExcelFile(filename, engine="openpyxl") as workbook:
+        dataset = Dataset(
+            dh_systems=read_dh_systems(workbook),
+            mf_projects=read_modernisation_fund_projects(workbook),
+            chp_projects=read_chp_supported_projects(workbook),
+            ippc_permits=read_chp_ippc_permits(workbook),
+        )
+
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    tmp_path = cache_path.with_suffix(".tmp")
+    with open(tmp_path, "wb") as f:
+        # Pickle plain dataframes, so that the cache can be read no matter
+        # whether this file runs as a script or is imported as a module.
+        pickle.dump(vars(dataset), f)
+    tmp_path.replace(cache_path)
+    return dataset
+
+
 if __name__ == "__main__":
     locale.setlocale(locale.LC_ALL, "cs_CZ")
     logging.basicConfig(
@@ -301,41 +601,89 @@ if __name__ == "__main__":
     )
     logger = logging.getLogger()
 
-    items: list[dict] = []
+    parser = argparse.ArgumentParser(description="Export the heating plant dashboard dataset.")
+    parser.add_argument(
+        "--sfzp-csv",
+        default="sfzp_aktivni_IS.csv",
+        help="Open data of SFŽP downloaded by fetch_mf.sh.",
+    )
+    parser.add_argument(
+        "--state",
+        help="Rebuild incrementally, keeping items of unchanged plants in this file between runs.",
+    )
+    parser.add_argument(
+        "--diff",
+        help="Write a JSON diff of added, changed and removed items to this file (needs --state).",
+    )
+    parser.add_argument(
+        "--format",
+        choices=sorted(WRITERS),
+        default="yaml",
+        help="Output format; jsonl writes one plant per line as soon as it is processed.",
+    )
+    parser.add_argument("--output", help="Write to this file instead of the standard output.")
+    parser.add_argument(
+        "--gzip",
+        action="store_true",
+        help="Also write a gzip-compressed copy of the output (needs --output).",
+    )
+    args = parser.parse_args()
+    if args.diff and not args.state:
+        parser.error("--diff requires --state")
+    if args.gzip and not args.output:
+        parser.error("--gzip requires --output")
 
     # TODO: Read from the published GSheet instead.
     dataset_filename = "Dashboard tepláren.xlsx"
 
+    logger.info(f"Reading all sheets from {dataset_filename}...")
+    dataset = read_dataset(dataset_filename)
+
     # Database of district heating systems (DHS).
-    logger.info(f"Reading district heating systems from {dataset_filename}...")
-    df_dhs = read_dh_systems(dataset_filename)
+    df_dhs = dataset.dh_systems
     df_dhs_visible = df_dhs.query("publish_to_web == 1")
     df_dhs_hidden = df_dhs.query("publish_to_web != 1")
 
     # Database of projects supported from the Modernisation Fund (ModF).
-    logger.info("Reading projects supported from the ModFund...")
-    df_mf = read_modernisation_fund_projects(dataset_filename)
+    df_mf = dataset.mf_projects
 
     # Database of projects supported from the CHP programme
     # ("provozní podpora KVET").
-    logger.info(f"Reading supported CHP projects...")
-    df_chp = read_chp_supported_projects(dataset_filename)
+    df_chp = dataset.chp_projects
 
     # Database of IPPC permits for CHP projects
-    logger.info(f"Reading IPPC permits for CHP projects...")
-    df_ippc = read_chp_ippc_permits(dataset_filename)
-
-    mf_chp_shown_subsidies_total = 0
-    chp_shown_subsidies_total_accepted = 0
+    df_ippc = dataset.ippc_permits
 
-    for i, row in df_dhs_visible.iterrows():
-        logger.debug(f"Processing site ‘{row['name']}’...")
+    output = open(args.output, "w", encoding="utf8") if args.output else sys.stdout
+    writer = WRITERS[args.format](output)
 
-        item, mf_subsidies, chp_subsidies_accepted  = process_row(row, df_mf, df_chp, df_ippc)
-
-        items.append(item)
-        mf_chp_shown_subsidies_total += mf_subsidies
-        chp_shown_subsidies_total_accepted += chp_subsidies_accepted
+    if args.state:
+        state, diff = process_rows_incremental(
+            df_dhs_visible, df_mf, df_chp, df_ippc, BuildState.load(args.state)
+        )
+        logger.info(
+            f"Reprocessed {len(diff['items'])} of {len(df_dhs_visible)} sites "
+            f"({len(diff['removed'])} removed)."
+        )
+        state.save(args.state)
+        if args.diff:
+            with open(args.diff, "w", encoding="utf8") as f:
+                json.dump(diff, f, ensure_ascii=False, indent=2)
+
+        for item in state.items.values():
+            writer.write_item(item)
+        mf_chp_shown_subsidies_total = state.mf_chp_shown_subsidies_total
+        chp_shown_subsidies_total_accepted = state.chp_shown_subsidies_total_accepted
+    else:
+        logger.debug(f"Processing {len(df_dhs_visible)} sites...")
+        mf_chp_shown_subsidies_total = 0
+        chp_shown_subsidies_total_accepted = 0
+        for item, mf_subsidies, chp_subsidies_accepted in iter_processed_rows(
+            df_dhs_visible, df_mf, df_chp, df_ippc
+        ):
+            writer.write_item(item)
+            mf_chp_shown_subsidies_total += mf_subsidies
+            chp_shown_subsidies_total_accepted += chp_subsidies_accepted
 
     # Add hidden items.
     num_households_ets1_total = int(df_dhs_visible.num_households.sum() +
@@ -346,47 +694,22 @@ if __name__ == "__main__":
     share_households_ets2_total = 1 - share_households_ets1_total
     num_households_ets2_total = round(num_households_total * share_households_ets2_total)
 
-    df_highlights = df_dhs_visible.groupby("status_simple").agg(
-        ghg_share=("ghg_share", "sum"),
-        num_households=("num_households", "sum"),
-        num_items=("name", "count"),
-    )
-    df_highlights = df_highlights.iloc[[1, 2, 0]]
+    highlights = compute_highlights(df_dhs_visible, df_dhs_hidden)
 
-    highlights = [
-        {
-            "status": DH_STATUS_MAP[status_simple],
-            "number": int(row.num_items),
-            "num_households": int(row.num_households),
-            "ghg_share": round(100 * float(row.ghg_share), 2),
-        }
-        for status_simple, row in df_highlights.iterrows()
-    ]
-
-    highlights.append(
-        {
-            "status": "not-shown",
-            "number": len(df_dhs_hidden),
-            "num_households": int(df_dhs_hidden.num_households.sum()),
-            "ghg_share": round(100 * float(df_dhs_hidden.ghg_share.sum()), 2),
-        }
-    )
-
-    logger.info("All plants processed. Exporting YAML...")
+    logger.info(f"All plants processed. Exporting {args.format}...")
 
     chp_subsidies_total_accepted = df_chp[df_chp["Status"] == "C: podpořeno"]["Power"].sum()
 
-    # Read all ModFond projects
-    mf_subsidies_df = pd.read_csv("sfzp_aktivni_IS.ModF.csv")
-    mf_subsidies_total = mf_subsidies_df["Podpora"].sum()
-
-    mf_chp_subsidies_df = pd.read_csv("sfzp_aktivni_IS.CHP.csv")
-    mf_chp_subsidies_total = mf_chp_subsidies_df["Podpora"].sum()
+    # Sum all ModFond projects (and those from its HEAT and I+ programmes).
+    sfzp_totals = read_sfzp_totals(args.sfzp_csv)
+    mf_subsidies_total = sfzp_totals.totals["ModF"]
+    mf_chp_subsidies_total = sfzp_totals.totals["CHP"]
 
     result = {
         "timestamp": pd.Timestamp.now().strftime("%Y-%m-%d"),
         "highlights": highlights,
-        "items": items,
+        # Items are passed to the writer as they are processed.
+        "items": None,
         "mf_chp_shown_subsidies_total": mf_chp_shown_subsidies_total,
         "mf_chp_subsidies_total": round(mf_chp_subsidies_total / 1e6),
         "mf_subsidies_total": round(mf_subsidies_total / 1e6),
@@ -394,7 +717,10 @@ if __name__ == "__main__":
         "chp_subsidies_total_accepted": round(chp_subsidies_total_accepted),
         "num_households_ets2_total": num_households_ets2_total}
 
-    yaml.add_representer(QuotedString, QuotedString.yaml_represent)
-    yaml.dump(result, sys.stdout, allow_unicode=True, sort_keys=False, width=math.inf)
+    writer.finish(result)
+    if args.output:
+        output.close()
+        if args.gzip:
+            logger.info(f"Wrote compressed copy to {write_gzip_copy(args.output)}")
 
     logger.info("Finished")
@@ -0,0 +1,98 @@
+"""Streaming aggregation of the open data of SFŽP (sfzp_aktivni_IS.csv)."""
+
+import csv
+import logging
+import re
+from dataclasses import dataclass, field
+from pathlib import Path
+
+# Programmes are recognised by a pattern anywhere in a record of the CSV
+# (as grep did on its lines). A record can belong to more than one programme.
+PROGRAMME_PATTERNS: dict[str, re.Pattern] = {
+    # Modernisation Fund.
+    "ModF": re.compile("ModF"),
+    # Heating and CHP programmes of the Modernisation Fund.
+    "CHP": re.compile(r"HEAT|I\+"),
+}
+
+AMOUNT_COLUMN = "Podpora"
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class SubsidyTotals:
+    """Sums of subsidies (in CZK) for each programme, optionally broken down
+    by the values of a grouping column."""
+
+    totals: dict[str, float] = field(default_factory=dict)
+    by_group: dict[str, dict[str, float]] = field(default_factory=dict)
+    num_rows: dict[str, int] = field(default_factory=dict)
+
+
+def parse_amount(value: str) -> float:
+    """Parse an amount of CZK. Empty values count as zero, thousands may be
+    separated by (non-breaking) spaces, or by commas when decimals are
+    separated by a dot. A comma is the decimal separator only in amounts
+    without a dot. Raises ValueError for anything else."""
+
+    value = value.strip().replace("\xa0", "").replace(" ", "")
+    if "." in value:
+        if "," in value[value.index("."):]:
+            raise ValueError(f"Ambiguous separators in amount {value!r}")
+        value = value.replace(",", "")
+    else:
+        value = value.replace(",", ".")
+    return float(value) if value else 0.0
+
+
+def read_sfzp_totals(
+    filename: str | Path,
+    group_column: str | None = None,
+    patterns: dict[str, re.Pattern] = PROGRAMME_PATTERNS,
+) -> SubsidyTotals:
+    """Sum the subsidies of all programmes in a single pass over a local copy
+    of the CSV. Records are streamed one by one by a CSV reader, so quoted
+    fields (even with embedded newlines) are parsed correctly. Only the amount
+    (and the grouping column) of records matching some programme is kept,
+    so memory stays bounded regardless of the size of the file. Records with
+    a malformed amount are skipped with a warning.
+
+    Company names in the file use a Single Low-9 Quotation Mark instead of
+    commas, so that they need no quoting."""
+
+    result = SubsidyTotals(
+        totals={programme: 0.0 for programme in patterns},
+        by_group={programme: {} for programme in patterns} if group_column else {},
+        num_rows={programme: 0 for programme in patterns},
+    )
+
+    with open(filename, encoding="utf-8-sig", newline="") as f:
+        reader = csv.reader(f)
+        header = next(reader)
+        amount_index = header.index(AMOUNT_COLUMN)
+        group_index = header.index(group_column) if group_column else None
+
+        for values in reader:
+            record = ",".join(values)
+            programmes = [name for name, pattern in patterns.items() if pattern.search(record)]
+            if not programmes:
+                continue
+
+            try:
+                amount = parse_amount(values[amount_index])
+            except ValueError:
+                logger.warning(
+                    f"Skipping record ending at line {reader.line_num} of {filename} with "
+                    f"a malformed amount {values[amount_index]!r}."
+                )
+                continue
+            for programme in programmes:
+                result.totals[programme] += amount
+                result.num_rows[programme] += 1
+                if group_index is not None:
+                    groups = result.by_group[programme]
+                    group = values[group_index]
+                    groups[group] = groups.get(group, 0.0) + amount
+
+    return result
@@ -0,0 +1,120 @@
+"""Output backends for the heating plant dashboard export."""
+
+import gzip
+import json
+import math
+import shutil
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Any, TextIO
+
+import yaml
+
+# Use the libyaml emitter when PyYAML is built with it.
+YamlDumper = getattr(yaml, "CDumper", yaml.Dumper)
+
+# The C emitter needs an integer width; this is effectively unlimited.
+YAML_WIDTH = 2**31 - 1
+
+
+class QuotedString(str):
+    """Wrapper for strings to enforce that it always be surrounded with
+    quotes in YAML representation."""
+
+    @staticmethod
+    def yaml_represent(dumper: yaml.Dumper, data: Any) -> yaml.Node:
+        # The C emitter only accepts plain strings as scalar values.
+        return dumper.represent_scalar("tag:yaml.org,2002:str", str(data), style="'")
+
+
+yaml.add_representer(QuotedString, QuotedString.yaml_represent)
+yaml.add_representer(QuotedString, QuotedString.yaml_represent, Dumper=YamlDumper)
+
+
+def _replace_nan(value: Any) -> Any:
+    """Replace NaN values (not allowed in JSON) by None, recursively."""
+
+    if isinstance(value, float) and math.isnan(value):
+        return None
+    if isinstance(value, dict):
+        return {key: _replace_nan(v) for key, v in value.items()}
+    if isinstance(value, list):
+        return [_replace_nan(v) for v in value]
+    return value
+
+
+class OutputWriter(ABC):
+    """Writes the exported dataset into a stream. Items are passed one by
+    one as soon as they are processed, the other top-level fields at the end.
+    The `result` passed to `finish` keeps the order of the fields, the value
+    of its `items` field is ignored. By default, items are kept in memory
+    until `finish`; only writers overriding `write_item` stream them."""
+
+    def __init__(self, stream: TextIO):
+        self.stream = stream
+        self.items: list[dict] = []
+
+    def write_item(self, item: dict) -> None:
+        self.items.append(item)
+
+    def _result_with_items(self, result: dict) -> dict:
+        return {key: self.items if key == "items" else value for key, value in result.items()}
+
+    @abstractmethod
+    def finish(self, result: dict) -> None:
+        """Write the whole dataset (or whatever remains of it)."""
+
+
+class YamlWriter(OutputWriter):
+    """The whole dataset as a single YAML document. Items are buffered and
+    dumped together with the other fields in `finish`."""
+
+    def finish(self, result: dict) -> None:
+        yaml.dump(
+            self._result_with_items(result),
+            self.stream,
+            Dumper=YamlDumper,
+            allow_unicode=True,
+            sort_keys=False,
+            width=YAML_WIDTH,
+        )
+
+
+class JsonWriter(OutputWriter):
+    """The whole dataset as a single JSON document. Items are buffered and
+    dumped together with the other fields in `finish`."""
+
+    def finish(self, result: dict) -> None:
+        json.dump(_replace_nan(self._result_with_items(result)), self.stream, ensure_ascii=False)
+        self.stream.write("\n")
+
+
+class JsonLinesWriter(OutputWriter):
+    """One item per line, written right away, followed by a line with the
+    other top-level fields under the key `summary`."""
+
+    def write_item(self, item: dict) -> None:
+        self.stream.write(json.dumps(_replace_nan(item), ensure_ascii=False))
+        self.stream.write("\n")
+
+    def finish(self, result: dict) -> None:
+        summary = {key: value for key, value in result.items() if key != "items"}
+        self.stream.write(json.dumps({"summary": _replace_nan(summary)}, ensure_ascii=False))
+        self.stream.write("\n")
+
+
+WRITERS: dict[str, type[OutputWriter]] = {
+    "yaml": YamlWriter,
+    "json": JsonWriter,
+    "jsonl": JsonLinesWriter,
+}
+
+
+def write_gzip_copy(filename: str | Path) -> Path:
+    """Write a gzip-compressed copy of a file next to it (e.g. for serving
+    precompressed files on the web)."""
+
+    gzip_filename = Path(f"{filename}.gz")
+    with open(filename, "rb") as f_in, gzip.open(gzip_filename, "wb") as f_out:
+        shutil.copyfileobj(f_in, f_out)
+    return gzip_filename
@@ -0,0 +1,23 @@
+"""
+Writes the CRF codes of emission sectors (from data_analysis/sectors.py) into the CSV table used
+by lib/R/emissions-utils.r. Run it after changing the codes of sectors:
+
+    python scripts/write-emission-sector-codes.py
+"""
+
+import argparse
+import os
+import sys
+
+# Add the root dir to the path, so we can load the module.
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from data_analysis.sectors import R_SECTOR_CODES_PATH, write_sector_codes_table  # noqa: E402
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Write the codes of sectors into a CSV table used by R notebooks.")
+    parser.add_argument("--output", default=R_SECTOR_CODES_PATH)
+    args = parser.parse_args()
+
+    write_sector_codes_table(args.output)
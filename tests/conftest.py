@@ -0,0 +1,76 @@
+""" Shared fixtures of the tests of data_analysis. """
+
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.append(str(Path(__file__).parents[1]))
+
+from data_analysis.cache_utils import CACHE_DIR_ENV  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def cache_dir(tmp_path, monkeypatch):
+    """ Keep caches of each test in its own temporary directory. """
+    path = tmp_path / "cache"
+    monkeypatch.setenv(CACHE_DIR_ENV, str(path))
+    return path
+
+
+# Synthetic hourly PECD data: countries of each technology (file names as in pecd_hourly).
+PECD_COUNTRIES = {
+    "solar": ["AT", "CZ", "DE", "PL"],
+    "onshore": ["AT", "CZ", "DE", "DK", "PL"],
+    "offshore": ["DE", "DK"],
+}
+PECD_CAPACITIES = {
+    "Solar (Photovoltaic)": {"AT00": 3000, "CZ00": 2500, "DE00": 50000, "DEKF": 500,
+                             "PL00": 9000, "DKW1": 1500},
+    "Wind Onshore": {"AT00": 4000, "CZ00": 350, "DE00": 60000, "DKW1": 4500, "PL00": 8000},
+    "Wind Offshore": {"DE00": 9000, "DKW1": 2000, "DKE1": 1000},
+}
+
+
+@pytest.fixture(scope="session")
+def pecd_dir(tmp_path_factory):
+    """ Directory with synthetic hourly PECD files (two climate years) and PEMMDB capacities. """
+    import numpy as np
+    import openpyxl
+    import pandas as pd
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    from data_analysis.pecd_hourly import get_hourly_file_path
+
+    path = tmp_path_factory.mktemp("pecd")
+    rng = np.random.default_rng(0)
+    hours = pd.date_range("2001-01-01", "2001-12-31 23:00", freq="h")
+    for technology, countries in PECD_COUNTRIES.items():
+        frames = []
+        for country in countries:
+            for year in [1995, 2010]:
+                cf = rng.beta(2, 5, len(hours))
+                frames.append(pd.DataFrame({
+                    "country": country, "year": year, "month": hours.month, "day": hours.day,
+                    "hour": hours.hour, "cf": cf}))
+        df = pd.concat(frames, ignore_index=True)
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        table = table.set_column(0, "country", table["country"].dictionary_encode())
+        pq.write_table(table, get_hourly_file_path(technology, data_dir=path),
+                       row_group_size=10_000)
+
+    workbook = openpyxl.Workbook()
+    sheet = workbook.active
+    sheet.title = "TY2025"
+    zones = sorted({zone for capacities in PECD_CAPACITIES.values() for zone in capacities})
+    # Columns B:BE (the first one with sources) of rows 2 to 25, as read by the notebook.
+    zones += [f"X{i:03}" for i in range(55 - len(zones))]
+    sheet.append([])
+    sheet.append([None, "Source"] + zones)
+    sources = list(PECD_CAPACITIES) + [f"Other {i}" for i in range(20)]
+    for source in sources:
+        sheet.append([None, source] + [PECD_CAPACITIES.get(source, {}).get(zone, 0)
+                                       for zone in zones])
+    workbook.save(path / "ERAA2023 PEMMDB Generation.xlsx")
+    return path
@@ -0,0 +1,68 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from data_analysis.allowances_cube import AllowancesCube
+
+
+@pytest.fixture(scope="module")
+def df_long():
+    """ Long table as from get_allowances_long_data (with closed permits and ties). """
+    rng = np.random.default_rng(0)
+    rows = []
+    for registry_code in ["CZ", "DE", "PL"]:
+        for i in range(40):
+            activity = int(rng.choice([20, 21, 24]))
+            for year in [2020, 2021]:
+                value = 0.0 if rng.random() < 0.2 else round(float(rng.random()), 2)
+                rows.append((f"{registry_code}-{i}", year, registry_code, value, activity))
+    df = pd.DataFrame(rows, columns=["PERMIT_IDENTIFIER", "year", "REGISTRY_CODE", "value",
+                                     "MAIN_ACTIVITY_TYPE_CODE"])
+    df["REGISTRY_CODE"] = df["REGISTRY_CODE"].astype("category")
+    return df.set_index(["PERMIT_IDENTIFIER", "year", "REGISTRY_CODE"]).sort_index()
+
+
+def _get_group_baseline(df_long, registry_code, year, main_activity_code):
+    """ Permits of a group filtered from the long table, as in the emissions pie charts. """
+    df = df_long.xs((year, registry_code), level=["year", "REGISTRY_CODE"])
+    if main_activity_code is not None:
+        df = df[df["MAIN_ACTIVITY_TYPE_CODE"] == main_activity_code]
+    return df.loc[df["value"] > 0, "value"]
+
+
+@pytest.mark.parametrize("main_activity_code", [None, 20, 24, 99])
+def test_matches_baseline(df_long, main_activity_code):
+    cube = AllowancesCube.from_long_data(df_long, top_k=10)
+    for registry_code in ["CZ", "DE", "PL", "SK"]:
+        for year in [2020, 2021]:
+            values = (_get_group_baseline(df_long, registry_code, year, main_activity_code)
+                      if registry_code != "SK" else pd.Series(dtype=float))
+            assert cube.get_total(registry_code, year, main_activity_code) == pytest.approx(
+                values.sum())
+            assert cube.get_count(registry_code, year, main_activity_code) == len(values)
+
+            top = values.sort_values(ascending=False, kind="stable")
+            exclude = list(top.index[:2])
+            df = cube.get_top_permits(registry_code, year, main_activity_code, k=5,
+                                      exclude=exclude)
+            expected = top.drop(exclude).head(5)
+            np.testing.assert_allclose(df.to_numpy(), expected.to_numpy())
+            # Ties may come in any order, but the permits have to have the same values.
+            np.testing.assert_allclose(values.loc[df.index].to_numpy(), expected.to_numpy())
+
+
+def test_top_permits_beyond_top_k(df_long):
+    cube = AllowancesCube.from_long_data(df_long, top_k=5)
+    top = cube.get_top_permits("CZ", 2020, k=5)
+    # Fewer permits than asked for are only returned when the whole group is smaller.
+    assert len(cube.get_top_permits("CZ", 2020, main_activity_code=99, k=5)) == 0
+    with pytest.raises(ValueError, match="top_k"):
+        cube.get_top_permits("CZ", 2020, k=5, exclude=top.index[:1])
+    with pytest.raises(ValueError, match="top_k"):
+        cube.get_top_permits("CZ", 2020, k=6)
+
+    small = AllowancesCube.from_long_data(df_long.xs("CZ-1", level="PERMIT_IDENTIFIER",
+                                                     drop_level=False), top_k=5)
+    for year in [2020, 2021]:
+        permits = small.get_top_permits("CZ", year, k=5, exclude=["XX"])
+        assert len(permits) == small.get_count("CZ", year) <= 1
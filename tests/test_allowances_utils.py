@@ -0,0 +1,106 @@
+import zipfile
+
+import numpy as np
+import openpyxl
+import pandas as pd
+import pytest
+
+from data_analysis.allowances_utils import (
+    get_allowances_changes,
+    get_allowances_data,
+    get_allowances_long_data,
+)
+
+
+def _get_allowances_data_baseline(year, registry_code, main_activity_code, eua_path):
+    """ The original two-pass pd.read_excel implementation. """
+    df_test = pd.read_excel(eua_path, header=None, nrows=50)
+    skip_rows = int(np.where(df_test[0] == "REGISTRY_CODE")[0][0])
+    df = pd.read_excel(eua_path, skiprows=skip_rows)
+    df = df.rename(columns={f"VERIFIED_EMISSIONS_{year}": "value"})
+    condition = True
+    if main_activity_code is not None:
+        condition = df["MAIN_ACTIVITY_TYPE_CODE"] == main_activity_code
+    df = df.loc[condition & (df["REGISTRY_CODE"] == registry_code),
+                ["PERMIT_IDENTIFIER", "value", "IDENTIFIER_IN_REG", "MAIN_ACTIVITY_TYPE_CODE"]]
+    df = df.set_index("PERMIT_IDENTIFIER")
+    df["value"] = pd.to_numeric(df["value"], errors="coerce").fillna(0).clip(lower=0).div(1e6)
+    return df.sort_values("value", ascending=False)
+
+
+@pytest.fixture
+def eua_path(tmp_path):
+    workbook = openpyxl.Workbook()
+    sheet = workbook.active
+    sheet.append(["Verified emissions of installations"])
+    sheet.append([])
+    sheet.append(["REGISTRY_CODE", "PERMIT_IDENTIFIER", "IDENTIFIER_IN_REG",
+                  "MAIN_ACTIVITY_TYPE_CODE", "VERIFIED_EMISSIONS_2020",
+                  "VERIFIED_EMISSIONS_2021"])
+    sheet.append(["CZ", "CZ-1", 123.0, 20, 1500000, 1400000])
+    sheet.append(["CZ", "CZ-2", "Plant 2", 20, "Excluded", 200000])
+    sheet.append(["CZ", "CZ-3", 7, 21, -1, 300000.5])
+    sheet.append(["CZ", "CZ-4", None, None, 2500000, None])
+    sheet.append(["DE", "DE-1", "00123", 20, 9000000, 8000000])
+    workbook.save(tmp_path / "written.xlsx")
+
+    # Some tools write integral numbers as floats (e.g. 123.0), which openpyxl reads as float.
+    path = tmp_path / "eua.xlsx"
+    with zipfile.ZipFile(tmp_path / "written.xlsx") as source, zipfile.ZipFile(path, "w") as target:
+        for item in source.infolist():
+            content = source.read(item.filename)
+            if item.filename == "xl/worksheets/sheet1.xml":
+                content = content.replace(b"<v>123</v>", b"<v>123.0</v>")
+            target.writestr(item, content)
+    return path
+
+
+@pytest.mark.parametrize("year, registry_code, main_activity_code", [
+    (2020, "CZ", None), (2021, "CZ", 20), (2020, "DE", None)])
+def test_matches_baseline(eua_path, year, registry_code, main_activity_code):
+    df = get_allowances_data(year, registry_code, main_activity_code, eua_path)
+    df_expected = _get_allowances_data_baseline(year, registry_code, main_activity_code, eua_path)
+    pd.testing.assert_series_equal(df["value"], df_expected["value"])
+    # Identifiers mixing numbers and text are text, numbers written as in the workbook.
+    assert _as_text(df["IDENTIFIER_IN_REG"]) == _as_text(df_expected["IDENTIFIER_IN_REG"])
+
+
+def _as_text(values: pd.Series) -> list:
+    return [None if pd.isna(value) else str(value) for value in values]
+
+
+def test_integral_identifiers(eua_path):
+    df = get_allowances_data(2020, "CZ", None, eua_path)
+    assert df.loc["CZ-1", "IDENTIFIER_IN_REG"] == "123"
+
+
+def test_missing_year(eua_path):
+    with pytest.raises(KeyError):
+        get_allowances_data(2019, "CZ", None, eua_path)
+
+
+def test_long_data_matches_yearly(eua_path):
+    df_long = get_allowances_long_data(eua_path)
+    for year in [2020, 2021]:
+        for registry_code in ["CZ", "DE"]:
+            df = df_long.xs((year, registry_code), level=["year", "REGISTRY_CODE"])
+            df_expected = _get_allowances_data_baseline(year, registry_code, None, eua_path)
+            pd.testing.assert_series_equal(df["value"], df_expected["value"].sort_index(),
+                                           check_index_type=False)
+
+
+def test_changes_match_baseline(eua_path):
+    df = get_allowances_changes(get_allowances_long_data(eua_path), 2021, 2020)
+    for registry_code in ["CZ", "DE"]:
+        current = _get_allowances_data_baseline(2021, registry_code, None, eua_path)["value"]
+        previous = _get_allowances_data_baseline(2020, registry_code, None, eua_path)["value"]
+        df_registry = df.xs(registry_code, level="REGISTRY_CODE")
+        change = (current - previous).rename("change")
+        pd.testing.assert_series_equal(df_registry["change"].sort_index(), change.sort_index(),
+                                       check_index_type=False)
+        share = (current / current.sum()).rename("share")
+        pd.testing.assert_series_equal(df_registry["share"].sort_index(), share.sort_index(),
+                                       check_index_type=False)
+        rank = current.rank(ascending=False, method="min").rename("rank")
+        pd.testing.assert_series_equal(df_registry["rank"].sort_index(), rank.sort_index(),
+                                       check_index_type=False)
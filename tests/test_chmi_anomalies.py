@@ -0,0 +1,101 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from data_analysis.chmi_anomalies import ANOMALY_COLUMNS, StationAnomalies
+from data_analysis.chmi_store import DAYS_IN_LEAP_YEAR, TEMPERATURE_COLUMNS, StationSeries, get_day_index
+
+REFERENCE = (1991, 1995)
+
+
+def _get_series(station_id: str, start: str, end: str, seed: int) -> StationSeries:
+    rng = np.random.default_rng(seed)
+    dates = pd.date_range(start, end)
+    seasonal = 10 - 10 * np.cos(2 * np.pi * dates.dayofyear.to_numpy() / 365)
+    values = {column: (seasonal + offset + rng.normal(0, 3, len(dates))).round(1).astype(np.float32)
+              for column, offset in zip(TEMPERATURE_COLUMNS, [0, 5, -5])}
+    # Missing observations, in a single column only.
+    values["tmax"][rng.choice(len(dates), 40, replace=False)] = np.nan
+    return StationSeries(station_id=station_id,
+                         dates=dates.to_numpy().astype("datetime64[D]"),
+                         day_index=get_day_index(dates.month.to_numpy(), dates.day.to_numpy()),
+                         **values)
+
+
+@pytest.fixture
+def series():
+    return [_get_series("A", "1990-01-01", "1997-12-31", 0),
+            _get_series("B", "1992-06-01", "1997-12-31", 1)]
+
+
+def _to_frame(series: list[StationSeries]) -> pd.DataFrame:
+    df = pd.concat([s.to_frame().assign(station_id=s.station_id).reset_index() for s in series])
+    df[TEMPERATURE_COLUMNS] = df[TEMPERATURE_COLUMNS].astype(np.float64).round(1)
+    df["day_index"] = get_day_index(df["date"].dt.month.to_numpy(), df["date"].dt.day.to_numpy())
+    return df.reset_index(drop=True)
+
+
+def _get_normals_baseline(df: pd.DataFrame, window: int) -> pd.DataFrame:
+    """ Means over the reference period by station and day with a groupby, NaN skipped. """
+    df = df[df["date"].dt.year.between(*REFERENCE)]
+    offsets = np.arange(-(window // 2), window // 2 + 1)
+    df = df.loc[df.index.repeat(len(offsets))].assign(
+        day_index=lambda df: (df["day_index"] + np.tile(offsets, len(df) // len(offsets)))
+        % DAYS_IN_LEAP_YEAR)
+    return df.groupby(["station_id", "day_index"])[TEMPERATURE_COLUMNS].mean()
+
+
+@pytest.mark.parametrize("window", [1, 7])
+def test_normals_match_groupby(series, window):
+    anomalies = StationAnomalies(series)
+    normals = anomalies.get_normals(REFERENCE, window)
+    df_expected = _get_normals_baseline(_to_frame(series), window)
+    for i, station_id in enumerate(anomalies.station_ids):
+        expected = df_expected.loc[station_id].reindex(range(DAYS_IN_LEAP_YEAR)).to_numpy()
+        np.testing.assert_allclose(normals[i], expected, rtol=1e-12, atol=1e-12)
+
+
+def test_missing_observation_keeps_normals(series):
+    # A missing maximum on 2 January 1991 of station A, other temperatures of the day are known.
+    series[0].tmax[np.searchsorted(series[0].dates, np.datetime64("1991-01-02"))] = np.nan
+    normals = StationAnomalies(series).get_normals(REFERENCE)
+    observations = series[0].to_frame().loc[[f"{year}-01-02" for year in range(1991, 1996)]]
+    assert observations["tmax"].isna().sum() == 1
+    np.testing.assert_allclose(normals[0, 1], observations.astype(np.float64).round(1).mean())
+
+
+def test_anomalies_match_groupby(series):
+    df = _to_frame(series)
+    df_normals = _get_normals_baseline(df, 1)
+    df_expected = df.join(df_normals, on=["station_id", "day_index"], rsuffix="_normal")
+    df_anomalies = StationAnomalies(series).to_frame(REFERENCE)
+    for column, anomaly_column in zip(TEMPERATURE_COLUMNS, ANOMALY_COLUMNS):
+        np.testing.assert_allclose(
+            df_anomalies[anomaly_column],
+            df_expected[column] - df_expected[f"{column}_normal"], atol=1e-12)
+
+
+def test_append_matches_rebuild(series):
+    anomalies = StationAnomalies(s.get_range(end="1994-12-31") for s in series)
+    anomalies.get_anomalies(REFERENCE, 7)
+    anomalies.append(s.get_range(start="1995-01-01") for s in series)
+    rebuilt = StationAnomalies(series)
+    np.testing.assert_allclose(anomalies.get_normals(REFERENCE, 7),
+                               rebuilt.get_normals(REFERENCE, 7))
+    # Appended rows follow all earlier ones, so observations are compared in the same order.
+    pd.testing.assert_frame_equal(
+        anomalies.to_frame(REFERENCE, 7).sort_values(["station_id", "date"], ignore_index=True),
+        rebuilt.to_frame(REFERENCE, 7).sort_values(["station_id", "date"], ignore_index=True))
+
+
+def test_exceedances_match_groupby(series):
+    anomalies = StationAnomalies(series)
+    df = anomalies.to_frame(REFERENCE).assign(year=lambda df: df["date"].dt.year)
+    df = df[df["year"].between(1996, 1997)]
+    counts = anomalies.count_exceedances([3.0, -3.0], [(1996, 1997)], REFERENCE, column="tmax")
+    for station_id, df_station in df.groupby("station_id"):
+        num_years = df_station["year"].nunique()
+        assert counts.loc[(station_id, "1996–1997"), 3.0] == pytest.approx(
+            (df_station["anomaly_max"] > 3.0).sum() / num_years)
+        assert counts.loc[(station_id, "1996–1997"), -3.0] == pytest.approx(
+            (df_station["anomaly_max"] < -3.0).sum() / num_years)
@@ -0,0 +1,68 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from data_analysis.chmi_store import StationStore, get_day_index
+
+
+@pytest.fixture
+def csv_dir(tmp_path):
+    """ Station CSVs as in data/chmi (unsorted days, missing temperatures, leap years). """
+    rng = np.random.default_rng(0)
+    for station_id, start, end in [("B1BRNO01", "1999-12-01", "2001-03-31"),
+                                   ("P1PRAG01", "2000-01-01", "2000-12-31")]:
+        dates = pd.date_range(start, end)
+        df = pd.DataFrame({"Y": dates.year, "M": dates.month, "D": dates.day,
+                           "TAVG": rng.normal(10, 8, len(dates)).round(1)})
+        df["TMAX"] = (df["TAVG"] + rng.random(len(dates)) * 5).round(1)
+        df["TMIN"] = (df["TAVG"] - rng.random(len(dates)) * 5).round(1)
+        df.loc[rng.random(len(dates)) < 0.05, "TMIN"] = np.nan
+        df.sample(frac=1, random_state=0).to_csv(tmp_path / f"{station_id}.csv", index=False)
+    return tmp_path
+
+
+def _read_baseline(csv_path):
+    """ The CSV of a station read with pandas (as in the notebooks). """
+    df = pd.read_csv(csv_path)
+    df["date"] = pd.to_datetime(pd.DataFrame({"year": df["Y"], "month": df["M"], "day": df["D"]}))
+    return df.sort_values("date", ignore_index=True)
+
+
+def test_query_matches_csv(csv_dir, tmp_path):
+    store = StationStore(tmp_path / "store")
+    assert store.add_csv_dir(csv_dir) == ["B1BRNO01", "P1PRAG01"]
+    df = store.query(start="2000-02-01", end="2000-03-01")
+    for station_id, df_station in df.groupby("station_id"):
+        expected = _read_baseline(csv_dir / f"{station_id}.csv")
+        expected = expected[expected["date"].between("2000-02-01", "2000-03-01")]
+        np.testing.assert_array_equal(df_station["date"], expected["date"])
+        for column in ["tavg", "tmax", "tmin"]:
+            # Temperatures are stored as float32, rounding gives back the tenths of the CSV.
+            np.testing.assert_array_equal(df_station[column].astype(float).round(1),
+                                          expected[column.upper()])
+    assert len(df) == 2 * 30
+
+
+def test_query_day(csv_dir, tmp_path):
+    store = StationStore(tmp_path / "store")
+    store.add_csv_dir(csv_dir)
+    df = store.query_day(2, 29)
+    assert df["date"].astype(str).tolist() == ["2000-02-29", "2000-02-29"]
+    series = store.load("B1BRNO01")
+    assert series.day_index[series.dates == np.datetime64("2001-03-01")] == get_day_index(3, 1)
+
+
+def test_converted_again_when_changed(csv_dir, tmp_path):
+    store = StationStore(tmp_path / "store")
+    store.add_csv(csv_dir / "P1PRAG01.csv")
+    mtime = (tmp_path / "store" / "P1PRAG01" / "tavg.npy").stat().st_mtime_ns
+    store.add_csv(csv_dir / "P1PRAG01.csv")
+    assert (tmp_path / "store" / "P1PRAG01" / "tavg.npy").stat().st_mtime_ns == mtime
+
+    df = pd.read_csv(csv_dir / "P1PRAG01.csv")
+    df.loc[(df["M"] == 1) & (df["D"] == 1), "TAVG"] = 42.0
+    df.to_csv(csv_dir / "P1PRAG01.csv", index=False)
+    store.add_csv(csv_dir / "P1PRAG01.csv")
+    assert store.load("P1PRAG01").tavg[0] == 42.0
+    with pytest.raises(KeyError):
+        store.load("UNKNOWN")
@@ -0,0 +1,46 @@
+import shutil
+
+import pandas as pd
+import pycountry
+import pytest
+
+from data_analysis.country_resolver import ALIASES_PATH, CountryResolver
+
+
+@pytest.fixture
+def aliases_path(tmp_path):
+    path = tmp_path / "aliases.yaml"
+    shutil.copy(ALIASES_PATH, path)
+    return path
+
+
+def test_resolve_matches_single_lookups(aliases_path):
+    resolver = CountryResolver(aliases_path)
+    names = pd.Series(["Czechia", "Czech Republic", "Côte d'Ivoire", "World", "EU", "SEA", "Atlantis",
+                       None, "Czechia", "DEU"])
+    codes = resolver.resolve(names)
+    assert codes.tolist()[:3] == ["CZE", "CZE", "CIV"]
+    assert codes.tolist()[9] == pycountry.countries.get(alpha_3="DEU").alpha_3
+    # Aggregates, non-countries and unknown names resolve to missing values.
+    assert codes.iloc[3:8].isna().all()
+    assert resolver.resolve(names, aggregates=True).iloc[3:5].tolist() == ["WLD", "EU27"]
+
+
+def test_kosovo_is_not_resolved(aliases_path):
+    assert CountryResolver(aliases_path).resolve_name("Kosovo") is None
+
+
+def test_save_aliases_keeps_comments(aliases_path):
+    original = aliases_path.read_text(encoding="utf8")
+    resolver = CountryResolver(aliases_path)
+    resolver.add_alias("Zaire", "COD", persist=True)
+    resolver.add_alias("Burma", "MMR", persist=True)
+
+    text = aliases_path.read_text(encoding="utf8")
+    assert [line for line in text.splitlines() if line.startswith("#")] == (
+        [line for line in original.splitlines() if line.startswith("#")])
+    assert len(text.splitlines()) == len(original.splitlines()) + 1
+    reloaded = CountryResolver(aliases_path)
+    assert reloaded.aliases == resolver.aliases
+    assert reloaded.aggregates == resolver.aggregates
+    assert reloaded.non_countries == resolver.non_countries
@@ -0,0 +1,114 @@
+import numpy as np
+import openpyxl
+import pandas as pd
+import pytest
+
+from data_analysis.edgar_utils import (
+    EDGAR_RELEASES,
+    GWP_SETS,
+    Gas,
+    get_emissions_by_gas,
+    get_gwp_weights,
+    load_edgar,
+)
+
+CODES = ["AUT", "CZE", "DEU", "SVK", "AIR", "SEA"]
+SECTORS = ["1.A.1.a", "1.A.3.b", "3.A.1"]
+YEARS = list(range(1990, 1996))
+
+
+@pytest.fixture(scope="module")
+def edgar_dir(tmp_path_factory):
+    """ Synthetic files of the v8.0 release with the sheet (and header row) as in EDGAR. """
+    data_dir = tmp_path_factory.mktemp("edgar")
+    (data_dir / "v8.0").mkdir()
+    rng = np.random.default_rng(0)
+    for gas, file in EDGAR_RELEASES["v8.0"].items():
+        workbook = openpyxl.Workbook()
+        sheet = workbook.active
+        sheet.title = "IPCC 2006"
+        for i in range(9):
+            sheet.append([f"Note {i}"] if i == 2 else [])
+        sheet.append(["IPCC_annex", "Country_code_A3", "Name",
+                      "ipcc_code_2006_for_standard_report", "fossil_bio"]
+                     + [f"Y_{year}" for year in YEARS])
+        for code in CODES:
+            for sector in SECTORS:
+                values = rng.random(len(YEARS)) * 100
+                values[rng.random(len(YEARS)) < 0.2] = np.nan
+                sheet.append(["Annex_I", code, code.title(), sector, "fossil"]
+                             + [None if np.isnan(v) else v for v in values])
+        workbook.save(data_dir / "v8.0" / file)
+    return data_dir
+
+
+def _read_baseline(edgar_dir, gases):
+    frames = []
+    for gas in gases:
+        df = pd.read_excel(edgar_dir / "v8.0" / EDGAR_RELEASES["v8.0"][gas],
+                           sheet_name="IPCC 2006", header=9)
+        df = df.melt(id_vars=["Country_code_A3", "ipcc_code_2006_for_standard_report"],
+                     value_vars=[f"Y_{year}" for year in YEARS], var_name="year")
+        frames.append(df.dropna(subset=["value"]).assign(gas=gas.value))
+    df = pd.concat(frames, ignore_index=True)
+    df["year"] = df["year"].str[2:].astype(int)
+    return df.rename(columns={"Country_code_A3": "code",
+                              "ipcc_code_2006_for_standard_report": "sector"})
+
+
+def test_load_gases(edgar_dir):
+    df = load_edgar(gases=[Gas.N2O, Gas.CH4], codes=["CZE", "DEU", "SEA"], years=(1991, 1994),
+                    international=False, data_dir=edgar_dir)
+    expected = _read_baseline(edgar_dir, [Gas.N2O, Gas.CH4])
+    expected = expected[expected["code"].isin(["CZE", "DEU"])
+                        & expected["year"].between(1991, 1994)]
+    keys = ["gas", "code", "year", "sector"]
+    df = df.astype({"gas": str, "code": str, "sector": str}).sort_values(keys, ignore_index=True)
+    expected = expected.sort_values(keys, ignore_index=True)
+    pd.testing.assert_frame_equal(df[keys], expected[keys], check_dtype=False)
+    np.testing.assert_allclose(df["value"], expected["value"])
+
+
+def test_load_caches_files_per_gas(edgar_dir, tmp_path):
+    df = load_edgar(gases=[Gas.CO2], data_dir=edgar_dir)
+    assert df["gas"].unique().tolist() == ["CO2"]
+    # Files of other gases are not parsed (nor even needed) for a single gas.
+    for gas in [Gas.CH4, Gas.N2O]:
+        (edgar_dir / "v8.0" / EDGAR_RELEASES["v8.0"][gas]).rename(tmp_path / gas.value)
+    try:
+        pd.testing.assert_frame_equal(load_edgar(gases=[Gas.CO2], data_dir=edgar_dir), df)
+    finally:
+        for gas in [Gas.CH4, Gas.N2O]:
+            (tmp_path / gas.value).rename(edgar_dir / "v8.0" / EDGAR_RELEASES["v8.0"][gas])
+
+
+def test_emissions_by_gas(edgar_dir):
+    df = load_edgar(data_dir=edgar_dir)
+    groups = {"V4": ["CZE", "SVK", "POL", "HUN"], "INT": ["AIR", "SEA"]}
+    df_emissions = get_emissions_by_gas(df, gwp="AR6", groups=groups)
+
+    expected = _read_baseline(edgar_dir, list(Gas))
+    frames = [expected[expected["code"].isin(members)].assign(code=name)
+              for name, members in groups.items()]
+    expected = pd.concat(frames).pivot_table(index=["code", "year"], columns="gas",
+                                             values="value", aggfunc="sum")
+    expected["ghg"] = sum(expected[gas.value] * GWP_SETS["AR6"][gas] for gas in Gas)
+    np.testing.assert_allclose(df_emissions[expected.columns], expected)
+    assert df_emissions.index.equals(expected.index)
+
+
+def test_emissions_without_groups(edgar_dir):
+    df = get_emissions_by_gas(load_edgar(data_dir=edgar_dir), groups={})
+    assert df.empty
+    assert "ghg" in df.columns
+
+
+def test_gas_without_gwp(edgar_dir):
+    df = load_edgar(gases=[Gas.CO2, Gas.CH4], data_dir=edgar_dir)
+    with pytest.raises(ValueError, match="CH4"):
+        get_gwp_weights(df, {Gas.CO2: 1})
+    with pytest.raises(ValueError, match="CH4"):
+        get_emissions_by_gas(df, {Gas.CO2: 1, Gas.N2O: 265})
+    # Gases missing in the data need no GWP.
+    df_co2 = df[df["gas"] == "CO2"]
+    assert get_gwp_weights(df_co2, {Gas.CO2: 1}).tolist() == [1] * len(df_co2)
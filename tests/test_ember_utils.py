@@ -0,0 +1,81 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from data_analysis.ember_utils import aggregate_areas, load_ember_yearly
+
+COLUMNS = ["Area", "ISO 3 code", "Year", "Area type", "EU", "Category", "Subcategory",
+           "Variable", "Unit", "Value"]
+
+
+@pytest.fixture(scope="module")
+def ember_csv(tmp_path_factory):
+    rng = np.random.default_rng(0)
+    areas = [("Czechia", "CZE", 1), ("Germany", "DEU", 1), ("Norway", "NOR", 0),
+             ("EU", None, 0), ("World", None, 0)]
+    variables = [("Electricity generation", "Fuel", "Coal", "TWh"),
+                 ("Electricity generation", "Fuel", "Solar", "TWh"),
+                 ("Electricity generation", "Aggregate fuel", "Fossil", "TWh"),
+                 ("Electricity generation", "Total", "Total Generation", "TWh"),
+                 ("Power sector emissions", "Fuel", "Coal", "mtCO2"),
+                 ("Electricity generation", "Fuel", "Coal", "%"),
+                 ("Power sector emissions", "CO2 intensity", "CO2 intensity", "gCO2/kWh")]
+    rows = [(area, code, year, "Country" if code else "Region", eu, *variable, rng.random())
+            for area, code, eu in areas for year in range(2018, 2023) for variable in variables]
+    path = tmp_path_factory.mktemp("ember") / "yearly.csv"
+    pd.DataFrame(rows, columns=COLUMNS).to_csv(path, index=False)
+    return path
+
+
+def test_columns_in_csv_order(ember_csv):
+    assert list(load_ember_yearly(ember_csv).columns) == COLUMNS
+    columns = ["Value", "Unit", "Area"]
+    assert list(load_ember_yearly(ember_csv, columns=columns).columns) == ["Area", "Unit", "Value"]
+
+
+def test_filters(ember_csv):
+    df = load_ember_yearly(ember_csv, categories=["Electricity generation"], units=["TWh"],
+                           variables=["Coal", "Fossil"], eu=True, years=(2019, 2021))
+    expected = pd.read_csv(ember_csv, float_precision="round_trip")
+    expected = expected[(expected["Category"] == "Electricity generation")
+                        & (expected["Unit"] == "TWh")
+                        & expected["Variable"].isin(["Coal", "Fossil"]) & (expected["EU"] == 1)
+                        & expected["Year"].between(2019, 2021)]
+    df = df.astype(str).sort_values(["Area", "Year", "Variable"], ignore_index=True)
+    expected = expected.astype(str).sort_values(["Area", "Year", "Variable"], ignore_index=True)
+    pd.testing.assert_frame_equal(df, expected)
+
+
+def test_aggregate_areas(ember_csv, capsys):
+    df = load_ember_yearly(ember_csv)
+    df_groups = aggregate_areas(df, {"EU27": ["CZE", "DEU"], "NORDIC": ["NOR", "SWE"]})
+    # Shares and intensities of countries cannot be summed.
+    assert "%, gCO2/kWh cannot be summed" in capsys.readouterr().out
+    assert set(df_groups["Unit"]) == {"TWh", "mtCO2"}
+
+    # Sums of the members as in the notebooks (aggregate areas are not members).
+    expected = pd.read_csv(ember_csv, float_precision="round_trip")
+    keys = ["Year", "Category", "Subcategory", "Variable", "Unit"]
+    expected = expected[expected["Unit"].isin(["TWh", "mtCO2"])]
+    frames = []
+    for group, members in [("EU27", ["CZE", "DEU"]), ("NORDIC", ["NOR", "SWE"])]:
+        frames.append(expected[expected["ISO 3 code"].isin(members)]
+                      .groupby(keys, as_index=False)["Value"].sum()
+                      .assign(**{"ISO 3 code": group}))
+    expected = pd.concat(frames, ignore_index=True)[["ISO 3 code"] + keys + ["Value"]]
+    # Coal has both a generation and an emission row per year, Subcategory keeps fuels apart
+    # from the aggregate ones.
+    assert len(df_groups) == len(expected) == 2 * 5 * 5
+    df_groups = (df_groups.astype({column: str for column in keys})
+                 .sort_values(["ISO 3 code"] + keys, ignore_index=True))
+    expected = (expected.astype({column: str for column in keys})
+                .sort_values(["ISO 3 code"] + keys, ignore_index=True))
+    np.testing.assert_allclose(df_groups["Value"], expected["Value"])
+    pd.testing.assert_frame_equal(df_groups[keys], expected[keys])
+
+
+def test_aggregate_no_groups(ember_csv):
+    df = aggregate_areas(load_ember_yearly(ember_csv, columns=["ISO 3 code", "Year", "Value"]),
+                         {})
+    assert df.empty
+    assert list(df.columns) == ["ISO 3 code", "Year", "Value"]
@@ -0,0 +1,88 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from data_analysis.emissions_pie_chart import (
+    WedgeMatrix,
+    get_emissions_sum_value,
+    get_emissions_wedges,
+)
+
+DEFINITION = [
+    {"id": "energy", "label": "Energy", "color": "#000001", "codes": ["CRF1A1", "CRF1A2"],
+     "breakdown": [
+         {"id": "heat", "label": "Heat", "color": "#000002", "remainder": True},
+         {"id": "plant", "label": "Plant", "color": "#000003", "codes": ["CZ-0001"]},
+     ]},
+    {"id": "transport", "label": "Transport", "color": "#000004", "codes": ["CRF1A3"]},
+    {"id": "agriculture", "label": "Agriculture", "color": "#000005", "codes": ["CRF3", "CRF9"]},
+    {"id": "other", "label": "Other", "color": "#000006", "remainder": True,
+     "breakdown": [
+         {"id": "waste", "label": "Waste", "color": "#000007", "codes": ["CRF5"]},
+         {"id": "rest", "label": "", "color": "#000008", "remainder": True},
+     ]},
+]
+
+CODES = ["TOTX4_MEMO", "CRF1D1A", "CRF1A1", "CRF1A2", "CZ-0001", "CRF1A3", "CRF3", "CRF5"]
+
+
+def _get_emissions_sum_value_baseline(keys, df):
+    """ The original per-code lookups. """
+    return sum(df.loc[key, "value"] if key in df.index else 0.0 for key in keys)
+
+
+def _get_wedge_values_baseline(df):
+    """ Inner and outer wedges as computed by the pie chart notebooks. """
+    total = df.loc["TOTX4_MEMO", "value"] + df.loc["CRF1D1A", "value"]
+    values = {}
+    for wedge_def in DEFINITION:
+        all_codes = sum((d.get("codes", []) for d in DEFINITION), start=[])
+        value = (_get_emissions_sum_value_baseline(wedge_def["codes"], df) if "codes" in wedge_def
+                 else total - _get_emissions_sum_value_baseline(all_codes, df))
+        values[wedge_def["id"]] = value
+        breakdown = wedge_def.get("breakdown", [])
+        breakdown_codes = sum((d.get("codes", []) for d in breakdown), start=[])
+        for sub_def in breakdown:
+            values[f"{wedge_def['id']}_{sub_def['id']}"] = (
+                _get_emissions_sum_value_baseline(sub_def["codes"], df) if "codes" in sub_def
+                else value - _get_emissions_sum_value_baseline(breakdown_codes, df))
+    return pd.Series(values)
+
+
+@pytest.fixture
+def df_codes():
+    rng = np.random.default_rng(0)
+    index = pd.MultiIndex.from_product([["CZ", "SK"], [2020, 2021, 2022]], names=["geo", "year"])
+    df = pd.DataFrame(rng.uniform(1, 10, (len(index), len(CODES))), index=index, columns=CODES)
+    df["TOTX4_MEMO"] *= 20
+    return df
+
+
+def test_wedge_matrix_matches_baseline(df_codes):
+    matrix = WedgeMatrix.from_definition(DEFINITION)
+    df_values = matrix.get_values(df_codes)
+    totals = matrix.get_total_values(df_codes)
+    for key, row in df_codes.iterrows():
+        df = row.rename("value").to_frame()
+        expected = _get_wedge_values_baseline(df)
+        pd.testing.assert_series_equal(df_values.loc[key, expected.index], expected,
+                                       check_names=False)
+        assert totals[key] == pytest.approx(df.loc["TOTX4_MEMO", "value"]
+                                            + df.loc["CRF1D1A", "value"])
+
+
+def test_wedges_match_baseline(df_codes):
+    df = df_codes.loc[("CZ", 2021)].rename("value").to_frame()
+    expected = _get_wedge_values_baseline(df)
+    wedges = get_emissions_wedges(DEFINITION, 100.0, df)
+    for wedge in wedges:
+        if "remainder" not in next(d for d in DEFINITION if d["id"] == wedge.id):
+            assert wedge.value == pytest.approx(expected[wedge.id])
+
+
+def test_sum_of_repeated_codes():
+    df = pd.DataFrame({"value": [1.0, 2.0, 3.0, np.nan]}, index=["A", "B", "A", "N"])
+    assert get_emissions_sum_value(["A", "B"], df) == 6.0
+    assert get_emissions_sum_value(["A", "A", "X"], df) == 8.0
+    assert get_emissions_sum_value([], df) == 0.0
+    assert np.isnan(get_emissions_sum_value(["N", "B"], df))
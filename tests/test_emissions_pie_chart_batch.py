@@ -0,0 +1,29 @@
+import pytest
+
+from data_analysis import emissions_pie_chart_batch
+from data_analysis.emissions_pie_chart_batch import _get_strings
+from data_analysis.illustrator_strings import czech_float
+
+# Keys of the strings of the pie chart notebooks, used by the localization templates.
+NOTEBOOK_KEYS = ["country-name-l", "country-name-g", "year", "total-weight", "total-per-person",
+                 "lulucf-emissions-abs", "lulucf-emissions-pct", "data-source", "version", "slug"]
+
+
+@pytest.fixture(autouse=True)
+def population(monkeypatch):
+    monkeypatch.setattr(emissions_pie_chart_batch, "get_eurostat_population_data_for_geo",
+                        lambda geo, year: 10_000_000)
+
+
+@pytest.mark.parametrize("geo", ["CZ", "SK", "EU27_2020", "AT"])
+def test_strings_have_notebook_keys(geo):
+    assert list(_get_strings(geo, 2022, 100.0, -5.0)) == NOTEBOOK_KEYS
+
+
+def test_strings_as_in_notebooks():
+    strings = _get_strings("CZ", 2022, 100.0, -5.0)
+    assert strings["country-name-l"] == "v ČR"
+    assert strings["slug"] == "emise-cr"
+    assert strings["total-per-person"] == "10,00"
+    # The EU is in whole megatons.
+    assert _get_strings("EU27_2020", 2022, 3000.4, -200.0)["total-weight"] == czech_float(3000.4, 0)
@@ -0,0 +1,141 @@
+import os
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from data_analysis import eurostat_cache, eurostat_crf_utils, eurostat_population_utils
+from data_analysis.eurostat_cache import (
+    EurostatOfflineError,
+    LocalEurostatClient,
+    configure_eurostat_cache,
+    get_eurostat_data_df,
+)
+from data_analysis.eurostat_crf_utils import (
+    get_eurostat_crf_data,
+    get_eurostat_crf_data_for_code,
+    get_eurostat_crf_data_for_geo,
+)
+from data_analysis.eurostat_geo import Geo
+from data_analysis.eurostat_population_utils import (
+    get_eurostat_population_data,
+    get_eurostat_population_data_for_geo,
+)
+
+GEOS = ["AT", "CZ", "DE", "EU27_2020", "SK"]
+CRF_CODES = ["TOTX4_MEMO", "CRF1A1", "CRF1D1A", "CRF3"]
+YEARS = [str(year) for year in range(2018, 2023)]
+
+
+@pytest.fixture
+def fixtures():
+    """ Wide frames as from eurostat.get_data_df (a few dimensions only). """
+    rng = np.random.default_rng(0)
+    gge = pd.DataFrame([("GHG", unit, crf, geo) for unit in ["MIO_T", "THS_T"]
+                        for crf in CRF_CODES for geo in GEOS],
+                       columns=["airpol", "unit", "src_crf", "geo\\TIME_PERIOD"])
+    gge[YEARS] = rng.random((len(gge), len(YEARS))) * 100
+    pjan = pd.DataFrame([(age, sex, geo) for age in ["TOTAL", "Y_LT1"] for sex in ["T", "F"]
+                         for geo in GEOS], columns=["age", "sex", "geo\\TIME_PERIOD"])
+    pjan[YEARS] = rng.integers(1_000, 100_000_000, (len(pjan), len(YEARS))).astype(float)
+    pjan.loc[pjan["geo\\TIME_PERIOD"] == "SK", "2022"] = np.nan
+    return {"env_air_gge": gge, "demo_pjan": pjan}
+
+
+class CountingClient(LocalEurostatClient):
+    def __init__(self, fixtures):
+        super().__init__(fixtures)
+        self.requests = []
+
+    def get_data_df(self, code, filter_pars=None):
+        self.requests.append((code, filter_pars))
+        return super().get_data_df(code, filter_pars)
+
+
+@pytest.fixture
+def client(fixtures, tmp_path, monkeypatch):
+    """ Fixtures served through a fresh cache, module state is restored after the test. """
+    for name in ["_client", "_cache_dir", "_ttl_seconds", "_offline"]:
+        monkeypatch.setattr(eurostat_cache, name, getattr(eurostat_cache, name))
+    monkeypatch.setattr(eurostat_crf_utils, "_crf_panel", None)
+    monkeypatch.setattr(eurostat_population_utils, "_population_index", None)
+    monkeypatch.setattr(eurostat_population_utils, "_loaded_years", set())
+    client = CountingClient(fixtures)
+    configure_eurostat_cache(client=client, cache_dir=tmp_path, ttl_seconds=60, offline=False)
+    return client
+
+
+def test_cached_requests(client):
+    df = get_eurostat_data_df("demo_pjan", {"startPeriod": 2020, "age": ["TOTAL", "Y_LT1"]})
+    # Filters are normalized, so that equivalent ones map to the same entry.
+    df_cached = get_eurostat_data_df("demo_pjan", {"age": ["Y_LT1", "TOTAL"],
+                                                   "startPeriod": "2020"})
+    assert len(client.requests) == 1
+    pd.testing.assert_frame_equal(df_cached, df)
+    assert list(df.columns) == ["age", "sex", "geo\\TIME_PERIOD", "2020", "2021", "2022"]
+
+    get_eurostat_data_df("demo_pjan", {"startPeriod": 2021})
+    assert len(client.requests) == 2
+
+
+def test_expired_and_offline(client, tmp_path):
+    get_eurostat_data_df("demo_pjan", {"sex": "T"})
+    (path,) = tmp_path.glob("demo_pjan-*.parquet")
+    expired = time.time() - 120
+    os.utime(path, (expired, expired))
+
+    configure_eurostat_cache(offline=True)
+    get_eurostat_data_df("demo_pjan", {"sex": "T"})
+    assert len(client.requests) == 1
+    with pytest.raises(EurostatOfflineError):
+        get_eurostat_data_df("demo_pjan", {"sex": "F"})
+
+    configure_eurostat_cache(offline=False)
+    get_eurostat_data_df("demo_pjan", {"sex": "T"})
+    assert len(client.requests) == 2
+
+
+def test_crf_panel_slices(client):
+    # Slices of the (sorted) panel are sorted by their index.
+    for year in [2018, 2022]:
+        for geo in [Geo.CZ, "EU27_2020"]:
+            pd.testing.assert_frame_equal(get_eurostat_crf_data_for_geo(geo, year),
+                                          get_eurostat_crf_data(geo, None, year).sort_index(),
+                                          check_index_type=False, check_dtype=False)
+        for crf_code in CRF_CODES:
+            pd.testing.assert_frame_equal(get_eurostat_crf_data_for_code(crf_code, year),
+                                          get_eurostat_crf_data(None, crf_code, year).sort_index(),
+                                          check_index_type=False, check_dtype=False)
+    # The whole panel is requested only once.
+    assert [code for code, filter_pars in client.requests
+            if "startPeriod" not in filter_pars] == ["env_air_gge"]
+
+
+def test_crf_totx4_memonia(client):
+    df = get_eurostat_crf_data_for_code("TOTX4_MEMONIA", 2020)
+    expected = (get_eurostat_crf_data(None, "TOTX4_MEMO", 2020)
+                + get_eurostat_crf_data(None, "CRF1D1A", 2020))
+    np.testing.assert_allclose(df.loc[expected.index, "value"], expected["value"])
+
+
+def _get_population_baseline(fixtures, year):
+    """ A request per year as before the shared population index. """
+    df = LocalEurostatClient(fixtures).get_data_df("demo_pjan", filter_pars={
+        "startPeriod": year, "endPeriod": year, "age": "TOTAL", "sex": "T"})
+    df = df.rename(columns={"geo\\TIME_PERIOD": "geo", str(year): "value"})
+    return df[["geo", "value"]].set_index("geo").dropna()
+
+
+def test_population(client, fixtures):
+    for year in [2018, 2020, 2022]:
+        expected = _get_population_baseline(fixtures, year)
+        df = get_eurostat_population_data(year)
+        np.testing.assert_array_equal(df.index, expected.index)
+        np.testing.assert_array_equal(df["value"], expected["value"])
+        for geo in [Geo.CZ, "DE"]:
+            geo_code = geo.value if isinstance(geo, Geo) else geo
+            value = get_eurostat_population_data_for_geo(geo, year)
+            assert value == expected.loc[geo_code, "value"]
+    assert "SK" not in get_eurostat_population_data(2022).index
+    assert len(client.requests) == 1
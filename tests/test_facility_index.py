@@ -0,0 +1,59 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from data_analysis.facility_index import FacilityIndex
+
+
+@pytest.fixture
+def mapping_csv(tmp_path):
+    path = tmp_path / "top-emitters.csv"
+    pd.DataFrame({
+        "facility_id": ["plant-a", "plant-b", "plant-c", "plant-d"],
+        "name": ["A", "B", "C", "D"],
+        "permit_ids": ["CZ-1|CZ-2", " CZ-3 | CZ-4 ", "CZ-2|CZ-5", None],
+    }).to_csv(path, index=False)
+    return path
+
+
+def _aggregate_baseline(df_mapping, values):
+    """ A loop over facilities summing values of their permits (as in the notebooks). """
+    rows = {}
+    for facility_id, permit_ids in zip(df_mapping["facility_id"], df_mapping["permit_ids"]):
+        permits = [] if pd.isna(permit_ids) else [p.strip() for p in permit_ids.split("|")]
+        rows[facility_id] = values[values.index.isin(permits)].sum()
+    return pd.DataFrame(rows).T if isinstance(values, pd.DataFrame) else pd.Series(rows)
+
+
+def test_aggregate_matches_baseline(mapping_csv, capsys):
+    index = FacilityIndex.from_csv(mapping_csv)
+    assert "CZ-2" in capsys.readouterr().out
+    assert index.duplicates["permit_id"].tolist() == ["CZ-2", "CZ-2"]
+
+    values = pd.DataFrame(np.arange(12, dtype=float).reshape(6, 2), columns=[2020, 2021],
+                          index=["CZ-1", "CZ-3", "CZ-4", "CZ-5", "CZ-6", "CZ-7"])
+    df = index.aggregate(values)
+    df_mapping = pd.read_csv(mapping_csv)
+    # CZ-2 is kept with its first facility only.
+    df_mapping.loc[2, "permit_ids"] = "CZ-5"
+    expected = _aggregate_baseline(df_mapping[df_mapping["permit_ids"].notna()], values)
+    np.testing.assert_allclose(df.to_numpy(), expected.to_numpy())
+    assert df.index.tolist() == ["plant-a", "plant-b", "plant-c"]
+
+    pd.testing.assert_series_equal(index.aggregate(values[2020]), df[2020])
+    assert index.get_unmapped(values).index.tolist() == ["CZ-6", "CZ-7"]
+    assert index.get_facility_codes(["CZ-4", "XX", "CZ-2"]).tolist() == [1, -1, 0]
+
+
+def test_wedge_definition():
+    definition = [
+        {"id": "energy", "breakdown": [
+            {"id": "plants", "allowances": True, "codes": ["CZ-1", "CZ-2"]},
+            {"id": "other", "crf": ["CRF1A1"]}]},
+        {"id": "industry", "breakdown": [
+            {"id": "steel", "allowances": True, "codes": ["CZ-3"]}]},
+    ]
+    index = FacilityIndex.from_wedge_definition(definition)
+    assert index.facilities.tolist() == ["energy_plants", "industry_steel"]
+    values = pd.Series([1.0, 2.0, 4.0, 8.0], index=["CZ-1", "CZ-2", "CZ-3", "CZ-4"])
+    assert index.aggregate(values).tolist() == [3.0, 4.0]
@@ -0,0 +1,32 @@
+import pandas as pd
+import pytest
+
+from data_analysis.localization import Translator
+
+
+@pytest.fixture
+def translator(tmp_path):
+    (tmp_path / "cs.yaml").write_text(
+        "chart:\n  title: Emise $country\n  empty:\nRUS: Rusko\n", encoding="utf8")
+    (tmp_path / "en.yaml").write_text("chart:\n  title: Emissions of $country\n", encoding="utf8")
+    return Translator(str(tmp_path), locale="cs")
+
+
+def test_translate(translator):
+    assert translator.translate("chart.title", country="ČR") == "Emise ČR"
+    translator.set_locale("en")
+    assert translator.translate("chart.title", country="CZ") == "Emissions of CZ"
+
+
+def test_null_leaves_are_missing(translator):
+    with pytest.raises(KeyError):
+        translator.translate("chart.empty")
+
+
+def test_translate_countries_as_one_by_one(translator):
+    codes = pd.Series(["RUS", "DEU", None, "RUS", "CZE"])
+    expected = [None if pd.isna(code) else translator.translate_country(code) for code in codes]
+    translations = translator.translate_countries(codes)
+    assert translations.isna().tolist() == [code is None for code in expected]
+    assert translations.dropna().tolist() == [code for code in expected if code is not None]
+    assert expected[0] == "Rusko"
@@ -0,0 +1,68 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from data_analysis.pecd import Technology, load_daily_capacity_factors
+from data_analysis.pecd_dunkelflaute import (
+    find_episodes,
+    get_combined_relative,
+    get_duration_distribution,
+    sweep_episodes,
+)
+
+
+@pytest.fixture(scope="module")
+def factors():
+    return load_daily_capacity_factors("cz")
+
+
+def _find_episodes_baseline(factors, relative, threshold):
+    """ Runs of days under the threshold within years, as in spolehlivost-oze.ipynb. """
+    df = pd.DataFrame({
+        "year": np.repeat(factors.years, relative.shape[1]),
+        "date": factors.get_dates(np.repeat(np.arange(len(factors.years)), relative.shape[1]),
+                                  np.tile(np.arange(relative.shape[1]), len(factors.years))),
+        "relative": relative.ravel(),
+    })
+    df = df[df["relative"] < threshold]
+    df["group"] = df.groupby("year")["date"].diff().dt.days.fillna(1).gt(1).groupby(
+        df["year"]).cumsum()
+    return (df.groupby(["year", "group"])
+            .agg(start_date=("date", "min"), num_days=("date", "size"),
+                 min_relative=("relative", "min"))
+            .reset_index().drop(columns="group"))
+
+
+@pytest.mark.parametrize("months", [None, [1, 2, 3, 10, 11, 12]])
+def test_episodes_match_baseline(factors, months):
+    relative = get_combined_relative(factors, months=months)
+    episodes = find_episodes(factors, relative, threshold=0.3)
+    expected = _find_episodes_baseline(factors, relative, threshold=0.3)
+    pd.testing.assert_frame_equal(episodes, expected, check_dtype=False)
+
+
+def test_combined_relative_as_in_notebook(factors):
+    combined = 0.4 * factors.cf[Technology.SOLAR] + 0.6 * factors.cf[Technology.WIND]
+    np.testing.assert_allclose(get_combined_relative(factors), combined / combined.mean())
+
+
+def test_duration_distribution(factors):
+    episodes = find_episodes(factors, get_combined_relative(factors), threshold=0.3)
+    df = get_duration_distribution(episodes, len(factors.years))
+    assert df["occurrences"].sum() == len(episodes)
+    assert df["cum_occurrences"].iloc[0] == episodes["num_days"].sum()
+    last = df.iloc[-1]
+    assert last["cum_occurrences"] == last["occurrences"] * last["num_days"]
+
+
+def test_sweep_matches_episodes(factors):
+    relative = get_combined_relative(factors, months=[1, 2, 3, 10, 11, 12])
+    thresholds, windows = [0.2, 0.3, 0.5], [1, 2, 4]
+    df = sweep_episodes(relative, thresholds, windows)
+    num_years = len(factors.years)
+    for window in windows:
+        for threshold in thresholds:
+            episodes = find_episodes(factors, relative, threshold, min_days=window)
+            row = df.loc[(window, threshold)]
+            assert row["episodes_per_year"] == pytest.approx(len(episodes) / num_years)
+            assert row["days_per_year"] == pytest.approx(episodes["num_days"].sum() / num_years)
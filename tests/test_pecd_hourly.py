@@ -0,0 +1,83 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from data_analysis.pecd import Technology, get_daily_file_path, load_pemmdb_capacities
+from data_analysis.pecd_hourly import (
+    aggregate_hourly_files,
+    build_daily_files,
+    get_country_daily,
+    get_hourly_file_path,
+)
+
+DAY_COLUMNS = ["year", "month", "day"]
+
+
+@pytest.fixture(scope="module")
+def daily_dir(pecd_dir, tmp_path_factory):
+    path = tmp_path_factory.mktemp("daily")
+    build_daily_files(pecd_dir, path, jobs=1)
+    return path
+
+
+def _read_hourly(pecd_dir, technology):
+    df = pd.read_parquet(get_hourly_file_path(technology, data_dir=pecd_dir))
+    return df.assign(country=df["country"].astype(str))
+
+
+def _get_capacities(pecd_dir):
+    df = load_pemmdb_capacities(pecd_dir / "ERAA2023 PEMMDB Generation.xlsx")
+    return df.pivot_table(index="country", columns="technology", values="capacity_mw")
+
+
+def _assert_daily_equal(df, expected):
+    expected = expected.reset_index().sort_values(DAY_COLUMNS, ignore_index=True)
+    np.testing.assert_array_equal(df[DAY_COLUMNS], expected[DAY_COLUMNS])
+    np.testing.assert_allclose(df["cf"], expected["cf"])
+
+
+def test_cz_files_match_notebook(pecd_dir, daily_dir):
+    # Daily means of the hourly CZ capacity factors, as in spolehlivost-oze-prep.ipynb.
+    for technology, hourly_technology in [(Technology.SOLAR, "solar"),
+                                          (Technology.WIND, "onshore")]:
+        df = pd.read_parquet(get_daily_file_path(technology, "cz", data_dir=daily_dir))
+        hourly = _read_hourly(pecd_dir, hourly_technology)
+        expected = hourly[hourly["country"] == "CZ"].groupby(DAY_COLUMNS)["cf"].mean()
+        _assert_daily_equal(df, expected)
+        assert df.dtypes.astype(str).tolist() == ["int32", "float64", "float64", "float64"]
+
+
+def test_europe_solar_matches_notebook(pecd_dir, daily_dir):
+    df = pd.read_parquet(get_daily_file_path(Technology.SOLAR, "europe", data_dir=daily_dir))
+    # Hourly capacity factors weighted by capacities of countries with data (inner join).
+    hourly = _read_hourly(pecd_dir, "solar").merge(
+        _get_capacities(pecd_dir)["solar"].dropna().rename("capacity"),
+        left_on="country", right_index=True)
+    expected = (hourly.assign(weighted=hourly["cf"] * hourly["capacity"])
+                .groupby(DAY_COLUMNS)[["weighted", "capacity"]].sum())
+    _assert_daily_equal(df, (expected["weighted"] / expected["capacity"]).rename("cf"))
+
+
+def test_europe_wind_matches_notebook(pecd_dir, daily_dir):
+    df = pd.read_parquet(get_daily_file_path(Technology.WIND, "europe", data_dir=daily_dir))
+    daily = {technology: _read_hourly(pecd_dir, technology)
+             .groupby(["country"] + DAY_COLUMNS)["cf"].mean()
+             for technology in ["offshore", "onshore"]}
+    capacities = _get_capacities(pecd_dir)[["offshore", "onshore"]].dropna(how="all")
+    expected = (pd.concat(daily, axis=1).reset_index()
+                .merge(capacities.add_prefix("cap_"), left_on="country", right_index=True,
+                       how="right")
+                .fillna({"offshore": 0, "onshore": 0, "cap_offshore": 0, "cap_onshore": 0}))
+    expected["cf"] = ((expected["offshore"] * expected["cap_offshore"]
+                       + expected["onshore"] * expected["cap_onshore"])
+                      / (expected["cap_offshore"] + expected["cap_onshore"]))
+    _assert_daily_equal(df, expected.groupby(DAY_COLUMNS)["cf"].mean())
+
+
+def test_skipped_row_groups(pecd_dir):
+    # Row groups without the requested countries are skipped, results are the same.
+    paths = {"solar": get_hourly_file_path("solar", data_dir=pecd_dir)}
+    sums = aggregate_hourly_files(paths, ["CZ"], jobs=1)["solar"]
+    all_sums = aggregate_hourly_files(paths, None, jobs=1)["solar"]
+    pd.testing.assert_frame_equal(get_country_daily(sums), get_country_daily(all_sums))
+    assert sums.index.get_level_values("country").unique().tolist() == ["CZ"]
@@ -0,0 +1,93 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from data_analysis.pecd import load_country_capacity_factors, load_pemmdb_capacities
+from data_analysis.pecd_hourly import build_daily_files, get_hourly_file_path
+from data_analysis.pecd_portfolios import (
+    evaluate_scenarios,
+    get_aggregation_scenarios,
+    get_capacity_matrix,
+)
+
+
+@pytest.fixture(scope="module")
+def daily_dir(pecd_dir, tmp_path_factory):
+    path = tmp_path_factory.mktemp("daily")
+    build_daily_files(pecd_dir, path, jobs=2)
+    return path
+
+
+@pytest.fixture(scope="module")
+def factors(daily_dir):
+    return load_country_capacity_factors(data_dir=daily_dir)
+
+
+@pytest.fixture(scope="module")
+def capacities(pecd_dir, factors):
+    return get_capacity_matrix(load_pemmdb_capacities(pecd_dir / "ERAA2023 PEMMDB Generation.xlsx"),
+                               factors.countries, factors.technologies)
+
+
+def _evaluate_scenario_baseline(daily_dir, capacities, factors, scenario_capacities):
+    """ A single scenario with pandas: capacity-weighted daily output and its statistics. """
+    frames = []
+    for k, technology in enumerate(factors.technologies):
+        df = pd.read_parquet(daily_dir / f"eraa2023-ty2025-daily-{technology}-countries.parquet")
+        weights = pd.Series(scenario_capacities[:, k], index=factors.countries)
+        frames.append(df.assign(output=df["cf"] * df["country"].map(weights).fillna(0.0)))
+    df = pd.concat(frames)
+    df_countries = df.pivot_table(index=["year", "month", "day"], columns="country",
+                                  values="output", aggfunc="sum")
+    cf = df_countries.sum(axis=1) / scenario_capacities.sum()
+    relative = cf / cf.mean()
+    rolling = relative.groupby(level="year").transform(lambda s: s.rolling(7).mean())
+    return cf, relative, rolling, df_countries.corr()
+
+
+def test_scenarios_match_baseline(daily_dir, factors, capacities):
+    groups = {"cz": ["CZ"], "central": ["AT", "CZ", "DE", "PL"], "all": factors.countries}
+    scenario_capacities, scenarios = get_aggregation_scenarios(capacities, factors.countries,
+                                                               groups)
+    results = evaluate_scenarios(factors, scenario_capacities, scenarios)
+    for s, scenario in enumerate(scenarios):
+        cf, relative, rolling, df_correlations = _evaluate_scenario_baseline(
+            daily_dir, capacities, factors, scenario_capacities[..., s])
+        summary = results.summary.loc[scenario]
+        np.testing.assert_allclose(results.cf[s].ravel(), cf.to_numpy())
+        assert summary["mean_cf"] == pytest.approx(cf.mean())
+        assert summary["std_cf"] == pytest.approx(cf.std(ddof=0))
+        assert summary["worst_day_relative"] == pytest.approx(relative.min())
+        year, month, day = relative.idxmin()
+        assert summary["worst_date"] == pd.Timestamp(year=int(year), month=int(month), day=int(day))
+        assert summary["p05_relative"] == pytest.approx(relative.quantile(0.05))
+        assert summary["worst_7_days_relative"] == pytest.approx(rolling.min())
+        df = results.get_country_correlations(scenario)
+        countries = df_correlations.columns[df_correlations.notna().any()]
+        np.testing.assert_allclose(df.loc[countries, countries],
+                                   df_correlations.loc[countries, countries])
+
+
+def test_capacities_of_unknown_countries(factors, pecd_dir, capsys):
+    df = load_pemmdb_capacities(pecd_dir / "ERAA2023 PEMMDB Generation.xlsx")
+    capacities = get_capacity_matrix(df, ["CZ", "DE"], factors.technologies)
+    assert "no capacity factors of AT, DK, PL" in capsys.readouterr().out
+    assert capacities[1].tolist() == [50500, 60000, 9000]
+
+
+def test_scenarios_without_capacity(factors, capacities):
+    scenario_capacities, scenarios = get_aggregation_scenarios(
+        capacities, factors.countries, {"none": []})
+    with pytest.raises(ValueError):
+        evaluate_scenarios(factors, scenario_capacities, scenarios)
+
+
+def test_country_daily_files(pecd_dir, daily_dir):
+    for technology in ["solar", "onshore", "offshore"]:
+        df = pd.read_parquet(daily_dir / f"eraa2023-ty2025-daily-{technology}-countries.parquet")
+        hourly = pd.read_parquet(get_hourly_file_path(technology, data_dir=pecd_dir))
+        expected = (hourly.assign(country=hourly["country"].astype(str))
+                    .groupby(["country", "year", "month", "day"])["cf"].mean())
+        df = df.set_index(["country", "year", "month", "day"])["cf"]
+        np.testing.assert_allclose(df.to_numpy(), expected.to_numpy())
+        assert df.index.equals(expected.index)
@@ -0,0 +1,39 @@
+import numpy as np
+import pandas as pd
+
+from data_analysis.sectors import R_SECTOR_CODES_PATH, get_sector_hierarchy
+
+CODES = ["TOTX4_MEMO", "CRF1D1A", "CRF1A1A", "CRF1A1B", "CRF1A1C", "CRF1A2", "CRF1A3A", "CRF1A3B",
+         "CRF1A3C", "CRF1A3D", "CRF1A3E", "CRF1A4A", "CRF1A4B", "CRF1A4C", "CRF1B", "CRF2", "CRF3",
+         "CRF5"]
+
+
+def _get_sector_totals_baseline(df: pd.DataFrame) -> pd.DataFrame:
+    """ The sums of the original fakta_calculate_emission_categories in lib/R. """
+    df_totals = pd.DataFrame({
+        "electricity-heat": df["CRF1A1A"],
+        "industry": df["CRF1A2"] + df["CRF1A1B"] + df["CRF1A1C"] + df["CRF1A3E"] + df["CRF2"]
+        + df["CRF1B"],
+        "transport": df["CRF1A3A"] + df["CRF1A3B"] + df["CRF1A3C"] + df["CRF1A3D"]
+        + df["CRF1D1A"],
+        "buildings": df["CRF1A4A"] + df["CRF1A4B"],
+        "agriculture": df["CRF3"] + df["CRF1A4C"],
+        "waste": df["CRF5"],
+    })
+    df_totals["other"] = df["TOTX4_MEMO"] + df["CRF1D1A"] - df_totals.sum(axis=1, skipna=False)
+    return df_totals
+
+
+def test_sector_totals_match_baseline():
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame(rng.uniform(0, 10, (6, len(CODES))), columns=CODES)
+    df["TOTX4_MEMO"] *= 30
+    df.loc[2, "CRF5"] = np.nan
+    df_totals = get_sector_hierarchy().get_sector_totals(df)
+    df_expected = _get_sector_totals_baseline(df)
+    pd.testing.assert_frame_equal(df_totals[df_expected.columns], df_expected)
+
+
+def test_r_table_is_up_to_date():
+    df = pd.read_csv(R_SECTOR_CODES_PATH)
+    pd.testing.assert_frame_equal(df, get_sector_hierarchy().get_sector_codes_table())
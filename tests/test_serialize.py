@@ -0,0 +1,193 @@
+import math
+import sys
+from datetime import datetime
+from pathlib import Path
+
+import openpyxl
+import pandas as pd
+import pytest
+
+sys.path.append(str(Path(__file__).parents[1] / "scripts" / "dashboard-teplaren"))
+
+from serialize import (  # noqa: E402
+    CHP_STATUS_MAP,
+    BuildState,
+    process_row,
+    process_rows,
+    process_rows_incremental,
+    read_dataset,
+)
+
+PLANTS = [
+    {"whole": True, "publish_to_web": 1, "name": "Teplárna A", "name_details": "provoz 1",
+     "lon": 14.4201, "lat": 50.0812, "status_simple": "Hotovo", "num_households": 50000,
+     "fuels_main_today": "Zemní plyn, Biomasa", "fuels_main_future": "Biomasa",
+     "share_households": 0.4, "share_households_dhs_in_czechia": 0.02,
+     "ghg_2021": 1.5e6, "ghg_2022": None, "ghg_2023": 1.2e6, "ghg_share": 0.01,
+     "mf_application_ids": "100001, 100002", "chp_application_ids": "KVET-1",
+     "ippc_ids": "IPPC-1"},
+    {"whole": True, "publish_to_web": 1, "name": "Teplárna B", "lon": None, "lat": None,
+     "status_simple": "Probíhá", "num_households": 20000, "fuels_main_today": "Hnědé uhlí",
+     "share_households": 0.7, "ghg_2021": None, "ghg_2022": None, "ghg_2023": None,
+     "ghg_note": "Odhad emisí", "ghg_share": 0.005, "mf_application_ids": "100002",
+     "chp_application_ids": "KVET-1, KVET-2"},
+    {"whole": True, "publish_to_web": 0, "name": "Teplárna C", "lon": 16.6, "lat": 49.2,
+     "status_simple": "Problematické", "num_households": 800, "fuels_main_today": "TTO",
+     "ghg_2021": 2e4, "ghg_2022": 3e4, "ghg_2023": 1e4, "ghg_share": 0.001,
+     "ippc_ids": "IPPC-1, IPPC-2"},
+    {"whole": False, "publish_to_web": 1, "name": "Teplárna D", "num_households": 100,
+     "fuels_main_today": "Biomasa", "ghg_2023": 5e3, "ghg_share": 0.0001},
+]
+PLANT_COLUMNS = [
+    "whole", "publish_to_web", "name", "name_details", "lon", "lat", "status_simple",
+    "status_text", "status_notes", "owner", "owner_web", "num_households",
+    "munis_supplied_simple", "fuels_main_today", "fuels_main_future", "fuels_secondary_future",
+    "fuels_secondary_today", "other_heating", "share_households",
+    "share_households_dhs_in_czechia", "ghg_2021", "ghg_2022", "ghg_2023", "ghg_note",
+    "ghg_share", "mf_application_ids", "chp_application_ids", "ippc_ids",
+]
+
+
+@pytest.fixture
+def workbook_path(tmp_path):
+    """ A small workbook with the sheets (and leading rows) of the dashboard workbook. """
+    workbook = openpyxl.Workbook()
+    workbook.remove(workbook.active)
+    sheet = workbook.create_sheet("Výstup Přehled velkých tepláren")
+    sheet.append(["Přehled velkých tepláren"])
+    sheet.append([])
+    sheet.append(PLANT_COLUMNS)
+    for plant in PLANTS:
+        sheet.append([plant.get(column, f"{column} {plant['name']}"
+                                if column in ("status_text", "status_notes", "owner") else None)
+                      for column in PLANT_COLUMNS])
+
+    sheet = workbook.create_sheet("Vstup ModFond projekty")
+    sheet.append(["Projekty podpořené z Modernizačního fondu"])
+    sheet.append([])
+    sheet.append(["Číslo RM", "Výzva", "Název akce", "Název stručně", "Dotace (Kč)",
+                  "Dotace původně (Kč)", "Vyplaceno (Kč)"])
+    sheet.append([100001, "HEAT 1", "Modernizace  zdroje\n tepla", "Zdroj", 120e6, 150e6, 60e6])
+    sheet.append([100002, "HEAT 2", "Rozvody tepla", "Rozvody", 35.5e6, 35.5e6, 0])
+    sheet.append([100003, "HEAT 2", "Akumulace", "Akumulace", 10e6, 12e6, 10e6])
+
+    sheet = workbook.create_sheet("Vstup Podpora KVET")
+    for _ in range(4):
+        sheet.append(["Provozní podpora KVET"])
+    sheet.append(["Kód", "Instalovaný výkon (MWe)", "Datum \nuvedení do \nprovozu", "Stav",
+                  "Druh paliva"])
+    sheet.append(["KVET-1", 12.6, datetime(2021, 3, 1), "C: podpořeno", "Zemní  plyn"])
+    sheet.append(["KVET-2", 4.2, datetime(2024, 10, 1), "B: nepodpořeno", "Biomasa\n tuhá"])
+
+    sheet = workbook.create_sheet("Vstup IPPC řízení")
+    sheet.append(["Řízení IPPC"])
+    sheet.append(["Kód", "Název zařízení dle IPPC", "Odkaz"])
+    sheet.append(["IPPC-1", "Zařízení 1", "https://ippc.example/1"])
+    sheet.append(["IPPC-2", "Zařízení 2", "https://ippc.example/2"])
+
+    path = tmp_path / "Dashboard tepláren.xlsx"
+    workbook.save(path)
+    return path
+
+
+def _without_nan(value):
+    """ NaN values (such as missing details) are not equal to themselves. """
+    if isinstance(value, float) and math.isnan(value):
+        return None
+    if isinstance(value, dict):
+        return {key: _without_nan(v) for key, v in value.items()}
+    if isinstance(value, list):
+        return [_without_nan(v) for v in value]
+    return value
+
+
+def test_dataset_cache(workbook_path):
+    dataset = read_dataset(workbook_path)
+    assert dataset.dh_systems["name"].tolist() == ["Teplárna A", "Teplárna B", "Teplárna C"]
+    assert dataset.dh_systems["mf_application_ids"].iloc[0] == ["100001", "100002"]
+    assert dataset.chp_projects["Fuel"].tolist() == ["Zemní plyn", "Biomasa tuhá"]
+
+    cached = read_dataset(workbook_path)
+    assert len(list((workbook_path.parent / ".cache").glob("*.pickle"))) == 1
+    for name in ["dh_systems", "mf_projects", "chp_projects", "ippc_permits"]:
+        pd.testing.assert_frame_equal(getattr(cached, name), getattr(dataset, name))
+
+
+def _process_linked_baseline(row, df_mf, df_chp, df_ippc):
+    """ Emissions and linked projects of a plant looked up row by row (as before the batch). """
+    item = {}
+    ghg_cols = [col for col in row.index if col.startswith("ghg_2")]
+    emissions = row[ghg_cols].astype(float).div(1e6).round(3)
+    if not emissions.isna().all():
+        item["emissions_mtco2eq"] = emissions.fillna(0.0).tolist()
+
+    mf_ids = row["mf_application_ids"]
+    mf_total = 0
+    if isinstance(mf_ids, list) and len(mf_ids) > 0:
+        item["mf_subsidies"] = [
+            {"call": mf_row.Call, "application_id": mf_id, "name": mf_row.ShortName,
+             "long_name": mf_row.LongName, "amount": round(mf_row["Amount"]),
+             "amount_original": round(mf_row["AmountOriginal"]),
+             "paid_percent": round(mf_row["AmountPaid"] / mf_row["Amount"] * 100)}
+            for mf_id, mf_row in df_mf.loc[mf_ids].iterrows()]
+        mf_total = round(df_mf.loc[mf_ids, "Amount"].sum())
+
+    chp_ids = row["chp_application_ids"]
+    chp_total = 0
+    if isinstance(chp_ids, list) and len(chp_ids) > 0:
+        item["chp_subsidies"] = []
+        sum_power = 0
+        for _, chp_row in df_chp.loc[chp_ids].iterrows():
+            status = CHP_STATUS_MAP.get(chp_row["Status"], "unknown")
+            if status == "accepted":
+                sum_power += chp_row["Power"]
+            item["chp_subsidies"].append({
+                "power": round(chp_row["Power"]), "since": chp_row["SinceDate"].strftime("%m/%Y"),
+                "fuel": chp_row["Fuel"], "status": status})
+        chp_total = round(sum_power)
+
+    ippc_ids = row["ippc_ids"]
+    if isinstance(ippc_ids, list) and len(ippc_ids) > 0:
+        item["ippc_permits"] = [{"name": ippc_row["Name"], "url": ippc_row["URL"]}
+                                for _, ippc_row in df_ippc.loc[ippc_ids].iterrows()]
+    return item, mf_total, chp_total
+
+
+def test_batch_matches_rows(workbook_path):
+    dataset = read_dataset(workbook_path)
+    df_dhs = dataset.dh_systems
+    args = (dataset.mf_projects, dataset.chp_projects, dataset.ippc_permits)
+    items, mf_totals, chp_totals = process_rows(df_dhs, *args)
+    assert len(items) == len(df_dhs)
+    for i, (_, row) in enumerate(df_dhs.iterrows()):
+        expected, mf_total, chp_total = _process_linked_baseline(row, *args)
+        assert {key: items[i][key] for key in expected} == expected
+        linked = {"mf_subsidies", "chp_subsidies", "ippc_permits"}
+        assert not (linked - set(expected)) & set(items[i])
+        assert (mf_totals[i], chp_totals[i]) == (mf_total, chp_total)
+        assert _without_nan(process_row(row, *args)[0]) == _without_nan(items[i])
+    assert (mf_totals, chp_totals) == ([156, 36, 0], [13, 13, 0])
+
+
+def test_incremental_matches_rebuild(workbook_path, tmp_path):
+    dataset = read_dataset(workbook_path)
+    args = (dataset.mf_projects, dataset.chp_projects, dataset.ippc_permits)
+    df_dhs = dataset.dh_systems
+    state, diff = process_rows_incremental(df_dhs, *args, None)
+    assert diff["added"] == ["Teplárna A", "Teplárna B", "Teplárna C"]
+    state_path = tmp_path / "state.pickle"
+    state.save(state_path)
+
+    # Change a plant, remove another one and add a new one.
+    df_changed = df_dhs.copy()
+    df_changed.iloc[0, df_changed.columns.get_loc("num_households")] += 1000
+    df_changed = pd.concat([df_changed.iloc[:-1], df_dhs.iloc[[1]].assign(name="New plant")])
+    state, diff = process_rows_incremental(df_changed, *args, BuildState.load(state_path))
+    assert diff["added"] == ["New plant"]
+    assert diff["changed"] == ["Teplárna A"]
+    assert diff["removed"] == ["Teplárna C"]
+
+    items, mf_totals, chp_totals = process_rows(df_changed, *args)
+    assert _without_nan(list(state.items.values())) == _without_nan(items)
+    assert state.mf_chp_shown_subsidies_total == sum(mf_totals)
+    assert state.chp_shown_subsidies_total_accepted == sum(chp_totals)
@@ -0,0 +1,74 @@
+import re
+import sys
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+sys.path.append(str(Path(__file__).parents[1] / "scripts" / "dashboard-teplaren"))
+
+from sfzp import parse_amount, read_sfzp_totals  # noqa: E402
+
+CSV = (
+    "Program,Projekt,Příjemce,Kraj,Podpora\n"
+    "ModF,Kotel,Teplárna A‚ a.s.,Praha,1000.5\n"
+    "ModF HEAT,Rozvody,Teplárna B,Brno,2000\n"
+    "OPŽP,Zateplení,Obec C,Praha,300\n"
+    "ModF I+,Kogenerace,Teplárna D,Praha,400.25\n"
+    "OPŽP,\"Projekt ModF\nna dva řádky, v Brně\",Obec E,Brno,50\n"
+)
+
+
+def _read_totals_baseline(path: Path, pattern: str) -> float:
+    """ The original grep of matching lines followed by pd.read_csv. """
+    lines = path.read_text(encoding="utf-8").splitlines(keepends=True)
+    filtered = path.with_suffix(".filtered.csv")
+    filtered.write_text(lines[0] + "".join(line for line in lines[1:] if re.search(pattern, line)),
+                        encoding="utf-8")
+    return pd.read_csv(filtered)["Podpora"].sum()
+
+
+@pytest.fixture
+def csv_path(tmp_path):
+    path = tmp_path / "sfzp_aktivni_IS.csv"
+    path.write_text(CSV, encoding="utf-8")
+    return path
+
+
+def test_totals_match_grep_on_single_line_records(tmp_path):
+    path = tmp_path / "sfzp_aktivni_IS.csv"
+    path.write_text(CSV.split("OPŽP,\"Projekt")[0], encoding="utf-8")
+    totals = read_sfzp_totals(path).totals
+    assert totals["ModF"] == pytest.approx(_read_totals_baseline(path, "ModF"))
+    assert totals["CHP"] == pytest.approx(_read_totals_baseline(path, r"HEAT|I\+"))
+
+
+def test_quoted_fields_with_newlines(csv_path):
+    result = read_sfzp_totals(csv_path, group_column="Kraj")
+    assert result.totals == {"ModF": pytest.approx(3450.75), "CHP": pytest.approx(2400.25)}
+    assert result.num_rows == {"ModF": 4, "CHP": 2}
+    assert result.by_group["ModF"] == {"Praha": pytest.approx(1400.75), "Brno": 2050.0}
+
+
+def test_amounts_with_separators(tmp_path):
+    path = tmp_path / "sfzp_aktivni_IS.csv"
+    path.write_text("Program,Podpora\nModF,\"1 000\xa0000,5\"\nModF,\n", encoding="utf-8")
+    assert read_sfzp_totals(path).totals["ModF"] == 1000000.5
+
+
+@pytest.mark.parametrize("value, amount", [
+    ("1234,5", 1234.5), ("1,234.5", 1234.5), ("1 234 567.25", 1234567.25), ("12", 12.0),
+    ("", 0.0)])
+def test_parse_amount(value, amount):
+    assert parse_amount(value) == amount
+
+
+def test_malformed_amounts_are_skipped(tmp_path, caplog):
+    path = tmp_path / "sfzp_aktivni_IS.csv"
+    path.write_text("Program,Podpora\nModF,100\nModF,neuvedeno\nModF,\"1.234,5\"\nModF,50\n",
+                    encoding="utf-8")
+    result = read_sfzp_totals(path)
+    assert result.totals["ModF"] == 150.0
+    assert result.num_rows["ModF"] == 2
+    assert "'neuvedeno'" in caplog.text and "line 3" in caplog.text
+    assert "'1.234,5'" in caplog.text and "line 4" in caplog.text